@@ -1,306 +1,277 @@
 import streamlit as st
 import pandas as pd
-import gspread
-from google.oauth2.service_account import Credentials
+import numpy as np
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-
-# Page configuration
-st.set_page_config(
-    page_title="Quotation System",
-    page_icon="💾",
-    layout="wide",
-    initial_sidebar_state="expanded"
-)
+from qms import archive, charts, fx, memory, names, quotation, sheets, snapshot
+from qms.anomaly import QuoteAnomalies, scan as scan_quote_anomalies
+from qms.catalogue import UnionView
+from qms.export import QUOTE_EXPORT_COLUMNS, ExportJob, available_formats
+from qms.facets import FacetIndex
+from qms.history import PriceHistory
+from qms.indexes import SortIndex
+from qms.invalidation import get_bus
+from qms.margins import lowest_margins, margin_table
+from qms.normalize import normalize_quotes, parse_dates, parse_prices
+from qms.recommend import SimilarParts
+from qms.search import IncrementalSearch, LRUCache, page_bounds
+from qms.sheets import PRODUCT_CATEGORIES, QUOTE_SHEETS, open_spreadsheet, worksheet_frame
+from qms.specs import SPEC_FILTERS, SpecSearch
+from qms.workspace import normalized_quotes
+
+logger = logging.getLogger(__name__)
+
+# Stylesheet injected on every script run; its text is read once per process
+STYLESHEET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "app.css")
+
+@st.cache_resource(show_spinner=False)
+def load_stylesheet(path):
+    """Style element for a CSS file, read from disk once per process"""
+    with open(path, encoding="utf-8") as handle:
+        return f"<style>\n{handle.read()}</style>"
 
 def inject_custom_css():
     """Inject professional CRM/SaaS styling with light theme"""
-    st.markdown("""
-    <style>
-    /* Import Professional Fonts */
-    @import url('https://fonts.googleapis.com/css2?family=IBM+Plex+Sans:wght@300;400;500;600;700&family=JetBrains+Mono:wght@400;500&display=swap');
-    
-    /* ═══ COLOR SYSTEM ═══ */
-    :root {
-        --primary: #2563eb;
-        --primary-hover: #1d4ed8;
-        --secondary: #64748b;
-        --success: #10b981;
-        --warning: #f59e0b;
-        --danger: #ef4444;
-        --bg-primary: #ffffff;
-        --bg-secondary: #f8fafc;
-        --bg-tertiary: #f1f5f9;
-        --text-primary: #0f172a;
-        --text-secondary: #334155;
-        --text-muted: #64748b;
-        --border: #e2e8f0;
-    }
-    
-    /* ═══ GLOBAL STYLES ═══ */
-    .stApp {
-        background: var(--bg-primary);
-        font-family: 'IBM Plex Sans', -apple-system, sans-serif;
-        color: var(--text-primary);
-    }
-    
-    #MainMenu, footer, header {visibility: hidden;}
-    
-    /* ═══ TYPOGRAPHY ═══ */
-    h1 {
-        font-size: 2.25rem !important;
-        font-weight: 700 !important;
-        color: var(--text-primary) !important;
-        letter-spacing: -0.025em !important;
-        margin-bottom: 0.5rem !important;
-    }
-    
-    h2 {
-        font-size: 1.5rem !important;
-        font-weight: 600 !important;
-        color: var(--text-primary) !important;
-        margin: 2rem 0 1rem !important;
-    }
-    
-    h3 {
-        font-size: 1.125rem !important;
-        font-weight: 600 !important;
-        color: var(--text-secondary) !important;
-        text-transform: uppercase !important;
-        letter-spacing: 0.05em !important;
-        font-size: 0.875rem !important;
-        margin: 1.5rem 0 1rem !important;
-        padding-bottom: 0.5rem !important;
-        border-bottom: 1px solid var(--border) !important;
-    }
-    
-    /* ═══ SIDEBAR ═══ */
-    [data-testid="stSidebar"] {
-        background: var(--bg-secondary) !important;
-        border-right: 1px solid var(--border) !important;
-    }
-    
-    [data-testid="stSidebar"] .stButton > button {
-        width: 100%;
-        background: var(--bg-primary);
-        color: var(--text-primary);
-        border: 1px solid var(--border);
-        border-radius: 6px;
-        padding: 0.625rem 1rem;
-        font-weight: 500;
-        transition: all 0.15s ease;
-    }
-    
-    [data-testid="stSidebar"] .stButton > button:hover {
-        background: var(--primary);
-        color: white;
-        border-color: var(--primary);
-        transform: translateY(-1px);
-    }
-    
-    /* ═══ METRIC CARDS ═══ */
-    [data-testid="stMetric"] {
-        background: var(--bg-secondary);
-        padding: 1.25rem;
-        border-radius: 8px;
-        border: 1px solid var(--border);
-        transition: all 0.2s ease;
-    }
-    
-    [data-testid="stMetric"]:hover {
-        transform: translateY(-2px);
-        box-shadow: 0 10px 25px rgba(0,0,0,0.08);
-        border-color: var(--primary);
-    }
-    
-    [data-testid="stMetricValue"] {
-        font-size: 2rem !important;
-        font-weight: 700 !important;
-        font-family: 'JetBrains Mono', monospace !important;
-        color: var(--text-primary) !important;
-    }
-    
-    [data-testid="stMetricLabel"] {
-        color: var(--text-secondary) !important;
-        font-size: 0.875rem !important;
-        font-weight: 500 !important;
-        text-transform: uppercase !important;
-        letter-spacing: 0.05em !important;
-    }
-    
-    /* ═══ INPUTS ═══ */
-    .stTextInput > div > div > input,
-    .stNumberInput > div > div > input,
-    .stTextArea textarea,
-    .stDateInput > div > div > input,
-    .stSelectbox > div > div {
-        background: var(--bg-primary) !important;
-        color: var(--text-primary) !important;
-        border: 1px solid var(--border) !important;
-        border-radius: 6px !important;
-        transition: all 0.15s ease !important;
-    }
-    
-    .stTextInput > div > div > input:focus,
-    .stNumberInput > div > div > input:focus,
-    .stTextArea textarea:focus,
-    .stDateInput > div > div > input:focus,
-    .stSelectbox > div > div:focus {
-        border-color: var(--primary) !important;
-        box-shadow: 0 0 0 3px rgba(37, 99, 235, 0.1) !important;
-    }
-    
-    /* ═══ BUTTONS ═══ */
-    .stButton > button {
-        background: var(--primary) !important;
-        color: white !important;
-        border: none !important;
-        border-radius: 6px !important;
-        padding: 0.625rem 1.25rem !important;
-        font-weight: 600 !important;
-        transition: all 0.15s ease !important;
-    }
-    
-    .stButton > button:hover {
-        background: var(--primary-hover) !important;
-        transform: translateY(-1px) !important;
-        box-shadow: 0 4px 12px rgba(37, 99, 235, 0.3) !important;
-    }
-    
-    /* ═══ DATA TABLES ═══ */
-    [data-testid="stDataFrame"] {
-        background: var(--bg-primary) !important;
-        border: 1px solid var(--border) !important;
-        border-radius: 8px !important;
-    }
-    
-    [data-testid="stDataFrame"] thead tr th {
-        background: var(--bg-tertiary) !important;
-        color: var(--text-primary) !important;
-        font-weight: 600 !important;
-        text-transform: uppercase !important;
-        font-size: 0.75rem !important;
-        letter-spacing: 0.05em !important;
-    }
-    
-    [data-testid="stDataFrame"] tbody tr:hover {
-        background: rgba(37, 99, 235, 0.05) !important;
-    }
-    
-    /* ═══ FORMS ═══ */
-    [data-testid="stForm"] {
-        background: var(--bg-secondary) !important;
-        border: 1px solid var(--border) !important;
-        border-radius: 8px !important;
-        padding: 1.5rem !important;
-    }
-    
-    /* ═══ ALERTS ═══ */
-    .stSuccess {
-        background: rgba(16, 185, 129, 0.1) !important;
-        border-left: 4px solid var(--success) !important;
-        color: #047857 !important;
-        border-radius: 6px !important;
-    }
-    
-    .stError {
-        background: rgba(239, 68, 68, 0.1) !important;
-        border-left: 4px solid var(--danger) !important;
-        color: #b91c1c !important;
-        border-radius: 6px !important;
-    }
-    
-    .stWarning {
-        background: rgba(245, 158, 11, 0.1) !important;
-        border-left: 4px solid var(--warning) !important;
-        color: #c2410c !important;
-        border-radius: 6px !important;
-    }
-    
-    .stInfo {
-        background: rgba(37, 99, 235, 0.1) !important;
-        border-left: 4px solid var(--primary) !important;
-        color: var(--text-secondary) !important;
-        border-radius: 6px !important;
-    }
-    
-    /* ═══ RADIO BUTTONS ═══ */
-    .stRadio label {
-        background: var(--bg-primary) !important;
-        border: 1px solid var(--border) !important;
-        border-radius: 6px !important;
-        padding: 0.625rem 1rem !important;
-        transition: all 0.15s ease !important;
-    }
-    
-    .stRadio label:hover {
-        background: var(--bg-tertiary) !important;
-        border-color: var(--primary) !important;
-    }
-    
-    /* ═══ SCROLLBAR ═══ */
-    ::-webkit-scrollbar {
-        width: 8px;
-        height: 8px;
-    }
-    
-    ::-webkit-scrollbar-track {
-        background: var(--bg-secondary);
-    }
-    
-    ::-webkit-scrollbar-thumb {
-        background: var(--border);
-        border-radius: 4px;
-    }
-    
-    ::-webkit-scrollbar-thumb:hover {
-        background: var(--text-muted);
-    }
-    
-    /* ═══ ANIMATIONS ═══ */
-    @keyframes fadeIn {
-        from {
-            opacity: 0;
-            transform: translateY(10px);
-        }
-        to {
-            opacity: 1;
-            transform: translateY(0);
-        }
-    }
-    
-    .block-container > div {
-        animation: fadeIn 0.3s ease-out;
-    }
-    </style>
-    """, unsafe_allow_html=True)
+    st.markdown(load_stylesheet(STYLESHEET_PATH), unsafe_allow_html=True)
 
-inject_custom_css()
+def init_session_state():
+    """Initialize session state for authentication and data storage"""
+    if 'authenticated' not in st.session_state:
+        st.session_state.authenticated = False
 
-# Initialize session state for authentication and data storage
-if 'authenticated' not in st.session_state:
-    st.session_state.authenticated = False
+    if 'username' not in st.session_state:
+        st.session_state.username = None
+
+    if 'session_id' not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+        # Lets the memory governor forget this session once Streamlit discards its state
+        st.session_state.memory_token = memory.SessionToken()
+        memory.get_governor().register(st.session_state.session_id, st.session_state.memory_token)
+
+    if 'data_loaded' not in st.session_state:
+        clear_worksheet_data()
+
+# Session state attribute holding each worksheet's DataFrame
+WORKSHEET_STATE_KEYS = {
+    "ESD": "esd_data",
+    "CMF": "cmf_data",
+    "Transistor": "transistor_data",
+    "MOS": "mos_data",
+    "SKY": "sky_data",
+    "Zener": "zener_data",
+    "PowerSwitch": "PowerSwitch_data",
+    "TVS": "tvs_data",
+    "Misc": "Misc_data",
+    "SDOthers": "SDOthers_data",
+    "QuoteUSD": "quote_usd_data",
+    "QuoteRMB": "quote_rmb_data",
+}
+
+# Worksheets each page needs before it can render. Pages that work on a single
+# selected category load that tab on demand through get_cached_data().
+PAGE_WORKSHEETS = {
+    "Dashboard": PRODUCT_CATEGORIES + QUOTE_SHEETS,
+    "Price Lookup": QUOTE_SHEETS,
+    "Product Details": [],
+    "Data Management": [],
+}
+
+# Concurrent Sheets requests when a page needs several worksheets at once
+FETCH_WORKERS = 4
+
+# Memoized Latest Quotes lookups kept per session
+QUOTE_LOOKUP_CACHE_SIZE = 256
+
+# Result page sizes offered in Price Lookup
+LOOKUP_PAGE_SIZES = [50, 100, 250, 500]
+LOOKUP_SHEET_ORDER = "Sheet order"
+SIMILAR_PARTS_COUNT = 10
+# Price history resolutions (pandas period codes; None plots every quote) and smoothing window
+HISTORY_RESOLUTIONS = {"Each Quote": None, "Monthly": "M", "Quarterly": "Q"}
+HISTORY_ROLLING_WINDOW = "90D"
+# Dashboard timeline ranges in months; None shows every quote
+TIMELINE_RANGES = {"Last 6 Months": 6, "Last 12 Months": 12, "Last 24 Months": 24, "All Time": None}
+# Margin report orderings and row counts
+MARGIN_SORT_COLUMNS = ["Margin %", "Markup %", "Distributor Margin %"]
+MARGIN_REPORT_SIZES = [25, 50, 100, 250]
+# Rows shown in the dashboard's price anomaly report
+ANOMALY_REPORT_SIZE = 100
+# Exports larger than this many rows are written on a background thread
+EXPORT_BACKGROUND_ROWS = 20000
+EXPORT_POLL_SECONDS = 1
+# Quotation part lists are prefilled from results with at most this many rows
+QUOTATION_PREFILL_ROWS = 50
 
-if 'username' not in st.session_state:
-    st.session_state.username = None
+def get_fx_rates():
+    """Dated FX rate table (QMS_FX_RATES, [fx] path in secrets, or fx_rates.csv), or None if missing.
+    
+    Without one every conversion is hidden rather than done at a made-up rate.
+    """
+    path = os.environ.get("QMS_FX_RATES")
+    if not path:
+        try:
+            path = st.secrets["fx"]["path"]
+        except Exception:
+            path = fx.DEFAULT_RATES_PATH
+    try:
+        return fx.get_rates(path)
+    except (OSError, ValueError, KeyError):
+        return None
+
+def get_aliases_path():
+    """Customer/distributor alias map (QMS_NAME_ALIASES, [names] path in secrets, or name_aliases.json)"""
+    path = os.environ.get("QMS_NAME_ALIASES")
+    if not path:
+        try:
+            path = st.secrets["names"]["path"]
+        except Exception:
+            path = names.DEFAULT_ALIASES_PATH
+    return path
+
+def get_quote_archive():
+    """Archive of old quotes (QMS_ARCHIVE_DIR or [archive] directory in secrets), or None when not configured"""
+    directory = os.environ.get("QMS_ARCHIVE_DIR")
+    if not directory:
+        try:
+            directory = st.secrets["archive"]["directory"]
+        except Exception:
+            return None
+    return archive.get_archive(directory)
+
+def get_reporting_currency():
+    """Currency chosen in the sidebar for cross-currency comparisons"""
+    return st.session_state.get('reporting_currency') or fx.REPORTING_CURRENCIES[0]
+
+def get_invalidation_bus():
+    """Change broadcast shared with other sessions, and other workers when a log path is configured"""
+    path = os.environ.get("QMS_INVALIDATION_LOG")
+    if not path:
+        try:
+            path = st.secrets["invalidation"]["path"]
+        except Exception:
+            path = None
+    return get_bus(path)
+
+@st.cache_resource(show_spinner=False)
+def start_api_server():
+    """Serve the read-only JSON API from this process's snapshot when QMS_API_PORT or [api] port is set.
+
+    Runs once per process; returns the server, or None when it is not configured or could not bind.
+    """
+    settings = {}
+    try:
+        settings = dict(st.secrets["api"])
+    except Exception:
+        pass
+    port = os.environ.get("QMS_API_PORT") or settings.get("port")
+    reader = get_snapshot_reader()
+    if not port or reader is None:
+        return None
+    host = os.environ.get("QMS_API_HOST") or settings.get("host", "127.0.0.1")
+    token = os.environ.get("QMS_API_TOKEN") or settings.get("token")
+    from qms import api
+    try:
+        quote_archive = get_quote_archive()
+        return api.start_server(reader, host, int(port), get_aliases_path(), token,
+                                quote_archive.directory if quote_archive is not None else None)
+    except OSError as e:
+        # Usually another app worker on this machine already serves the port
+        logger.warning("JSON API not started on %s:%s: %s", host, port, e)
+        return None
 
-if 'data_loaded' not in st.session_state:
+def configure_memory_budget():
+    """Apply the memory budgets (QMS_SESSION_MEMORY_MB, QMS_MEMORY_MB, QMS_MEMORY_IDLE_MINUTES or [memory] in secrets)"""
+    settings = {}
+    try:
+        settings = dict(st.secrets["memory"])
+    except Exception:
+        pass
+    session_mb = os.environ.get("QMS_SESSION_MEMORY_MB") or settings.get("session_mb", memory.DEFAULT_SESSION_BUDGET_MB)
+    process_mb = os.environ.get("QMS_MEMORY_MB") or settings.get("process_mb", memory.DEFAULT_PROCESS_BUDGET_MB)
+    idle_minutes = os.environ.get("QMS_MEMORY_IDLE_MINUTES") or settings.get("idle_minutes",
+                                                                          memory.DEFAULT_IDLE_SECONDS / 60)
+    memory.get_governor().configure(int(float(session_mb) * memory.MB), int(float(process_mb) * memory.MB),
+                                    float(idle_minutes) * 60)
+
+def get_derived(name):
+    """A derived object this session stored with put_derived, or None if it was never built or was evicted"""
+    return memory.get_governor().get(st.session_state.session_id, name)
+
+def put_derived(name, value):
+    """Hand a derived object to the memory governor; worksheet frames it refers to are not charged to it"""
+    memory.get_governor().put(st.session_state.session_id, name, value, exclude=get_worksheet_frame_ids())
+    return value
+
+def get_or_build_derived(name, key, build):
+    """The derived object stored under name for key, made by build(previous) when missing, evicted or out of date.
+    
+    previous is the out-of-date object, for incremental rebuilds, or None. The entry is looked up once, so
+    another session evicting it meanwhile cannot leave the caller without it.
+    """
+    cached = get_derived(name)
+    if cached is None or cached[0] != key:
+        cached = put_derived(name, (key, build(None if cached is None else cached[1])))
+    return cached[1]
+
+def get_worksheet_frame_ids():
+    """ids of the worksheet and All Products frames this session holds"""
+    frames = [st.session_state.get(state_key) for state_key in WORKSHEET_STATE_KEYS.values()]
+    frames.append(st.session_state.union_view.built_frame)
+    return {id(frame) for frame in frames if frame is not None}
+
+def report_worksheet_memory():
+    """Tell the memory governor how much worksheet data this session holds.
+    
+    Frames served from the snapshot are one memory-mapped copy shared by every session in the process,
+    so they are reported by snapshot version and tab and counted once, not charged to this session.
+    """
+    frames = {name: st.session_state.get(state_key) for name, state_key in WORKSHEET_STATE_KEYS.items()}
+    # Measured again only when a worksheet or the All Products view has changed
+    key = (tuple(id(frame) for frame in frames.values()), st.session_state.union_view.version)
+    if st.session_state.get('worksheet_memory_key') == key:
+        return
+    reader = get_snapshot_reader()
+    current = reader.current() if reader is not None else None
+    snapshot_tables = current.tables if current is not None else {}
+    nbytes, shared = 0, {}
+    for name, frame in frames.items():
+        if frame is None:
+            continue
+        if snapshot_tables.get(name) is frame:
+            shared[('snapshot', current.version, name)] = memory.estimate_bytes(frame)
+        else:
+            nbytes += memory.estimate_bytes(frame)
+    nbytes += memory.estimate_bytes(st.session_state.union_view, exclude={id(frame) for frame in frames.values()})
+    memory.get_governor().set_worksheet_bytes(st.session_state.session_id, nbytes, shared)
+    st.session_state.worksheet_memory_key = key
+
+def clear_worksheet_data():
+    """Drop all worksheet data from session state"""
+    prefetcher = st.session_state.get('prefetcher')
+    if prefetcher is not None:
+        prefetcher.cancel()
+    for state_key in WORKSHEET_STATE_KEYS.values():
+        st.session_state[state_key] = None
+    # Versions keep counting across reloads so derived caches never see a reused number
+    if 'worksheet_versions' not in st.session_state:
+        st.session_state.worksheet_versions = {}
+    # Release derived objects before anything is reloaded, not when their replacements are built
+    memory.get_governor().discard(st.session_state.session_id)
+    st.session_state.union_view = UnionView(PRODUCT_CATEGORIES)
+    st.session_state.quote_lookup_cache = LRUCache(QUOTE_LOOKUP_CACHE_SIZE)
+    st.session_state.loaded_worksheets = set()
+    st.session_state.live_worksheets = set()
+    st.session_state.snapshot_version = None
+    st.session_state.prefetch_attempted = set()
+    st.session_state.prefetcher = None
     st.session_state.data_loaded = False
-    st.session_state.esd_data = None
-    st.session_state.cmf_data = None
-    st.session_state.transistor_data = None
-    st.session_state.mos_data = None
     st.session_state.last_refresh = None
-    st.session_state.sky_data = None
-    st.session_state.zener_data = None
-    st.session_state.PowerSwitch_data = None
-    st.session_state.Misc_data = None
-    st.session_state.SDOthers_data = None
-    st.session_state.tvs_data = None
-    st.session_state.quote_usd_data = None
-    st.session_state.quote_rmb_data = None
+    # Everything is reloaded from here on, so earlier change events are already covered
+    st.session_state.invalidation_cursor = get_invalidation_bus().cursor()
 
 def authenticate_user(username, password):
     """Authenticate user with credentials from secrets"""
@@ -391,49 +362,43 @@ def logout():
     """Logout function"""
     st.session_state.authenticated = False
     st.session_state.username = None  # Clear username on logout
-    st.session_state.data_loaded = False
-    st.session_state.esd_data = None
-    st.session_state.cmf_data = None
-    st.session_state.transistor_data = None
-    st.session_state.mos_data = None
-    st.session_state.last_refresh = None
-    st.session_state.sky_data = None
-    st.session_state.zener_data = None
-    st.session_state.PowerSwitch_data = None
-    st.session_state.Misc_data = None
-    st.session_state.SDOthers_data = None
-    st.session_state.tvs_data = None
-    st.session_state.quote_usd_data = None
-    st.session_state.quote_rmb_data = None
+    clear_worksheet_data()
     st.rerun()
 
+def get_spreadsheet():
+    """Open the configured Google Sheets spreadsheet"""
+    return open_spreadsheet(st.secrets["connections"]["gsheets"])
+
+def get_snapshot_reader():
+    """Shared Arrow snapshot reader when a snapshot directory is configured, otherwise None"""
+    directory = os.environ.get("QMS_SNAPSHOT_DIR")
+    if not directory:
+        try:
+            directory = st.secrets["snapshot"]["directory"]
+        except Exception:
+            return None
+    return snapshot.get_reader(directory)
+
+def fetch_worksheet(worksheet_name, live=False):
+    """Fetch one worksheet as a DataFrame; raises on failure and never touches the UI.
+    
+    With a snapshot configured, reads come from the memory-mapped snapshot
+    unless live is set (used for tabs this session has just written to).
+    """
+    if not live:
+        reader = get_snapshot_reader()
+        current = reader.current() if reader is not None else None
+        if current is not None and worksheet_name in current.tables:
+            return current.tables[worksheet_name]
+    
+    sheet = get_spreadsheet()
+    worksheet = sheet.worksheet(worksheet_name)
+    return worksheet_frame(worksheet_name, worksheet.get_all_records())
+
 def load_google_sheet(worksheet_name):
     """Load data from specific Google Sheets worksheet"""
     try:
-        creds_info = st.secrets["connections"]["gsheets"]
-        
-        scope = [
-            "https://spreadsheets.google.com/feeds",
-            "https://www.googleapis.com/auth/drive"
-        ]
-        
-        credentials = Credentials.from_service_account_info(creds_info, scopes=scope)
-        gc = gspread.authorize(credentials)
-        sheet = gc.open_by_url(creds_info["spreadsheet"])
-        worksheet = sheet.worksheet(worksheet_name)
-        data = worksheet.get_all_records()
-        
-        if data:
-            df = pd.DataFrame(data)
-            # Convert Quote Date to datetime with flexible parsing for both formats
-            if 'Quote Date' in df.columns:
-                # Handle both 'YYYY.MM.DD' and 'YYYY-MM-DD' formats
-                df['Quote Date'] = df['Quote Date'].apply(lambda x: 
-                    pd.to_datetime(str(x).replace('.', '-'), errors='coerce') if x else None)
-            return df
-        else:
-            return pd.DataFrame()
-            
+        return fetch_worksheet(worksheet_name)
     except Exception as e:
         st.error(f"Error loading {worksheet_name} sheet: {str(e)}")
         return None
@@ -441,15 +406,7 @@ def load_google_sheet(worksheet_name):
 def update_google_sheet(worksheet_name, data_dict, row_index=None):
     """Update Google Sheets with new/modified data"""
     try:
-        creds_info = st.secrets["connections"]["gsheets"]
-        scope = [
-            "https://spreadsheets.google.com/feeds",
-            "https://www.googleapis.com/auth/drive"
-        ]
-        
-        credentials = Credentials.from_service_account_info(creds_info, scopes=scope)
-        gc = gspread.authorize(credentials)
-        sheet = gc.open_by_url(creds_info["spreadsheet"])
+        sheet = get_spreadsheet()
         worksheet = sheet.worksheet(worksheet_name)
         
         if row_index is None:
@@ -559,11 +516,106 @@ def display_data_management():
         return
     
     # Operation selection
-    operation = st.radio("Select Operation:", ["Add New Quote"], horizontal=True)
+    operation = st.radio("Select Operation:", ["Add New Quote", "Name Aliases", "Memory"], horizontal=True)
 
     if operation == "Add New Quote":
         display_add_product_form(category)
+    elif operation == "Name Aliases":
+        display_name_aliases()
+    elif operation == "Memory":
+        display_memory_usage()
+
+def display_memory_usage():
+    """Worksheet and derived-object memory of every session against the budgets"""
+    governor = memory.get_governor()
+    report_worksheet_memory()
+    sessions = pd.DataFrame(governor.sessions(), columns=['session', 'worksheet_bytes', 'shared_bytes',
+                                                          'derived_bytes', 'objects', 'idle_seconds'])
+    total = governor.total_bytes()
+    own = sessions[sessions['session'] == st.session_state.session_id]
+    own_total = int(own['worksheet_bytes'].sum() + own['derived_bytes'].sum())
+    
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Process", f"{total / memory.MB:,.1f} MB", f"budget {governor.process_budget / memory.MB:,g} MB",
+                delta_color="off")
+    col2.metric("This session", f"{own_total / memory.MB:,.1f} MB",
+                f"budget {governor.session_budget / memory.MB:,g} MB", delta_color="off")
+    col3.metric("Evictions", f"{governor.evictions:,}", f"{governor.evicted_bytes / memory.MB:,.1f} MB freed",
+                delta_color="off")
+    
+    st.subheader("Sessions")
+    st.caption("Snapshot tabs are one memory-mapped copy shared by every session; the process total counts them once")
+    st.dataframe(pd.DataFrame({
+        'Session': sessions['session'].str[:8] + sessions['session'].eq(st.session_state.session_id).map({True: " (you)", False: ""}),
+        'Worksheets (MB)': (sessions['worksheet_bytes'] / memory.MB).round(2),
+        'Shared snapshot (MB)': (sessions['shared_bytes'] / memory.MB).round(2),
+        'Derived (MB)': (sessions['derived_bytes'] / memory.MB).round(2),
+        'Objects': sessions['objects'],
+        'Idle (min)': (sessions['idle_seconds'] / 60).round(1),
+    }).sort_values('Derived (MB)', ascending=False), width='stretch', hide_index=True)
+    
+    st.subheader("This session's derived objects")
+    st.caption(f"Least recently used first; evicted first when over budget or idle for "
+               f"{governor.idle_seconds / 60:g} minutes, and rebuilt when next needed")
+    objects = governor.objects(st.session_state.session_id)
+    st.dataframe(pd.DataFrame({
+        'Object': [name if isinstance(name, str) else " / ".join(map(str, name)) for name, _, _ in objects],
+        'Size (MB)': [round(nbytes / memory.MB, 3) for _, nbytes, _ in objects],
+        'Idle (min)': [round(idle / 60, 1) for _, _, idle in objects],
+    }), width='stretch', hide_index=True)
+    if st.button("Release this session's derived objects", key="memory_release"):
+        governor.discard(st.session_state.session_id)
+        st.rerun()
+
+def save_name_aliases(aliases):
+    """Persist the alias map; every session picks it up on its next run"""
+    try:
+        names.save_aliases(aliases, get_aliases_path())
+    except OSError as e:
+        st.error(f"Error saving aliases: {str(e)}")
+        return False
+    return True
+
+def display_name_aliases():
+    """Review merge suggestions and edit the customer/distributor alias map"""
+    st.subheader("🔗 Customer and Distributor Names")
+    kind = st.radio("Names", names.NAME_KINDS, horizontal=True, key="alias_kind")
+    canonicalizer = get_name_canonicalizers()[kind]
+    aliases = get_name_aliases()
+    
+    spellings = len(canonicalizer.mapping)
+    canonical_count = len(set(canonicalizer.mapping.values()))
+    st.caption(f"{spellings} spellings shown as {canonical_count} {kind.lower()} names")
+    
+    st.markdown("**Suggested merges**")
+    suggestions = canonicalizer.suggestions()
+    if suggestions.empty:
+        st.info("No likely spelling variants left to merge")
+    else:
+        with st.form(f"alias_suggestions_{kind}"):
+            edited = st.data_editor(
+                suggestions.assign(Merge=False), hide_index=True, width='stretch',
+                disabled=['Name', 'Suggested', 'Similarity', 'Quotes'], key=f"alias_suggestions_editor_{kind}"
+            )
+            if st.form_submit_button("Merge selected"):
+                selected = edited[edited['Merge']]
+                aliases[kind].update(zip(selected['Name'], selected['Suggested']))
+                if len(selected) and save_name_aliases(aliases):
+                    st.rerun()
+    
+    st.markdown("**Aliases**")
+    current = pd.DataFrame(sorted(aliases[kind].items()), columns=['Variant', 'Canonical'])
+    with st.form(f"alias_map_{kind}"):
+        edited = st.data_editor(current, num_rows="dynamic", hide_index=True, width='stretch',
+                                key=f"alias_map_editor_{kind}")
+        if st.form_submit_button("Save aliases"):
+            rows = edited.dropna().astype(str)
+            rows = rows[rows['Variant'].str.strip().ne('') & rows['Canonical'].str.strip().ne('')]
+            aliases[kind] = dict(zip(rows['Variant'].str.strip(), rows['Canonical'].str.strip()))
+            if save_name_aliases(aliases):
+                st.rerun()
 
+@st.fragment
 def display_add_product_form(category):
     """Display form to add new product"""
     st.subheader(f"➕ Add New {category} Product")
@@ -708,62 +760,187 @@ def display_add_product_form(category):
                 
                 if success:
                     st.success(message)
-                    st.session_state.data_loaded = False  # Force refresh
+                    publish_worksheet_change(category)  # Reload this tab on next use, here and in other sessions
                     st.rerun()
                 else:
                     st.error(message)
             else:
                 st.error(f"{required_field} is required!")
 
+class WorksheetPrefetcher:
+    """Fetches worksheets on a background thread after the page has rendered.
+
+    The thread only fills this object's results; the session adopts them on
+    its next script run, so session state is never touched off-thread.
+    """
+    
+    def __init__(self, worksheet_names, live_worksheets=()):
+        self.worksheet_names = list(worksheet_names)
+        self.live_worksheets = set(live_worksheets)
+        self.results = {}
+        self.discarded = set()
+        self.cancelled = False
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="worksheet-prefetch", daemon=True)
+        self._thread.start()
+    
+    def _run(self):
+        # One worksheet at a time to stay gentle on the Sheets read quota
+        for worksheet_name in self.worksheet_names:
+            if self.cancelled:
+                return
+            try:
+                result = fetch_worksheet(worksheet_name, live=worksheet_name in self.live_worksheets)
+            except Exception as e:
+                result = e
+            with self._lock:
+                if worksheet_name not in self.discarded:
+                    self.results[worksheet_name] = result
+    
+    def discard(self, worksheet_name):
+        """Drop a result that went stale while it was being fetched"""
+        with self._lock:
+            self.discarded.add(worksheet_name)
+            self.results.pop(worksheet_name, None)
+    
+    def cancel(self):
+        self.cancelled = True
+    
+    def take(self):
+        """Return and forget the results fetched so far"""
+        with self._lock:
+            results, self.results = self.results, {}
+        return results
+    
+    def is_alive(self):
+        return self._thread.is_alive()
+
+def fetch_worksheets(worksheet_names, live_worksheets=()):
+    """Fetch several worksheets concurrently; maps each name to a DataFrame or the exception raised"""
+    results = {}
+    with ThreadPoolExecutor(max_workers=min(FETCH_WORKERS, len(worksheet_names))) as pool:
+        futures = {name: pool.submit(fetch_worksheet, name, name in live_worksheets) for name in worksheet_names}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                results[name] = e
+    return results
+
+def store_worksheet(worksheet_name, df):
+    """Store a loaded worksheet in session state"""
+    st.session_state[WORKSHEET_STATE_KEYS[worksheet_name]] = df
+    st.session_state.loaded_worksheets.add(worksheet_name)
+    versions = st.session_state.worksheet_versions
+    versions[worksheet_name] = versions.get(worksheet_name, 0) + 1
+    st.session_state.data_loaded = len(st.session_state.loaded_worksheets) == len(WORKSHEET_STATE_KEYS)
+    st.session_state.last_refresh = datetime.now()
+
+def adopt_prefetched_worksheets():
+    """Move worksheets finished by the background prefetcher into session state"""
+    prefetcher = st.session_state.get('prefetcher')
+    if prefetcher is None:
+        return
+    for worksheet_name, result in prefetcher.take().items():
+        # Failed prefetches are left unloaded and retried on demand
+        if worksheet_name not in st.session_state.loaded_worksheets and not isinstance(result, Exception):
+            store_worksheet(worksheet_name, result)
+
+def ensure_worksheets_loaded(worksheet_names):
+    """Load any of the given worksheets this session does not have yet"""
+    adopt_prefetched_worksheets()
+    missing = [name for name in worksheet_names if name not in st.session_state.loaded_worksheets]
+    if not missing:
+        return
+    
+    with st.spinner("Loading data from Google Sheets..."):
+        for worksheet_name, result in fetch_worksheets(missing, st.session_state.live_worksheets).items():
+            if isinstance(result, Exception):
+                st.error(f"Error loading {worksheet_name} sheet: {str(result)}")
+                result = None
+            store_worksheet(worksheet_name, result)
+
+def invalidate_worksheet(worksheet_name, written=False):
+    """Mark one worksheet stale so it is reloaded the next time a page needs it.
+    
+    written marks a tab this session just changed; it is read live from Sheets
+    until a newer snapshot (which includes the change) is published.
+    """
+    if written:
+        st.session_state.live_worksheets.add(worksheet_name)
+    st.session_state.loaded_worksheets.discard(worksheet_name)
+    st.session_state.prefetch_attempted.discard(worksheet_name)
+    st.session_state.data_loaded = False
+    prefetcher = st.session_state.get('prefetcher')
+    if prefetcher is not None:
+        prefetcher.discard(worksheet_name)
+
+def publish_worksheet_change(worksheet_name):
+    """Invalidate a worksheet this session wrote to and tell every other session about it"""
+    invalidate_worksheet(worksheet_name, written=True)
+    get_invalidation_bus().publish(worksheet_name, origin=st.session_state.session_id)
+
+def apply_worksheet_changes():
+    """Mark stale the worksheets other sessions changed since this session last looked"""
+    events, st.session_state.invalidation_cursor = get_invalidation_bus().poll(st.session_state.invalidation_cursor)
+    for event in events:
+        if event["origin"] != st.session_state.session_id:
+            # The change is newer than any snapshot, so read that tab live
+            invalidate_worksheet(event["worksheet"], written=True)
+
+def start_background_prefetch():
+    """Prefetch the worksheets no page has asked for yet, once per worksheet"""
+    prefetcher = st.session_state.get('prefetcher')
+    if prefetcher is not None and prefetcher.is_alive():
+        return
+    pending = [name for name in WORKSHEET_STATE_KEYS
+               if name not in st.session_state.loaded_worksheets and name not in st.session_state.prefetch_attempted]
+    if pending:
+        st.session_state.prefetch_attempted.update(pending)
+        st.session_state.prefetcher = WorksheetPrefetcher(pending, st.session_state.live_worksheets)
+
+def sync_snapshot_version():
+    """Switch this session to the newest published snapshot, if snapshots are in use"""
+    reader = get_snapshot_reader()
+    if reader is None:
+        return
+    current = reader.current()
+    version = current.version if current is not None else None
+    if version != st.session_state.snapshot_version:
+        # Remapping from the new version is cheap, so every loaded tab is refreshed
+        for worksheet_name in list(st.session_state.loaded_worksheets):
+            invalidate_worksheet(worksheet_name)
+        st.session_state.live_worksheets = set()
+        st.session_state.snapshot_version = version
+
 def load_all_data():
     """Load all data from Google Sheets and store in session state"""
-    with st.spinner("Loading data from Google Sheets..."):
-        st.session_state.esd_data = load_google_sheet("ESD")
-        st.session_state.cmf_data = load_google_sheet("CMF")
-        st.session_state.transistor_data = load_google_sheet("Transistor")
-        st.session_state.mos_data = load_google_sheet("MOS")
-        st.session_state.sky_data = load_google_sheet("SKY")
-        st.session_state.zener_data = load_google_sheet("Zener")
-        st.session_state.PowerSwitch_data = load_google_sheet("PowerSwitch")
-        st.session_state.Misc_data = load_google_sheet("Misc")
-        st.session_state.SDOthers_data = load_google_sheet("SDOthers")
-        st.session_state.tvs_data = load_google_sheet("TVS")
-        st.session_state.quote_usd_data = load_google_sheet("QuoteUSD")
-        st.session_state.quote_rmb_data = load_google_sheet("QuoteRMB")
-        st.session_state.data_loaded = True
-        st.session_state.last_refresh = datetime.now()
+    st.session_state.loaded_worksheets = set()
+    ensure_worksheets_loaded(list(WORKSHEET_STATE_KEYS))
+
+def refresh_loaded_worksheets():
+    """Reload the worksheets this session has loaded so far"""
+    worksheet_names = list(st.session_state.loaded_worksheets)
+    st.session_state.loaded_worksheets = set()
+    ensure_worksheets_loaded(worksheet_names)
+
+def get_worksheet_version(worksheet_name):
+    """Number of times this session has loaded a worksheet; changes whenever its data does"""
+    return st.session_state.worksheet_versions.get(worksheet_name, 0)
+
+def get_quotes_version():
+    """Changes whenever either quote tab or the name alias map does"""
+    return (get_worksheet_version("QuoteUSD"), get_worksheet_version("QuoteRMB"),
+            names.aliases_version(get_aliases_path()))
 
 def get_cached_data(category):
-    """Get cached data for specific category"""
-    if not st.session_state.data_loaded:
-        load_all_data()
-    
-    if category == "ESD":
-        return st.session_state.esd_data
-    elif category == "CMF":
-        return st.session_state.cmf_data
-    elif category == "Transistor":
-        return st.session_state.transistor_data
-    elif category == "MOS":
-        return st.session_state.mos_data
-    elif category == "SKY":
-        return st.session_state.sky_data
-    elif category == "Zener":
-        return st.session_state.zener_data
-    elif category == "PowerSwitch":
-        return st.session_state.PowerSwitch_data
-    elif category == "Misc":
-        return st.session_state.Misc_data
-    elif category == "SDOthers":
-        return st.session_state.SDOthers_data
-    elif category == "TVS":
-        return st.session_state.tvs_data
-    elif category == "QuoteUSD":
-        return st.session_state.quote_usd_data
-    elif category == "QuoteRMB":
-        return st.session_state.quote_rmb_data
-    else:
+    """Get cached data for specific category, loading that worksheet on first use"""
+    state_key = WORKSHEET_STATE_KEYS.get(category)
+    if state_key is None:
         return None
+    
+    ensure_worksheets_loaded([category])
+    return st.session_state[state_key]
 
 def get_latest_quotes(product_category, product_name):
     """Get latest quotes for a specific product from both USD and RMB sheets"""
@@ -871,6 +1048,158 @@ def get_latest_quotes(product_category, product_name):
     
     return quotes
 
+def get_quotes_dataframe():
+    """Dated quotes for the dashboard, from the same normalized table the analytics pages use"""
+    quotes = get_normalized_quotes()
+    quotes = quotes[quotes['Quote_Date'].notna()]
+    return quotes if not quotes.empty else None
+
+def get_normalized_quotes_and_canonicalizers():
+    """Both quote tabs flattened to one typed row per quote, and the name canonicalizers used on them"""
+    return get_or_build_derived('normalized_quotes', get_quotes_version(), lambda previous: normalized_quotes(
+        get_cached_data("QuoteUSD"), get_cached_data("QuoteRMB"), get_name_aliases()
+    ))
+
+def get_normalized_quotes():
+    """Both quote tabs flattened to one typed row per quote, rebuilt only when a quote tab changes"""
+    return get_normalized_quotes_and_canonicalizers()[0]
+
+def get_name_aliases():
+    """Persisted customer/distributor aliases; an unreadable file counts as none"""
+    try:
+        return names.load_aliases(get_aliases_path())
+    except (OSError, ValueError):
+        return {kind: {} for kind in names.NAME_KINDS}
+
+def get_name_canonicalizers():
+    """Canonical customer and distributor names for the current quotes and alias map"""
+    return get_normalized_quotes_and_canonicalizers()[1]
+
+def get_quote_history():
+    """Quotes in the sheet and in the archive as one table with canonical names, rebuilt only when either changes"""
+    quote_archive = get_quote_archive()
+    if quote_archive is None:
+        return get_normalized_quotes()
+    def build(previous):
+        hot = pd.concat([normalize_quotes(get_cached_data("QuoteUSD"), "USD"),
+                         normalize_quotes(get_cached_data("QuoteRMB"), "RMB")], ignore_index=True)
+        return normalized_quotes(None, None, get_name_aliases(), archive.union_quotes(hot, quote_archive))[0]
+    return get_or_build_derived('quote_history', (get_quotes_version(), quote_archive.version), build)
+
+def get_quote_history_version():
+    """Changes whenever the quote tabs, the alias map or the archive do"""
+    quote_archive = get_quote_archive()
+    return (get_quotes_version(), quote_archive.version if quote_archive is not None else None)
+
+def get_price_history():
+    """Per-product price history over the sheet and the archive, updated incrementally when either changes"""
+    def build(previous):
+        history = previous if previous is not None else PriceHistory()
+        history.update(get_quote_history())
+        return history
+    return get_or_build_derived('price_history', get_quote_history_version(), build)
+
+def get_quote_anomalies():
+    """Per-product price statistics for checking new quotes, updated incrementally when the history changes"""
+    def build(previous):
+        anomalies = previous if previous is not None else QuoteAnomalies()
+        anomalies.update(get_quote_history())
+        return anomalies
+    return get_or_build_derived('quote_anomalies', get_quote_history_version(), build)
+
+def get_anomaly_report():
+    """Outlier quotes across the whole history, archive included, rescanned only when it changes"""
+    return get_or_build_derived('anomaly_report', get_quote_history_version(),
+                                lambda previous: scan_quote_anomalies(get_quote_history()))
+
+def get_reporting_quotes():
+    """Normalized quotes with prices converted to the reporting currency as of each quote date"""
+    rates = get_fx_rates()
+    if rates is None:
+        return None
+    currency = get_reporting_currency()
+    return get_or_build_derived('reporting_quotes', (get_quotes_version(), currency, id(rates)),
+                                lambda previous: fx.convert_quotes(get_normalized_quotes(), rates, currency))
+
+def get_margin_report():
+    """Margins of every catalogue part against its latest quote, rebuilt only when the data or currency changes"""
+    rates = get_fx_rates()
+    if rates is None:
+        return None
+    catalogue = get_all_products_view()
+    currency = get_reporting_currency()
+    key = (st.session_state.union_view.version, get_quotes_version(), currency, id(rates))
+    return get_or_build_derived('margin_report', key,
+                                lambda previous: margin_table(catalogue, get_reporting_quotes(), rates, currency))
+
+@st.fragment
+def display_margin_report():
+    """Lowest-margin quoted parts; changing the ordering reruns only this fragment"""
+    st.subheader("Lowest Margins")
+    margins = get_margin_report()
+    if margins is None:
+        st.info("Margins need an exchange rate table: add fx_rates.csv (see fx_rates.example.csv) "
+                "or set QMS_FX_RATES")
+        return
+    
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        sort_by = st.selectbox("Sort by", MARGIN_SORT_COLUMNS, key="margin_sort")
+    with col2:
+        limit = st.selectbox("Rows", MARGIN_REPORT_SIZES, key="margin_rows")
+    
+    report = lowest_margins(margins, sort_by, limit)
+    if report.empty:
+        st.info("No quoted parts with a known cost")
+        return
+    
+    quoted = int(margins['Latest Quote'].notna().sum())
+    negative = int((margins[sort_by] < 0).sum())
+    st.caption(f"{quoted} quoted parts, {negative} below cost on {sort_by} ({get_reporting_currency()})")
+    report = report.copy()
+    report['Quote Date'] = report['Quote Date'].dt.strftime('%Y-%m-%d')
+    st.dataframe(
+        report.round(2), width='stretch', hide_index=True,
+        column_config={column: st.column_config.NumberColumn(format="%.1f%%") for column in MARGIN_SORT_COLUMNS}
+    )
+
+def display_anomaly_report():
+    """Historical quotes whose price is far from the product's norm or the customer's previous quote"""
+    st.subheader("Price Anomalies")
+    report = get_anomaly_report()
+    if report.empty:
+        st.success("No unusual quote prices found")
+        return
+    
+    st.caption(f"{len(report)} quotes look unusual; largest deviations first")
+    display_report = report.head(ANOMALY_REPORT_SIZE).copy()
+    display_report['Quote_Date'] = display_report['Quote_Date'].dt.strftime('%Y-%m-%d')
+    st.dataframe(display_report.round({'Robust Z': 1}), width='stretch', hide_index=True)
+
+@st.fragment
+def display_quotes_timeline(quotes_df):
+    """Quote activity over a chosen range; changing the range reruns only this fragment"""
+    range_label = st.selectbox("Timeline range", list(TIMELINE_RANGES), key="timeline_range")
+    months = TIMELINE_RANGES[range_label]
+    since = pd.Timestamp.now() - pd.DateOffset(months=months) if months else None
+    quote_archive = get_quote_archive()
+    if quote_archive is not None:
+        # Archived quotes in the range; only the archive years it overlaps are read
+        archived = quote_archive.read(since, columns=['Quote_Date', 'Currency'])
+        if not archived.empty:
+            quotes_df = pd.concat([quotes_df[['Quote_Date', 'Currency']], archived], ignore_index=True)
+    # Long ranges are bucketed by quarter or year to keep the chart small
+    timeline_counts, frequency_label = charts.quote_timeline(quotes_df, since)
+    
+    if not timeline_counts.empty:
+        fig_timeline = charts.cached_figure(
+            "timeline", timeline_counts, charts.timeline_line,
+            title=f"{frequency_label} Quotes Activity ({range_label})"
+        )
+        st.plotly_chart(fig_timeline, width='stretch')
+    else:
+        st.info(f"No quotes in the {range_label.lower()}")
+
 def display_dashboard():
     """Display main dashboard with key metrics"""
     st.title("Quotation Management System")
@@ -887,8 +1216,6 @@ def display_dashboard():
     Misc_data = get_cached_data("Misc")
     SDOthers_data = get_cached_data("SDOthers")
     tvs_data = get_cached_data("TVS")
-    quote_usd_data = get_cached_data("QuoteUSD")
-    quote_rmb_data = get_cached_data("QuoteRMB")
 
     # Calculate all counts first
     esd_count = len(esd_data) if esd_data is not None else 0
@@ -944,96 +1271,9 @@ def display_dashboard():
     st.subheader("Quotes Analysis")
     
     # Process quotes data for analysis
-    all_quotes = []
+    quotes_df = get_quotes_dataframe()
     
-    # Process USD quotes
-    if quote_usd_data is not None and not quote_usd_data.empty:
-        for _, row in quote_usd_data.iterrows():
-            for i in range(1, 9):  # DC-1 to DC-8
-                dc_col = f'DC-{i}'
-                date_col = f'Quote Date {i}'
-                distributor_col = f'Distributor-{i}'  # NEW: Individual distributor
-                
-                # Handle the inconsistent column naming for End Customer
-                if i == 3:
-                    customer_col = f'End Customers {i}'  # Note: "Customers" (plural) for column 3
-                elif i == 4:
-                    customer_col = f'End Customers {i}'  # Note: "Customers" (plural) for column 4
-                else:
-                    customer_col = f'End Customer {i}'   # Note: "Customer" (singular) for columns 1 & 2, 5-8
-                
-                # Check if the customer column exists in the dataframe, if not try the other variant
-                if customer_col not in row:
-                    # Try the alternative naming
-                    if i in [3, 4]:
-                        customer_col = f'End Customer {i}'  # Try singular
-                    else:
-                        customer_col = f'End Customers {i}'  # Try plural
-                
-                if (dc_col in row and customer_col in row and date_col in row and distributor_col in row and
-                    pd.notna(row[dc_col]) and pd.notna(row[customer_col]) and pd.notna(row[date_col])):
-                    
-                    # Get distributor value, default to 'N/A' if empty
-                    distributor_value = row.get(distributor_col, 'N/A')
-                    if pd.isna(distributor_value) or str(distributor_value).strip() == '':
-                        distributor_value = 'N/A'
-                    
-                    all_quotes.append({
-                        'Product_Category': row.get('Products', 'N/A'),
-                        'Product_Name': row.get('Product Name', 'N/A'),
-                        'Currency': 'USD',
-                        'Price': row[dc_col],
-                        'Customer': row[customer_col],
-                        'Quote_Date': pd.to_datetime(row[date_col], errors='coerce'),
-                        'Distributor': distributor_value  # NEW: Individual distributor per quote
-                    })
-
-    # Process RMB quotes
-    if quote_rmb_data is not None and not quote_rmb_data.empty:
-        for _, row in quote_rmb_data.iterrows():
-            for i in range(1, 9):  # DC-1 to DC-8
-                dc_col = f'DC-{i}'
-                date_col = f'Quote Date {i}'
-                distributor_col = f'Distributor-{i}'  # NEW: Individual distributor
-                
-                # Handle the inconsistent column naming for End Customer
-                if i == 3:
-                    customer_col = f'End Customers {i}'  # Note: "Customers" (plural) for column 3
-                elif i == 4:
-                    customer_col = f'End Customers {i}'  # Note: "Customers" (plural) for column 4
-                else:
-                    customer_col = f'End Customer {i}'   # Note: "Customer" (singular) for columns 1 & 2, 5-8
-                
-                # Check if the customer column exists in the dataframe, if not try the other variant
-                if customer_col not in row:
-                    # Try the alternative naming
-                    if i in [3, 4]:
-                        customer_col = f'End Customer {i}'  # Try singular
-                    else:
-                        customer_col = f'End Customers {i}'  # Try plural
-                
-                if (dc_col in row and customer_col in row and date_col in row and distributor_col in row and
-                    pd.notna(row[dc_col]) and pd.notna(row[customer_col]) and pd.notna(row[date_col])):
-                    
-                    # Get distributor value, default to 'N/A' if empty
-                    distributor_value = row.get(distributor_col, 'N/A')
-                    if pd.isna(distributor_value) or str(distributor_value).strip() == '':
-                        distributor_value = 'N/A'
-                    
-                    all_quotes.append({
-                        'Product_Category': row.get('Products', 'N/A'),
-                        'Product_Name': row.get('Product Name', 'N/A'),
-                        'Currency': 'RMB',
-                        'Price': row[dc_col],
-                        'Customer': row[customer_col],
-                        'Quote_Date': pd.to_datetime(row[date_col], errors='coerce'),
-                        'Distributor': distributor_value  # NEW: Individual distributor per quote
-                    })
-    
-    if all_quotes:
-        quotes_df = pd.DataFrame(all_quotes)
-        quotes_df = quotes_df.dropna(subset=['Quote_Date'])
-        
+    if quotes_df is not None:
         # Quotes metrics row
         col1, col2, col3, col4 = st.columns(4)
         
@@ -1060,47 +1300,31 @@ def display_dashboard():
             # Quotes by Product Category
             if not quotes_df.empty:
                 category_counts = quotes_df['Product_Category'].value_counts()
-                fig_category = px.pie(
-                    values=category_counts.values, 
-                    names=category_counts.index,
-                    title="Quotes Distribution by Product Category"
-                )
+                fig_category = charts.cached_figure("category", category_counts, charts.category_pie)
                 st.plotly_chart(fig_category, width='stretch')
         
         with col2:
             # Quotes by Currency
             if not quotes_df.empty:
                 currency_counts = quotes_df['Currency'].value_counts()
-                fig_currency = px.bar(
-                    x=currency_counts.index,
-                    y=currency_counts.values,
-                    title="Quotes by Currency",
-                    labels={'x': 'Currency', 'y': 'Number of Quotes'}
-                )
+                fig_currency = charts.cached_figure("currency", currency_counts, charts.currency_bar)
                 st.plotly_chart(fig_currency, width='stretch')
         
+        # USD and RMB quotes compared in one currency, converted as of each quote date
+        reporting_quotes = get_reporting_quotes()
+        if reporting_quotes is not None and reporting_quotes['Reporting_Price'].notna().any():
+            reporting_currency = get_reporting_currency()
+            medians = reporting_quotes.groupby('Product_Category')['Reporting_Price'].median().dropna().sort_values(ascending=False)
+            fig_medians = charts.cached_figure(
+                "category_medians", medians, charts.median_price_bar,
+                title=f"Median Quote Price by Category ({reporting_currency})"
+            )
+            st.plotly_chart(fig_medians, width='stretch')
+        
         # Recent Quotes Activity
         st.subheader("Recent Quotes Activity")
         
-        # Filter last 6 months for better visualization
-        six_months_ago = pd.Timestamp.now() - pd.DateOffset(months=6)
-        recent_quotes = quotes_df[quotes_df['Quote_Date'] >= six_months_ago]
-        
-        if not recent_quotes.empty:
-            # Group by month and currency
-            recent_quotes['Month'] = recent_quotes['Quote_Date'].dt.to_period('M')
-            monthly_counts = recent_quotes.groupby(['Month', 'Currency']).size().reset_index(name='Count')
-            monthly_counts['Month'] = monthly_counts['Month'].astype(str)
-            
-            fig_timeline = px.line(
-                monthly_counts, 
-                x='Month', 
-                y='Count', 
-                color='Currency',
-                title="Monthly Quotes Activity (Last 6 Months)",
-                markers=True
-            )
-            st.plotly_chart(fig_timeline, width='stretch')
+        display_quotes_timeline(quotes_df)
         
         # Top Customers
         st.subheader("Top Customers by Quote Volume")
@@ -1109,13 +1333,7 @@ def display_dashboard():
         col1, col2 = st.columns([1, 1])
         
         with col1:
-            fig_customers = px.bar(
-                x=top_customers.values,
-                y=top_customers.index,
-                orientation='h',
-                title="Top 10 Customers",
-                labels={'x': 'Number of Quotes', 'y': 'Customer'}
-            )
+            fig_customers = charts.cached_figure("customers", top_customers, charts.customers_bar)
             st.plotly_chart(fig_customers, width='stretch')
         
         with col2:
@@ -1125,6 +1343,13 @@ def display_dashboard():
             display_quotes = recent_quotes_display[['Product_Category', 'Product_Name', 'Currency', 'Price', 'Customer', 'Quote_Date']].copy()
             display_quotes['Quote_Date'] = display_quotes['Quote_Date'].dt.strftime('%Y-%m-%d')
             st.dataframe(display_quotes, width='stretch', hide_index=True)
+        
+        # Catalogue costs against the latest quotes
+        st.markdown("---")
+        display_margin_report()
+        
+        st.markdown("---")
+        display_anomaly_report()
     
     else:
         st.info("No quotes data available for analysis")
@@ -1132,126 +1357,24 @@ def display_dashboard():
 def add_quote_to_sheet(currency, product_category, product_name, price, customer, distributor, quote_date):
     """Add a new quote to the appropriate Google Sheets tab (QuoteUSD or QuoteRMB)"""
     try:
-        # Force price to 4 decimal places
-        price = round(float(price), 4)
-        
-        worksheet_name = f"Quote{currency}"
-        
-        creds_info = st.secrets["connections"]["gsheets"]
-        scope = [
-            "https://spreadsheets.google.com/feeds",
-            "https://www.googleapis.com/auth/drive"
-        ]
-        
-        credentials = Credentials.from_service_account_info(creds_info, scopes=scope)
-        gc = gspread.authorize(credentials)
-        sheet = gc.open_by_url(creds_info["spreadsheet"])
-        worksheet = sheet.worksheet(worksheet_name)
-        
-        # Format price with currency symbol and exactly 4 decimal places
-        if currency == "USD":
-            formatted_price = f"${price:.4f}"
-        else:  # RMB
-            formatted_price = f"¥{price:.4f}"
-        
-        # Get all existing data to find the right row or create new one
-        existing_data = worksheet.get_all_records()
-        existing_df = pd.DataFrame(existing_data) if existing_data else pd.DataFrame()
-        
-        # Look for existing row with same product category and product name
-        matching_row = None
-        row_index = None
-        
-        if not existing_df.empty:
-            mask = (
-                (existing_df['Products'].str.contains(product_category, case=False, na=False)) &
-                (existing_df['Product Name'].str.contains(product_name, case=False, na=False))
-            )
-            matching_rows = existing_df[mask]
-            
-            if not matching_rows.empty:
-                matching_row = matching_rows.iloc[0]
-                row_index = matching_rows.index[0]
-        
-        if matching_row is not None:
-            # Update existing row - find next available DC column
-            for i in range(1, 9):  # DC-1 to DC-8
-                dc_col = f'DC-{i}'
-                if pd.isna(matching_row.get(dc_col)) or matching_row.get(dc_col) == '':
-                    # Found empty slot, update this column and corresponding date/customer/distributor
-                    col_index_dc = list(existing_df.columns).index(dc_col) + 1  # +1 for gspread indexing
-                    
-                    # Find corresponding date, customer, and distributor columns
-                    date_col = f'Quote Date {i}'
-                    distributor_col = f'Distributor-{i}'
-                    if i == 3:
-                        customer_col = f'End Customers {i}'  # Note: plural for column 3
-                    elif i == 4:
-                        customer_col = f'End Customers {i}'  # Note: plural for column 4  
-                    else:
-                        customer_col = f'End Customer {i}'   # Note: singular for columns 1 & 2, 5-8
-                    
-                    try:
-                        col_index_date = list(existing_df.columns).index(date_col) + 1
-                        col_index_distributor = list(existing_df.columns).index(distributor_col) + 1
-                        col_index_customer = list(existing_df.columns).index(customer_col) + 1
-                    except ValueError:
-                        # If column doesn't exist, try alternative naming
-                        if i in [3, 4]:
-                            customer_col = f'End Customer {i}'  # Try singular
-                        else:
-                            customer_col = f'End Customers {i}'  # Try plural
-                        col_index_customer = list(existing_df.columns).index(customer_col) + 1
-                    
-                    # Update the cells (row_index + 2 because gspread is 1-indexed and row 1 is headers)
-                    worksheet.update_cell(row_index + 2, col_index_dc, formatted_price)  # Use formatted price
-                    worksheet.update_cell(row_index + 2, col_index_date, quote_date)
-                    worksheet.update_cell(row_index + 2, col_index_customer, customer)
-                    worksheet.update_cell(row_index + 2, col_index_distributor, distributor)  # NEW: Update distributor
-                    
-                    return True, f"Quote added to existing product record in {dc_col}"
-            
-            return False, "All DC columns are filled for this product. Cannot add more quotes."
-        
-        else:
-            # Create new row
-            # Updated headers structure for new quote sheets with individual distributors
-            headers = [
-                'Products', 'Product Name', 'Distributor-1',
-                'DC-1', 'End Customer 1', 'Quote Date 1',
-                'Distributor-2', 'DC-2', 'End Customer 2', 'Quote Date 2',
-                'Distributor-3', 'DC-3', 'End Customers 3', 'Quote Date 3',
-                'Distributor-4', 'DC-4', 'End Customers 4', 'Quote Date 4',
-                'Distributor-5', 'DC-5', 'End Customers 5', 'Quote Date 5',
-                'Distributor-6', 'DC-6', 'End Customers 6', 'Quote Date 6',
-                'Distributor-7', 'DC-7', 'End Customers 7', 'Quote Date 7',
-                'Distributor-8', 'DC-8', 'End Customers 8', 'Quote Date 8',
-            ]
-            
-            # Create new row data
-            new_row_data = [''] * len(headers)
-            
-            # Fill in the basic info
-            if 'Products' in headers:
-                new_row_data[headers.index('Products')] = product_category
-            if 'Product Name' in headers:
-                new_row_data[headers.index('Product Name')] = product_name
-            
-            # Add the quote in DC-1 with formatted price and distributor
-            if 'DC-1' in headers:
-                new_row_data[headers.index('DC-1')] = formatted_price  # Use formatted price
-            if 'Quote Date 1' in headers:
-                new_row_data[headers.index('Quote Date 1')] = quote_date
-            if 'End Customer 1' in headers:
-                new_row_data[headers.index('End Customer 1')] = customer
-            if 'Distributor-1' in headers:
-                new_row_data[headers.index('Distributor-1')] = distributor  # NEW: Add distributor
-            
-            worksheet.append_row(new_row_data)
-            return True, "New product quote record created"
-            
+        spreadsheet = get_spreadsheet()
     except Exception as e:
         return False, f"Error adding quote: {str(e)}"
+    return sheets.add_quote(spreadsheet, currency, product_category, product_name, price, customer, distributor,
+                            quote_date)
+
+def get_latest_quotes_cached(category, product_name):
+    """Latest quotes for a product, memoized until either quote tab is reloaded"""
+    key = (category, product_name, get_quotes_version())
+    quotes = st.session_state.quote_lookup_cache.get(key)
+    if quotes is None:
+        quotes = get_latest_quotes_with_distributor(category, product_name)
+        canonicalizers = get_name_canonicalizers()
+        for quote in quotes:
+            for kind, canonicalizer in canonicalizers.items():
+                quote[kind] = canonicalizer.canonical(quote[kind])
+        st.session_state.quote_lookup_cache.put(key, quotes)
+    return quotes
 
 def get_latest_quotes_with_distributor(category, product_name):
     """Get latest quotes for a product including distributor information"""
@@ -1259,13 +1382,8 @@ def get_latest_quotes_with_distributor(category, product_name):
     
     try:
         # Load both USD and RMB quote sheets
-        usd_data = st.session_state.get('quote_usd_data')
-        if usd_data is None:
-            usd_data = load_google_sheet("QuoteUSD")
-            
-        rmb_data = st.session_state.get('quote_rmb_data')
-        if rmb_data is None:
-            rmb_data = load_google_sheet("QuoteRMB")
+        usd_data = get_cached_data("QuoteUSD")
+        rmb_data = get_cached_data("QuoteRMB")
         
         # Process USD quotes
         if usd_data is not None and not usd_data.empty:
@@ -1404,6 +1522,7 @@ def format_price_display(price_value, currency="USD"):
     except (ValueError, TypeError):
         return str(price_value)  # Return original if conversion fails
 
+@st.fragment
 def display_add_quote_form(category, product_name):
     """Display form to add a new quote - IMPROVED VERSION with 4 decimal place enforcement"""
     st.subheader("➕ Add New Quote")
@@ -1445,6 +1564,18 @@ def display_add_quote_form(category, product_name):
                 return
             
             if price > 0 and customer.strip():
+                # Likely typos (e.g. a slipped decimal point) need a second submit to save
+                # The statistics are keyed by canonical names, so an alias spelling finds its customer
+                canonical_customer = get_name_canonicalizers()['Customer'].canonical(customer)
+                reasons = get_quote_anomalies().check(product_name, currency, price, canonical_customer)
+                submission = (category, product_name, currency, price, customer.strip())
+                if reasons and st.session_state.get('quote_anomaly_confirmed') != submission:
+                    st.session_state.quote_anomaly_confirmed = submission
+                    st.warning("This price looks unusual: " + "; ".join(reasons) +
+                               ". Check it, then press Add Quote again to save it anyway.")
+                    return
+                st.session_state.quote_anomaly_confirmed = None
+                
                 # Convert date to M/D/YYYY format (e.g., 8/25/2025)
                 quote_date_str = quote_date.strftime('%m/%d/%Y').lstrip('0').replace('/0', '/')
                 
@@ -1455,24 +1586,201 @@ def display_add_quote_form(category, product_name):
                 
                 if success:
                     st.success(message)
-                    # Force refresh of quote data
-                    if currency == "USD":
-                        st.session_state.quote_usd_data = None
-                    else:
-                        st.session_state.quote_rmb_data = None
-                    
-                    # Reload the specific quote data
-                    if currency == "USD":
-                        st.session_state.quote_usd_data = load_google_sheet("QuoteUSD")
-                    else:
-                        st.session_state.quote_rmb_data = load_google_sheet("QuoteRMB")
-                    
+                    # Reload only the quote tab that changed
+                    publish_worksheet_change(f"Quote{currency}")
                     st.rerun()
                 else:
                     st.error(message)
             else:
                 st.error("Please enter a valid price and customer name!")
 
+def get_all_products_view():
+    """All category tabs as one frame with a Category column, rebuilt only for tabs that changed"""
+    view = st.session_state.union_view
+    for category in PRODUCT_CATEGORIES:
+        view.update(category, get_cached_data(category), get_worksheet_version(category))
+    return view.frame()
+
+def get_loaded_products_view():
+    """All Products view over the category tabs this session has loaded, without loading the rest"""
+    view = st.session_state.union_view
+    for category in PRODUCT_CATEGORIES:
+        if category in st.session_state.loaded_worksheets:
+            view.update(category, get_cached_data(category), get_worksheet_version(category))
+    return view.frame()
+
+def get_search_engine(category, df, search_columns):
+    """Search engine for a Price Lookup category, rebuilt only when its data changes"""
+    if category == "All Products":
+        version = st.session_state.union_view.version
+    else:
+        version = get_worksheet_version(category)
+    return get_or_build_derived(('search_engine', category) + tuple(search_columns), version,
+                                lambda previous: IncrementalSearch(df, search_columns))
+
+def get_spec_search(category, df):
+    """Spec indexes for a category, rebuilt only when its data changes"""
+    return get_or_build_derived(('spec_index', category), get_worksheet_version(category),
+                                lambda previous: SpecSearch(df, SPEC_FILTERS[category]))
+
+def get_sort_index(category, df):
+    """Sort keys for a Price Lookup category, rebuilt only when its data changes"""
+    if category == "All Products":
+        version = st.session_state.union_view.version
+    else:
+        version = get_worksheet_version(category)
+    return get_or_build_derived(('sort_index', category), version, lambda previous: SortIndex(df))
+
+def display_spec_filters(spec_search, category):
+    """Parametric filter widgets; returns the active range and equality filters"""
+    ranges = {}
+    equals = {}
+    with st.expander("🎛️ Parametric Search"):
+        cols = st.columns(2)
+        for i, (column, index) in enumerate(spec_search.ranges.items()):
+            low, high = index.bounds
+            with cols[i % 2]:
+                if low == high:
+                    st.caption(f"{column}: all parts are {low:g}")
+                    continue
+                selected = st.slider(column, min_value=low, max_value=high, value=(low, high), key=f"spec_{category}_{column}")
+            if tuple(selected) != (low, high):
+                ranges[column] = selected
+        for i, (column, index) in enumerate(spec_search.equals.items(), start=len(spec_search.ranges)):
+            with cols[i % 2]:
+                selected = st.multiselect(column, index.values, key=f"spec_{category}_{column}")
+            if selected:
+                equals[column] = selected
+    return ranges, equals
+
+def get_facet_index(category, df):
+    """Facet bitmaps for a Price Lookup category, rebuilt only when it or the quotes change"""
+    if category == "All Products":
+        version = st.session_state.union_view.version
+    else:
+        version = get_worksheet_version(category)
+    return get_or_build_derived(('facet_index', category), (version, get_quotes_version()),
+                                lambda previous: FacetIndex(df, quotes=get_normalized_quotes()))
+
+def display_facet_filters(facet_index, category, within):
+    """Facet pickers with live counts; returns the selected values per facet"""
+    keys = {facet: f"facet_{category}_{facet}" for facet in facet_index.facets}
+    selections = {facet: st.session_state.get(key) or [] for facet, key in keys.items()}
+    counts = facet_index.counts(selections, within)
+    
+    active = sum(1 for values in selections.values() if values)
+    with st.expander(f"🧭 Filters ({active} active)" if active else "🧭 Filters"):
+        cols = st.columns(len(keys) or 1)
+        for i, (facet, key) in enumerate(keys.items()):
+            facet_counts = counts[facet]
+            # Values with no matching rows are hidden unless already selected
+            options = sorted(
+                (value for value, count in facet_counts.items() if count or value in selections[facet]),
+                key=lambda value: (-facet_counts[value], value)
+            )
+            with cols[i]:
+                selections[facet] = st.multiselect(
+                    facet, options, key=key,
+                    format_func=lambda value, facet_counts=facet_counts: f"{value} ({facet_counts.get(value, 0)})"
+                )
+    return selections
+
+def get_recommender(df):
+    """Similar-part model over All Products, rebuilt only when the catalogue changes"""
+    return get_or_build_derived('recommender', st.session_state.union_view.version,
+                                lambda previous: SimilarParts(df))
+
+def display_similar_parts(part_number):
+    """Parts across all categories with the closest specs and prices to part_number"""
+    st.markdown("---")
+    st.subheader("🧩 Similar Parts")
+    
+    # Searching every category would load every tab, so only the loaded ones are searched until asked.
+    # The choice is kept for this part across reruns and dropped when another part is selected.
+    if st.session_state.get('similar_all_categories_part') not in (None, part_number):
+        st.session_state.similar_all_categories_part = None
+    unloaded = [category for category in PRODUCT_CATEGORIES if category not in st.session_state.loaded_worksheets]
+    if unloaded and st.session_state.get('similar_all_categories_part') != part_number:
+        st.caption(f"Searching the categories loaded so far; {len(unloaded)} more are not loaded yet.")
+        if st.button("Search all categories", key="similar_all_categories"):
+            st.session_state.similar_all_categories_part = part_number
+    if st.session_state.get('similar_all_categories_part') == part_number:
+        df = get_all_products_view()
+    else:
+        df = get_loaded_products_view()
+    recommender = get_recommender(df)
+    row = recommender.row_for(part_number)
+    if row is None:
+        st.info("Enter a complete part number to see similar parts")
+        return
+    
+    positions, distances = recommender.neighbours(row, SIMILAR_PARTS_COUNT)
+    columns = ['Category', 'Magnias P/N', 'Product Name', 'Package', 'Type', 'Polarity',
+               'VDS (V)', 'ID (A)', 'IF (mA)', 'VRRM (V)', 'Parts USD Price', 'Parts RMB Price']
+    similar = df.iloc[positions][[col for col in columns if col in df.columns]].copy()
+    # Leave out spec columns none of the recommended parts have
+    similar = similar.loc[:, similar.replace('', pd.NA).notna().any()]
+    similar['Distance'] = distances.round(3)
+    if 'Parts USD Price' in similar.columns:
+        similar['Parts USD Price'] = similar['Parts USD Price'].apply(lambda x: format_price_display(x, "USD"))
+    if 'Parts RMB Price' in similar.columns:
+        similar['Parts RMB Price'] = similar['Parts RMB Price'].apply(lambda x: format_price_display(x, "RMB"))
+    st.dataframe(similar, width='stretch', hide_index=True)
+
+def display_price_history(product_name):
+    """Price trend for one product with a rolling median, filterable by customer and distributor"""
+    history = get_price_history()
+    quotes = history.series(product_name)
+    if quotes.empty:
+        return
+    
+    st.markdown("---")
+    st.subheader("📈 Price History")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        customer = st.selectbox("Customer", ["All"] + sorted(quotes['Customer'].unique()), key="history_customer")
+    with col2:
+        distributor = st.selectbox("Distributor", ["All"] + sorted(quotes['Distributor'].unique()), key="history_distributor")
+    with col3:
+        resolution = st.selectbox("Resolution", list(HISTORY_RESOLUTIONS), key="history_resolution")
+    filters = {
+        'customer': None if customer == "All" else customer,
+        'distributor': None if distributor == "All" else distributor,
+    }
+    
+    frequency = HISTORY_RESOLUTIONS[resolution]
+    if frequency:
+        prices = history.resample(product_name, frequency, **filters)
+    else:
+        prices = history.series(product_name, **filters)
+    rolling = history.rolling(product_name, HISTORY_ROLLING_WINDOW, **filters)
+    chart_data = pd.concat([
+        prices[['Quote_Date', 'Currency', 'Price']].assign(Series="Median" if frequency else "Quote"),
+        rolling[['Quote_Date', 'Currency']].assign(Price=rolling['Rolling Median'], Series=f"{HISTORY_ROLLING_WINDOW} Median"),
+    ], ignore_index=True)
+    if chart_data.empty:
+        st.info("No quotes match these filters")
+        return
+    
+    fig_history = charts.cached_figure("price_history", chart_data, charts.price_history_line,
+                                       title=f"{product_name} ({resolution})")
+    st.plotly_chart(fig_history, width='stretch')
+    
+    # Latest price per currency as of today, with the rolling range around it
+    latest = []
+    for currency in sorted(quotes['Currency'].unique()):
+        last = history.as_of(product_name, pd.Timestamp.now(), currency=currency, **filters)
+        if last is None:
+            continue
+        window = rolling[rolling['Currency'] == currency].iloc[-1]
+        latest.append(
+            f"{currency}: {format_price_display(last['Price'], currency)} on {last['Quote_Date'].strftime('%Y-%m-%d')} "
+            f"({HISTORY_ROLLING_WINDOW} range {format_price_display(window['Rolling Min'], currency)}–"
+            f"{format_price_display(window['Rolling Max'], currency)})"
+        )
+    if latest:
+        st.caption("Last price: " + " · ".join(latest))
+
 def display_price_lookup():
     """Display price lookup interface with enhanced quote management"""
     st.title("🔍 Price Lookup & Recommendations")
@@ -1480,22 +1788,103 @@ def display_price_lookup():
     
     # Product category selection - Add "All Products" as first option
     category = st.selectbox("Select Product Category:", ["All Products", "ESD", "CMF", "Transistor", "MOS", "SKY", "Zener", "PowerSwitch", "TVS", "Misc", "SDOthers"])
+    display_lookup_results(category)
+
+def display_export(category, df, positions):
+    """Export the current results (all columns) or the full quote history to a file"""
+    with st.expander("📤 Export"):
+        history = get_quote_history()
+        result_count = len(df) if positions is None else len(positions)
+        col1, col2 = st.columns(2)
+        with col1:
+            source = st.radio("Data", ["Current results", "Quote history"], key="export_source",
+                              captions=[f"{result_count:,} rows", f"{len(history):,} quotes"])
+        with col2:
+            export_format = st.selectbox("Format", available_formats(), key="export_format")
+        
+        if st.button("Prepare export", key="export_start"):
+            job = st.session_state.get('export_job')
+            if job is not None:
+                job.cancel()
+            stamp = datetime.now().strftime('%Y%m%d')
+            if source == "Current results":
+                frame, rows, name = df, positions, f"{category.replace(' ', '_')}_{stamp}"
+            else:
+                frame, rows, name = history[QUOTE_EXPORT_COLUMNS], None, f"quote_history_{stamp}"
+            total = len(frame) if rows is None else len(rows)
+            st.session_state.export_job = ExportJob(frame, export_format, name, rows,
+                                                    background=total > EXPORT_BACKGROUND_ROWS)
+        
+        job = st.session_state.get('export_job')
+        if job is None:
+            return
+        if not job.done:
+            display_export_progress()
+        elif job.error is not None:
+            st.error(f"Export failed: {job.error}")
+        elif job.ready:
+            st.download_button(f"⬇️ Download {job.file_name} ({job.written:,} rows)", data=job.open,
+                               file_name=job.file_name, mime=job.mime, on_click="ignore", key="export_download")
+
+def display_quotations(category, df, positions):
+    """Quotation documents for one or more customers from a list of part numbers"""
+    with st.expander("🧾 Quotations"):
+        quotes = get_normalized_quotes()
+        customers = sorted(quotes['Customer'].unique()) if not quotes.empty else []
+        selected = st.multiselect("Customers", customers, key="quotation_customers", accept_new_options=True)
+        
+        part_column = 'Magnias P/N' if 'Magnias P/N' in df.columns else 'Product Name'
+        prefill = ""
+        result_count = len(df) if positions is None else len(positions)
+        if result_count <= QUOTATION_PREFILL_ROWS and part_column in df.columns:
+            results = df if positions is None else df.iloc[positions]
+            prefill = "\n".join(part for part in results[part_column].astype(str) if part.strip())
+        parts_text = st.text_area("Part numbers (one per line)", value=prefill, key=f"quotation_parts_{category}")
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            currencies = fx.REPORTING_CURRENCIES
+            currency = st.selectbox("Currency", currencies, index=currencies.index(get_reporting_currency()),
+                                    key="quotation_currency")
+        with col2:
+            document_format = st.selectbox("Format", quotation.available_formats(), key="quotation_format")
+        
+        if st.button("Generate quotations", key="quotation_generate"):
+            part_numbers = [line.strip() for line in parts_text.splitlines() if line.strip()]
+            if not selected or not part_numbers:
+                st.error("Choose at least one customer and enter at least one part number")
+            else:
+                catalogue = get_all_products_view()
+                rates = get_fx_rates()
+                documents = [quotation.quotation_document(catalogue, quotes, customer, part_numbers, currency, rates)
+                             for customer in selected]
+                # Several customers are rendered in a process pool; repeats come from the document cache
+                contents = quotation.generate(documents, document_format)
+                st.session_state.quotation_file = quotation.bundle(documents, contents, document_format)
+        
+        generated = st.session_state.get('quotation_file')
+        if generated is not None:
+            file_name, data, mime = generated
+            st.download_button(f"⬇️ Download {file_name}", data=data, file_name=file_name, mime=mime,
+                               on_click="ignore", key="quotation_download")
+
+@st.fragment(run_every=EXPORT_POLL_SECONDS)
+def display_export_progress():
+    """Progress of a background export, polled until it finishes"""
+    job = st.session_state.get('export_job')
+    if job is None:
+        return
+    if job.done:
+        # Show the download button in place of the progress bar
+        st.rerun()
+    st.progress(job.progress, text=f"Exporting {job.written:,} of {job.total:,} rows…")
 
+@st.fragment
+def display_lookup_results(category):
+    """Search box, results table and quotes; typing or paging reruns only this fragment"""
     # Get cached data - handle "All Products" selection
     if category == "All Products":
-        # Combine all product data
-        all_dfs = []
-        for cat in ["ESD", "CMF", "Transistor", "MOS", "SKY", "Zener", "PowerSwitch", "TVS", "Misc", "SDOthers"]:
-            cat_df = get_cached_data(cat)
-            if cat_df is not None and not cat_df.empty:
-                cat_df_copy = cat_df.copy()
-                cat_df_copy['Category'] = cat  # Add category column
-                all_dfs.append(cat_df_copy)
-        
-        if all_dfs:
-            df = pd.concat(all_dfs, ignore_index=True, sort=False)
-        else:
-            df = pd.DataFrame()
+        df = get_all_products_view()
     else:
         df = get_cached_data(category)
     
@@ -1517,22 +1906,29 @@ def display_price_lookup():
     if search_term:
         if category == "All Products":
             # Search in both Product Name and Magnias P/N columns
-            mask = pd.Series([False] * len(df))
-            if 'Product Name' in df.columns:
-                mask |= df['Product Name'].str.contains(search_term, case=False, na=False)
-            if 'Magnias P/N' in df.columns:
-                mask |= df['Magnias P/N'].str.contains(search_term, case=False, na=False)
-            filtered_df = df[mask]
+            search_columns = ['Product Name', 'Magnias P/N']
+        elif category in ["MOS", "CMF", "Transistor", "SKY", "Zener", "PowerSwitch", "TVS", "Misc", "SDOthers"]:  
+            search_columns = ['Magnias P/N']
         else:
-            # Try to find in Product Name or Magnias P/N columns
-            if category in ["MOS", "CMF", "Transistor", "SKY", "Zener", "PowerSwitch", "TVS", "Misc", "SDOthers"]:  
-                search_column = 'Magnias P/N'
-            else:
-                search_column = 'Product Name' if 'Product Name' in df.columns else 'Product'
-            
-            filtered_df = df[df[search_column].str.contains(search_term, case=False, na=False)]
+            search_columns = ['Product Name' if 'Product Name' in df.columns else 'Product']
+        
+        engine = get_search_engine(category, df, search_columns)
+        positions = engine.search(search_term)
     else:
-        filtered_df = df
+        positions = None
+    
+    # Parametric search narrows the part number matches further
+    if category in SPEC_FILTERS:
+        spec_search = get_spec_search(category, df)
+        ranges, equals = display_spec_filters(spec_search, category)
+        if ranges or equals:
+            positions = spec_search.filter(ranges, equals, within=positions)
+    
+    # Facet counts reflect the search and spec filters above
+    facet_index = get_facet_index(category, df)
+    selections = display_facet_filters(facet_index, category, positions)
+    if any(selections.values()):
+        positions = facet_index.filter(selections, within=positions)
     
     # Display results
     st.subheader(f"📋 {category}")
@@ -1554,8 +1950,35 @@ def display_price_lookup():
     
     display_columns = [col for col in display_columns if col in df.columns]
     
+    # Sorting and paging work on row positions; only the visible page is copied,
+    # formatted and sent to the browser, whatever the size of the results
+    page_col1, page_col2, page_col3, page_col4 = st.columns([2, 1, 1, 1])
+    with page_col1:
+        sort_column = st.selectbox("Sort by", [LOOKUP_SHEET_ORDER] + display_columns, key=f"lookup_sort_{category}")
+    with page_col2:
+        descending = st.checkbox("Descending", key="lookup_sort_descending")
+    if sort_column != LOOKUP_SHEET_ORDER:
+        positions = get_sort_index(category, df).order(sort_column, descending, within=positions)
+    elif descending:
+        positions = (np.arange(len(df)) if positions is None else positions)[::-1]
+    with page_col3:
+        page_size = st.selectbox("Rows per page", LOOKUP_PAGE_SIZES, key="lookup_page_size")
+    total_rows = len(df) if positions is None else len(positions)
+    page_count = max(1, -(-total_rows // page_size))
+    with page_col4:
+        page_number = st.number_input("Page", min_value=1, max_value=page_count, value=1, step=1)
+    start, end, page_count = page_bounds(total_rows, page_number, page_size)
+    page_df = df.iloc[start:end] if positions is None else df.iloc[positions[start:end]]
+    
     # Format prices in the dataframe for display
-    display_df = filtered_df[display_columns].copy()
+    display_df = page_df[display_columns].copy()
+    
+    # Parts price in the reporting currency, converted from the other currency when missing
+    rates = get_fx_rates()
+    if rates is not None and ('Parts USD Price' in display_df.columns or 'Parts RMB Price' in display_df.columns):
+        reporting_currency = get_reporting_currency()
+        reporting_prices = fx.catalogue_prices(page_df, rates, reporting_currency)
+        display_df[f'Parts Price ({reporting_currency})'] = reporting_prices.apply(lambda x: format_price_display(x, reporting_currency))
     
     # Format price columns to exactly 4 decimal places
     if 'Parts RMB Price' in display_df.columns:
@@ -1565,6 +1988,11 @@ def display_price_lookup():
         display_df['Parts USD Price'] = display_df['Parts USD Price'].apply(lambda x: format_price_display(x, "USD"))
     
     st.dataframe(display_df, width='stretch')
+    if total_rows:
+        st.caption(f"Showing rows {start + 1}–{end} of {total_rows} (page {int(page_number)} of {page_count})")
+    
+    display_export(category, df, positions)
+    display_quotations(category, df, positions)
     
     # Enhanced Latest Quotes and Quote Management section - only show if there's a search term and not "All Products"
     if search_term and category != "All Products":
@@ -1582,13 +2010,14 @@ def display_price_lookup():
                 product_name_for_quotes = search_term
             else:
                 # For ESD, use the Product Name from the filtered results
-                if not filtered_df.empty and 'Product Name' in filtered_df.columns:
-                    product_name_for_quotes = filtered_df['Product Name'].iloc[0]
+                if total_rows and 'Product Name' in df.columns:
+                    first_row = 0 if positions is None else positions[0]
+                    product_name_for_quotes = df['Product Name'].iloc[first_row]
                 else:
                     product_name_for_quotes = search_term
             
             # Get latest quotes with enhanced distributor extraction
-            quotes = get_latest_quotes_with_distributor(category, product_name_for_quotes)
+            quotes = get_latest_quotes_cached(category, product_name_for_quotes)
             
             if quotes:
                 # Display quotes in a table format with formatted prices and distributor column
@@ -1607,6 +2036,19 @@ def display_price_lookup():
                     })
                 
                 quote_df = pd.DataFrame(quote_data)
+                
+                # Every quote in the reporting currency as of its own date
+                rates = get_fx_rates()
+                if rates is not None:
+                    reporting_currency = get_reporting_currency()
+                    converted = rates.convert(
+                        parse_prices(pd.Series([quote['Price'] for quote in quotes])),
+                        [quote['Currency'] for quote in quotes],
+                        parse_dates(pd.Series([quote['Raw_Date'] for quote in quotes]), ['%m/%d/%Y', '%Y-%m-%d', '%Y.%m.%d']),
+                        reporting_currency
+                    )
+                    quote_df.insert(3, f'Price ({reporting_currency})',
+                                    [format_price_display(value, reporting_currency) for value in converted])
                 st.dataframe(quote_df, width='stretch')
             else:
                 st.info(f"No quotes found for {category} - {product_name_for_quotes}")
@@ -1617,6 +2059,9 @@ def display_price_lookup():
                 display_add_quote_form(category, product_name_for_quotes)
             else:
                 st.info("Please log in to add quotes")
+        
+        display_price_history(product_name_for_quotes)
+        display_similar_parts(product_name_for_quotes)
                 
     elif search_term and category == "All Products":
         st.info("💡 Latest Quotes and Quote Management are only available when searching within a specific product category.")
@@ -1630,6 +2075,11 @@ def display_product_details():
     # Category and product selection
     category = st.selectbox("Select Product Category:", ["ESD", "CMF", "Transistor", "MOS", "SKY", "Zener", "PowerSwitch", "TVS", "Misc", "SDOthers"], key="details_category")
 
+    display_product_specs(category)
+
+@st.fragment
+def display_product_specs(category):
+    """Product picker and its specifications; changing the product reruns only this fragment"""
     # Get cached data
     df = get_cached_data(category)
     
@@ -1685,6 +2135,12 @@ def display_product_details():
 def authenticated_main():
     """Main application function for authenticated users"""
     
+    # Follow newly published snapshots and other sessions' writes, and pick up
+    # anything the background prefetch finished since the last run
+    sync_snapshot_version()
+    apply_worksheet_changes()
+    adopt_prefetched_worksheets()
+    
     # Sidebar navigation
     with st.sidebar:
         st.sidebar.image("https://i.postimg.cc/j5G8ytbC/cropped-logo.png")
@@ -1709,6 +2165,10 @@ def authenticated_main():
         
         page = st.radio("Select Page:", nav_options)
         
+        # Prices in both currencies are compared in this one, when there are rates to convert with
+        if get_fx_rates() is not None:
+            st.selectbox("Reporting Currency", fx.REPORTING_CURRENCIES, key="reporting_currency")
+        
         # Show a message if user is not admin and tries to access data management features
         if st.session_state.username != "admin":
             st.markdown("---")
@@ -1717,35 +2177,26 @@ def authenticated_main():
         st.markdown("---")
         
         # Data status
+        loaded_count = len(st.session_state.loaded_worksheets)
         if st.session_state.data_loaded and st.session_state.last_refresh:
             st.success("✅ Data Loaded")
             st.caption(f"Last refresh: {st.session_state.last_refresh.strftime('%Y-%m-%d %H:%M:%S')}")
+        elif loaded_count and st.session_state.last_refresh:
+            st.info(f"⏳ {loaded_count}/{len(WORKSHEET_STATE_KEYS)} worksheets loaded")
+            st.caption(f"Last refresh: {st.session_state.last_refresh.strftime('%Y-%m-%d %H:%M:%S')}")
         else:
             st.warning("⚠️ Data not loaded")
         
         # Refresh button
         if st.button("🔄 Refresh Data", type="primary"):
-            load_all_data()
+            refresh_loaded_worksheets()
             st.success("Data refreshed!")
             st.rerun()
         
         # Force reload button (for debugging)
         if st.button("🔄 Force Reload", help="Clear cache and reload all data"):
-            st.session_state.data_loaded = False
-            st.session_state.esd_data = None
-            st.session_state.cmf_data = None
-            st.session_state.transistor_data = None
-            st.session_state.mos_data = None
-            st.session_state.last_refresh = None
-            st.session_state.sky_data = None
-            st.session_state.zener_data = None
-            st.session_state.PowerSwitch_data = None
-            st.session_state.Misc_data = None
-            st.session_state.SDOthers_data = None
-            st.session_state.tvs_data = None
-            st.session_state.quote_usd_data = None
-            st.session_state.quote_rmb_data = None
-            load_all_data()
+            clear_worksheet_data()
+            ensure_worksheets_loaded(PAGE_WORKSHEETS.get(page, []))
             st.success("Data force reloaded!")
             st.rerun()
         
@@ -1754,35 +2205,22 @@ def authenticated_main():
         
         # Quick stats
         st.subheader("Quick Stats")
-        if st.session_state.data_loaded:
-            esd_count = len(st.session_state.esd_data) if st.session_state.esd_data is not None else 0
-            cmf_count = len(st.session_state.cmf_data) if st.session_state.cmf_data is not None else 0
-            transistor_count = len(st.session_state.transistor_data) if st.session_state.transistor_data is not None else 0
-            mos_count = len(st.session_state.mos_data) if st.session_state.mos_data is not None else 0
-            sky_count = len(st.session_state.sky_data) if st.session_state.sky_data is not None else 0
-            zener_count = len(st.session_state.zener_data) if st.session_state.zener_data is not None else 0
-            PowerSwitch_count = len(st.session_state.PowerSwitch_data) if st.session_state.PowerSwitch_data is not None else 0
-            Misc_count = len(st.session_state.Misc_data) if st.session_state.Misc_data is not None else 0
-            SDOthers_count = len(st.session_state.SDOthers_data) if st.session_state.SDOthers_data is not None else 0
-            tvs_count = len(st.session_state.tvs_data) if st.session_state.tvs_data is not None else 0
-
-            st.write(f"ESD: {esd_count}")
-            st.write(f"CMF: {cmf_count}")
-            st.write(f"Transistor: {transistor_count}")
-            st.write(f"MOS: {mos_count}")
-            st.write(f"SKY: {sky_count}")
-            st.write(f"Zener: {zener_count}")
-            st.write(f"PowerSwitch: {PowerSwitch_count}")
-            st.write(f"TVS: {tvs_count}")
-            st.write(f"TVS: {Misc_count}")
-            st.write(f"TVS: {SDOthers_count}")
-            st.write(f"**Total: {esd_count + cmf_count + transistor_count + mos_count + sky_count + zener_count + PowerSwitch_count + tvs_count + Misc_count + SDOthers_count}**")
+        if st.session_state.loaded_worksheets:
+            total_count = 0
+            for category in PRODUCT_CATEGORIES:
+                if category in st.session_state.loaded_worksheets:
+                    category_df = st.session_state[WORKSHEET_STATE_KEYS[category]]
+                    category_count = len(category_df) if category_df is not None else 0
+                    total_count += category_count
+                    st.write(f"{category}: {category_count}")
+                else:
+                    st.write(f"{category}: loading...")
+            st.write(f"**Total: {total_count}**")
         else:
             st.write("Loading...")
     
-    # Load data on first run
-    if not st.session_state.data_loaded:
-        load_all_data()
+    # Load only the worksheets this page needs; other tabs load on demand
+    ensure_worksheets_loaded(PAGE_WORKSHEETS.get(page, []))
     
     # Main content based on page selection
     if page == "Dashboard":
@@ -1798,9 +2236,25 @@ def authenticated_main():
         else:
             st.error("🚫 Access Denied: Data Management is only available for admin users")
             st.info("Please contact your administrator if you need access to this feature.")
+    
+    # The page is on screen; fetch the remaining tabs in the background
+    start_background_prefetch()
+    report_worksheet_memory()
 
 def main():
     """Main application function with authentication check"""
+    # Page setup lives here rather than at import time, so scripts and the
+    # benchmarks can import this module without rendering anything
+    st.set_page_config(
+        page_title="Quotation System",
+        page_icon="💾",
+        layout="wide",
+        initial_sidebar_state="expanded"
+    )
+    inject_custom_css()
+    init_session_state()
+    configure_memory_budget()
+    start_api_server()
     
     # Check if user is authenticated
     if not st.session_state.authenticated:
@@ -0,0 +1 @@
+"""Offline benchmark and load-testing tools for the Quotation Management System"""
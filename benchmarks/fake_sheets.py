@@ -0,0 +1,203 @@
+"""In-memory stand-in for the parts of gspread the app uses.
+
+FakeSpreadsheet/FakeWorksheet mimic gspread's Spreadsheet and Worksheet
+closely enough for the app's data layer, with a configurable latency per
+API call and per row transferred. Every simulated API request is counted in
+an ApiStats object so benchmarks can report call amplification.
+"""
+
+import threading
+import time
+from collections import Counter
+
+from gspread.exceptions import WorksheetNotFound
+from gspread.utils import a1_to_rowcol
+
+# gspread methods that hit the Sheets API as read or write requests
+READ_METHODS = {"open_by_url", "worksheet", "get_all_records", "get_all_values"}
+WRITE_METHODS = {"append_row", "append_rows", "update_cell", "batch_update", "format"}
+
+
+class ApiStats:
+    """Thread-safe counter of simulated Sheets API requests"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = Counter()
+
+    def record(self, method):
+        with self._lock:
+            self.calls[method] += 1
+
+    @property
+    def reads(self):
+        return sum(count for method, count in self.calls.items() if method in READ_METHODS)
+
+    @property
+    def writes(self):
+        return sum(count for method, count in self.calls.items() if method in WRITE_METHODS)
+
+    @property
+    def total(self):
+        return sum(self.calls.values())
+
+    def snapshot(self):
+        """Return a plain dict copy of the counters"""
+        with self._lock:
+            return dict(self.calls)
+
+    def reset(self):
+        with self._lock:
+            self.calls.clear()
+
+
+class LatencyModel:
+    """Simulated network latency: fixed cost per call plus a cost per row transferred"""
+
+    def __init__(self, per_call=0.0, per_row=0.0):
+        self.per_call = per_call
+        self.per_row = per_row
+
+    def wait(self, rows=0):
+        delay = self.per_call + self.per_row * rows
+        if delay > 0:
+            time.sleep(delay)
+
+
+def _numericise(value):
+    """Convert numeric strings the way gspread's get_all_records does by default"""
+    if not isinstance(value, str) or value == "":
+        return value
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+class FakeWorksheet:
+    """In-memory worksheet holding a header row followed by data rows"""
+
+    def __init__(self, title, rows, latency=None, stats=None):
+        self.title = title
+        self._rows = [list(row) for row in rows]
+        self._lock = threading.Lock()
+        self.latency = latency or LatencyModel()
+        self.stats = stats or ApiStats()
+
+    def _call(self, method, rows=0):
+        self.stats.record(method)
+        self.latency.wait(rows)
+
+    @property
+    def row_count(self):
+        return len(self._rows)
+
+    def get_all_values(self):
+        with self._lock:
+            values = [[("" if v is None else str(v)) for v in row] for row in self._rows]
+        self._call("get_all_values", len(values))
+        return values
+
+    def get_all_records(self):
+        with self._lock:
+            if not self._rows:
+                records = []
+            else:
+                headers = self._rows[0]
+                records = []
+                for row in self._rows[1:]:
+                    padded = list(row) + [""] * (len(headers) - len(row))
+                    records.append({h: _numericise(v) for h, v in zip(headers, padded)})
+        self._call("get_all_records", len(records))
+        return records
+
+    def seed_rows(self, rows):
+        """Append rows directly, without simulating an API call (benchmark setup only)"""
+        with self._lock:
+            self._rows.extend(list(row) for row in rows)
+
+    def append_row(self, values, **kwargs):
+        with self._lock:
+            self._rows.append(list(values))
+        self._call("append_row", 1)
+
+    def append_rows(self, values, **kwargs):
+        with self._lock:
+            self._rows.extend(list(row) for row in values)
+        self._call("append_rows", len(values))
+
+    def update_cell(self, row, col, value):
+        with self._lock:
+            while len(self._rows) < row:
+                self._rows.append([])
+            target = self._rows[row - 1]
+            if len(target) < col:
+                target.extend([""] * (col - len(target)))
+            target[col - 1] = value
+        self._call("update_cell", 1)
+
+    def batch_update(self, data, **kwargs):
+        """Single-cell ranges only, which is all the app writes"""
+        with self._lock:
+            for update in data:
+                row, col = a1_to_rowcol(update['range'])
+                while len(self._rows) < row:
+                    self._rows.append([])
+                target = self._rows[row - 1]
+                if len(target) < col:
+                    target.extend([""] * (col - len(target)))
+                target[col - 1] = update['values'][0][0]
+        self._call("batch_update", len(data))
+
+    def format(self, range_name, cell_format):
+        self._call("format")
+
+
+class FakeSpreadsheet:
+    """In-memory spreadsheet mapping worksheet titles to FakeWorksheet objects"""
+
+    def __init__(self, latency=None, stats=None):
+        self.latency = latency or LatencyModel()
+        self.stats = stats or ApiStats()
+        self._worksheets = {}
+
+    def add_worksheet_rows(self, title, rows):
+        """Create (or replace) a worksheet from a header row plus data rows"""
+        worksheet = FakeWorksheet(title, rows, latency=self.latency, stats=self.stats)
+        self._worksheets[title] = worksheet
+        return worksheet
+
+    def worksheet(self, title):
+        self.stats.record("worksheet")
+        self.latency.wait()
+        try:
+            return self._worksheets[title]
+        except KeyError:
+            raise WorksheetNotFound(title)
+
+    def worksheets(self):
+        return list(self._worksheets.values())
+
+
+def install(app_module, spreadsheet):
+    """Point the app's get_spreadsheet() seam at a fake spreadsheet.
+
+    Returns a callable that restores the original function.
+    """
+    original = app_module.get_spreadsheet
+
+    def get_fake_spreadsheet():
+        spreadsheet.stats.record("open_by_url")
+        spreadsheet.latency.wait()
+        return spreadsheet
+
+    app_module.get_spreadsheet = get_fake_spreadsheet
+
+    def restore():
+        app_module.get_spreadsheet = original
+
+    return restore
@@ -0,0 +1,61 @@
+"""Shared helpers for running the app's data layer outside `streamlit run`"""
+
+import importlib
+import logging
+import os
+import statistics
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_app():
+    """Import app.py in Streamlit bare mode without the ScriptRunContext warning spam"""
+    if PROJECT_ROOT not in sys.path:
+        sys.path.insert(0, PROJECT_ROOT)
+    # Every st.* call outside a script run logs this warning; it is expected here
+    logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").disabled = True
+    app = importlib.import_module("app")
+    # main() sets up session state on each run; benchmarks call the data layer directly
+    app.init_session_state()
+    return app
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def summarize(durations):
+    """Summary statistics (in seconds) for a list of durations"""
+    return {
+        "count": len(durations),
+        "min": min(durations),
+        "median": statistics.median(durations),
+        "mean": statistics.fmean(durations),
+        "p95": percentile(durations, 95),
+        "p99": percentile(durations, 99),
+        "max": max(durations),
+    }
+
+
+def time_callable(fn, repeats=5, setup=None, warmup=1):
+    """Time fn over several repeats.
+
+    setup, if given, runs untimed before every call and its return value is
+    passed to fn as positional arguments.
+    """
+    durations = []
+    for iteration in range(warmup + repeats):
+        args = setup() if setup else ()
+        start = time.perf_counter()
+        fn(*args)
+        elapsed = time.perf_counter() - start
+        if iteration >= warmup:
+            durations.append(elapsed)
+    return durations
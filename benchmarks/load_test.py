@@ -0,0 +1,449 @@
+"""Scale test: many simulated Streamlit sessions driving the real page functions.
+
+Each simulated user gets its own session state and scripted widget values
+and runs realistic flows (login, dashboard, typing into Price Lookup, adding
+a quote) by executing the app's own functions headlessly, the way a
+`streamlit run` script rerun would. All sessions share one fake Sheets
+backend so API call amplification and quota pressure can be measured.
+
+Functions decorated with @st.fragment are tracked per session: a widget
+rendered inside a fragment reruns only that fragment, as in a browser.
+--full-reruns disables this to measure whole-script reruns for comparison.
+
+Usage:
+    python -m benchmarks.load_test --users 20 --latency-ms 150 --output load.json
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pandas as pd
+import streamlit.runtime.fragment
+
+from benchmarks import fake_sheets, synthetic
+from benchmarks.harness import import_app, percentile, summarize
+from qms import memory
+
+# Google Sheets API default read quotas (requests per minute)
+READ_QUOTA_PER_PROJECT = 300
+READ_QUOTA_PER_USER = 60
+
+LOGIN_USERNAME = "loadtest"
+LOGIN_PASSWORD = "loadtest"
+
+
+class RerunRequested(Exception):
+    """Raised by the headless st.rerun(); the driver then reruns the script or fragment"""
+
+    def __init__(self, scope="app"):
+        super().__init__(scope)
+        self.scope = scope
+
+
+class SessionState(dict):
+    """Minimal stand-in for st.session_state with attribute access"""
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        self[name] = value
+
+    def __delattr__(self, name):
+        del self[name]
+
+
+class SimulatedSession:
+    """One simulated browser session: its session state and scripted widget values"""
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.state = SessionState()
+        self.widgets = {}
+        self.clicks = set()
+        self.elements = 0  # st.* calls made, a proxy for what a run sends to the browser
+        self.fragment_stack = []
+        self.fragment_calls = {}  # fragment name -> arguments of its last run
+        self.widget_fragments = {}  # widget key or label -> fragment it was rendered in
+
+    def register(self, label, key):
+        """Count a widget and remember which fragment, if any, it was rendered in"""
+        self.elements += 1
+        fragment = self.fragment_stack[-1] if self.fragment_stack else None
+        for name in (key, label):
+            if name is not None:
+                self.widget_fragments[name] = fragment
+
+    def fragment_for(self, name):
+        """Fragment owning a scripted widget name (same matching rules as lookup)"""
+        if name in self.widget_fragments:
+            return self.widget_fragments[name]
+        if name.endswith("*"):
+            for label, fragment in self.widget_fragments.items():
+                if label.startswith(name[:-1]):
+                    return fragment
+        return None
+
+    def set(self, name, value):
+        """Set a widget value by key or label; a trailing '*' matches label prefixes"""
+        self.widgets[name] = value
+
+    def click(self, label):
+        """Press a button or form submit button on the next script run only"""
+        self.clicks.add(label)
+
+    def lookup(self, label, key, default):
+        for name in (key, label):
+            if name is not None and name in self.widgets:
+                return self.widgets[name]
+        for name, value in self.widgets.items():
+            if name.endswith("*") and label.startswith(name[:-1]):
+                return value
+        return default
+
+
+class HeadlessStreamlit:
+    """Proxy for the streamlit module used by app.py under the load test.
+
+    Widgets return the current session's scripted values, st.session_state
+    resolves to the calling thread's session, and everything else falls
+    through to streamlit's bare-mode implementation.
+    """
+
+    def __init__(self, real_st, secrets):
+        self._st = real_st
+        self._local = threading.local()
+        self.secrets = secrets
+
+    def __getattr__(self, name):
+        value = getattr(self._st, name)
+        if not callable(value) or isinstance(value, type):
+            return value
+
+        def element(*args, **kwargs):
+            self.session.elements += 1
+            return value(*args, **kwargs)
+        return element
+
+    def bind(self, session):
+        self._local.session = session
+
+    @property
+    def session(self):
+        return self._local.session
+
+    @property
+    def session_state(self):
+        return self._local.session.state
+
+    def rerun(self, *args, scope="app", **kwargs):
+        raise RerunRequested(scope)
+
+    def _pressed(self, label, key):
+        self.session.elements += 1
+        self.session.register(label, key)
+        for name in (key, label):
+            if name is not None and name in self.session.clicks:
+                self.session.clicks.discard(name)
+                return True
+        return False
+
+    def button(self, label, key=None, **kwargs):
+        return self._pressed(label, key)
+
+    def form_submit_button(self, label="Submit", key=None, **kwargs):
+        return self._pressed(label, key)
+
+    def text_input(self, label, value="", key=None, **kwargs):
+        self.session.register(label, key)
+        return self.session.lookup(label, key, value)
+
+    def text_area(self, label, value="", key=None, **kwargs):
+        self.session.register(label, key)
+        return self.session.lookup(label, key, value)
+
+    def number_input(self, label, min_value=None, max_value=None, value=0.0, key=None, **kwargs):
+        self.session.register(label, key)
+        return self.session.lookup(label, key, value)
+
+    def date_input(self, label, value=None, key=None, **kwargs):
+        self.session.register(label, key)
+        return self.session.lookup(label, key, value)
+
+    def checkbox(self, label, value=False, key=None, **kwargs):
+        self.session.register(label, key)
+        return self.session.lookup(label, key, value)
+
+    def selectbox(self, label, options, index=0, key=None, **kwargs):
+        options = list(options)
+        default = options[index] if options and index is not None else None
+        self.session.register(label, key)
+        return self.session.lookup(label, key, default)
+
+    def radio(self, label, options, index=0, key=None, **kwargs):
+        return self.selectbox(label, options, index=index, key=key)
+
+
+def is_fragment(function):
+    """True for functions wrapped by @st.fragment"""
+    code = getattr(function, "__code__", None)
+    return (hasattr(function, "__wrapped__") and code is not None
+            and os.path.samefile(code.co_filename, streamlit.runtime.fragment.__file__))
+
+
+def session_dataframe_bytes(state):
+    """Deep memory footprint of the DataFrames held in one session state"""
+    frames = {id(value): value for value in state.values() if isinstance(value, pd.DataFrame)}
+    return frames, sum(int(frame.memory_usage(deep=True).sum()) for frame in frames.values())
+
+
+class LoadTest:
+    """Drives N simulated users against one fake spreadsheet"""
+
+    def __init__(self, app, spreadsheet, think_time=0.0, seed=0, fragments=True):
+        self.app = app
+        self.spreadsheet = spreadsheet
+        self.think_time = think_time
+        self.seed = seed
+        self.fragments = fragments
+        self.headless = HeadlessStreamlit(app.st, {
+            "auth": {"loadtest": {"username": LOGIN_USERNAME, "password": LOGIN_PASSWORD}},
+        })
+        self._lock = threading.Lock()
+        self.timings = {}
+        self.elements = {}
+        self.errors = []
+        self.sessions = []
+        usd = spreadsheet.worksheet("QuoteUSD").get_all_records()
+        self.quoted_products = [(row['Products'], row['Product Name']) for row in usd[:200]]
+        self.spreadsheet.stats.reset()
+
+    def run_script(self, session):
+        """Execute one script run the way `streamlit run` does, following st.rerun()"""
+        self.headless.bind(session)
+        for _ in range(3):
+            try:
+                self.app.init_session_state()
+                self.app.main()
+                return
+            except RerunRequested:
+                continue
+
+    def fragment_runner(self, name, function):
+        """Run a fragment inline and remember its arguments so it can be rerun alone"""
+        def run(*args, **kwargs):
+            session = self.headless.session
+            session.fragment_calls[name] = (args, kwargs)
+            session.fragment_stack.append(name)
+            try:
+                return function(*args, **kwargs)
+            finally:
+                session.fragment_stack.pop()
+        return run
+
+    def run_fragment(self, session, name):
+        """Rerun one fragment the way a widget change inside it does"""
+        self.headless.bind(session)
+        args, kwargs = session.fragment_calls[name]
+        try:
+            getattr(self.app, name)(*args, **kwargs)
+        except RerunRequested as rerun:
+            if rerun.scope == "fragment":
+                getattr(self.app, name)(*args, **kwargs)
+            else:
+                self.run_script(session)
+
+    def action(self, session, name, prepare=None, widget=None):
+        """Run one user interaction (a script or fragment run) and record its latency"""
+        if prepare:
+            prepare()
+        fragment = session.fragment_for(widget) if self.fragments and widget else None
+        elements_before = session.elements
+        start = time.perf_counter()
+        try:
+            if fragment in session.fragment_calls:
+                self.run_fragment(session, fragment)
+            else:
+                self.run_script(session)
+        except Exception as e:
+            with self._lock:
+                self.errors.append(f"{name}: {type(e).__name__}: {e}")
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.timings.setdefault(name, []).append(elapsed)
+            self.elements.setdefault(name, []).append(session.elements - elements_before)
+        if self.think_time:
+            time.sleep(self.think_time)
+
+    def user_flow(self, user_id):
+        rng = random.Random(f"{self.seed}-{user_id}")
+        session = SimulatedSession(user_id)
+        with self._lock:
+            self.sessions.append(session)
+
+        # Login
+        session.set("Username", LOGIN_USERNAME)
+        session.set("Password", LOGIN_PASSWORD)
+        self.action(session, "login", lambda: session.click("🔐 Sign In"))
+
+        # Dashboard (first authenticated run loads the data)
+        self.action(session, "dashboard", lambda: session.set("Select Page:", "Dashboard"))
+
+        # Price Lookup: type a part number one character at a time
+        category, part_number = rng.choice(self.quoted_products)
+        session.set("Select Page:", "Price Lookup")
+        session.set("Select Product Category:", category)
+        self.action(session, "lookup_open")
+        for length in range(3, len(part_number) + 1):
+            self.action(session, "lookup_keystroke", lambda: session.set("🔍 Search*", part_number[:length]),
+                        widget="🔍 Search*")
+
+        # Add a quote for the product that was looked up
+        session.set("quote_currency", rng.choice(["USD", "RMB"]))
+        session.set("quote_price_text", f"{rng.uniform(0.01, 0.5):.4f}")
+        session.set("quote_customer", f"Load Test Customer {user_id % 7}")
+        session.set("quote_distributor", "Arrow")
+        self.action(session, "add_quote", lambda: session.click("💰 Add Quote"), widget="💰 Add Quote")
+        if session.state.get('quote_anomaly_confirmed'):
+            # The random price was flagged as unusual; submit again to save it, as a user would
+            self.action(session, "add_quote", lambda: session.click("💰 Add Quote"), widget="💰 Add Quote")
+
+        # Back to the dashboard
+        self.action(session, "dashboard_return", lambda: session.set("Select Page:", "Dashboard"))
+
+    def run(self, users, ramp_up=0.0):
+        original_st = self.app.st
+        self.app.st = self.headless
+        # Fragment wrappers need a real script run context, so run the functions they wrap
+        fragments = {name: value for name, value in vars(self.app).items() if is_fragment(value)}
+        for name, fragment in fragments.items():
+            setattr(self.app, name, self.fragment_runner(name, fragment.__wrapped__))
+        start = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=users) as pool:
+                futures = []
+                for user_id in range(users):
+                    futures.append(pool.submit(self.user_flow, user_id))
+                    if ramp_up:
+                        time.sleep(ramp_up / users)
+                for future in futures:
+                    future.result()
+        finally:
+            self.app.st = original_st
+            for name, fragment in fragments.items():
+                setattr(self.app, name, fragment)
+        return time.perf_counter() - start
+
+    def report(self, users, elapsed):
+        stats = self.spreadsheet.stats
+        actions = sum(len(durations) for durations in self.timings.values())
+        per_session = []
+        derived = []
+        distinct_frames = {}
+        governed = {row['session']: row['derived_bytes'] for row in memory.get_governor().sessions()}
+        for session in self.sessions:
+            frames, size = session_dataframe_bytes(session.state)
+            per_session.append(size)
+            derived.append(governed.get(session.state.get('session_id'), 0))
+            distinct_frames.update(frames)
+        distinct_bytes = sum(int(frame.memory_usage(deep=True).sum()) for frame in distinct_frames.values())
+        minutes = elapsed / 60.0
+        reads_per_minute = stats.reads / minutes if minutes else 0.0
+        return {
+            "users": users,
+            "fragments": self.fragments,
+            "elapsed_seconds": elapsed,
+            "throughput": {
+                "actions": actions,
+                "actions_per_second": actions / elapsed if elapsed else 0.0,
+                "user_flows_per_second": users / elapsed if elapsed else 0.0,
+            },
+            "latency_seconds": {name: summarize(durations) for name, durations in sorted(self.timings.items())},
+            "elements_per_action": {name: sum(counts) / len(counts) for name, counts in sorted(self.elements.items())},
+            "api": {
+                "calls": stats.total,
+                "reads": stats.reads,
+                "writes": stats.writes,
+                "calls_per_action": stats.total / actions if actions else 0.0,
+                "calls_per_user": stats.total / users if users else 0.0,
+                "reads_per_minute": reads_per_minute,
+                "read_quota_per_project": READ_QUOTA_PER_PROJECT,
+                "read_quota_per_user": READ_QUOTA_PER_USER,
+                "exceeds_project_quota": reads_per_minute > READ_QUOTA_PER_PROJECT,
+                "exceeds_user_quota": reads_per_minute > READ_QUOTA_PER_USER,
+                "by_method": stats.snapshot(),
+            },
+            "memory_bytes": {
+                "per_session_mean": sum(per_session) / len(per_session) if per_session else 0,
+                "per_session_p95": percentile(per_session, 95),
+                "per_session_max": max(per_session) if per_session else 0,
+                "sum_over_sessions": sum(per_session),
+                "distinct_dataframes": distinct_bytes,
+                # Indexes and reports held for the sessions by the memory governor
+                "derived_per_session_mean": sum(derived) / len(derived) if derived else 0,
+                "derived_per_session_max": max(derived) if derived else 0,
+            },
+            "errors": self.errors[:20],
+            "error_count": len(self.errors),
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate concurrent Streamlit sessions against a fake Sheets backend")
+    parser.add_argument("--users", type=int, nargs="+", default=[1, 5, 20], help="concurrent users; several values run a sweep")
+    parser.add_argument("--rows", type=int, default=1000, help="rows per category tab")
+    parser.add_argument("--quote-rows", type=int, default=2000, help="rows in each quote tab")
+    parser.add_argument("--latency-ms", type=float, default=100.0, help="simulated latency per API call")
+    parser.add_argument("--row-latency-us", type=float, default=0.0, help="simulated latency per row transferred")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="pause between user actions")
+    parser.add_argument("--ramp-up", type=float, default=0.0, help="seconds over which users start")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--full-reruns", action="store_true", help="rerun the whole script on every interaction, ignoring fragments")
+    parser.add_argument("--output", default="load_test_results.json")
+    args = parser.parse_args(argv)
+
+    app = import_app()
+    runs = []
+    for users in args.users:
+        latency = fake_sheets.LatencyModel(per_call=args.latency_ms / 1000.0, per_row=args.row_latency_us / 1e6)
+        spreadsheet = synthetic.build_spreadsheet(args.rows, args.quote_rows, seed=args.seed, latency=latency)
+        restore = fake_sheets.install(app, spreadsheet)
+        try:
+            test = LoadTest(app, spreadsheet, think_time=args.think_ms / 1000.0, seed=args.seed,
+                            fragments=not args.full_reruns)
+            elapsed = test.run(users, ramp_up=args.ramp_up)
+            result = test.report(users, elapsed)
+        finally:
+            restore()
+        runs.append(result)
+        keystroke = result["latency_seconds"].get("lookup_keystroke", {})
+        print(f"users={users:4d}  {result['throughput']['actions_per_second']:8.2f} actions/s  "
+              f"keystroke p50 {keystroke.get('median', 0) * 1000:8.1f}ms p95 {keystroke.get('p95', 0) * 1000:8.1f}ms "
+              f"({result['elements_per_action'].get('lookup_keystroke', 0):.0f} elements)  "
+              f"api calls/user {result['api']['calls_per_user']:6.1f}  reads/min {result['api']['reads_per_minute']:8.1f}  "
+              f"MB/session {result['memory_bytes']['per_session_mean'] / 1e6:7.2f} "
+              f"(+{result['memory_bytes']['derived_per_session_mean'] / 1e6:.2f} derived)  errors {result['error_count']}")
+
+    document = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "parameters": vars(args),
+        "runs": runs,
+    }
+    with open(args.output, "w") as handle:
+        json.dump(document, handle, indent=2, default=str)
+    print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,437 @@
+"""Offline benchmarks for the app's data layer against a fake Google Sheets backend.
+
+Usage:
+    python -m benchmarks.run_benchmarks --rows 2000 --quote-rows 5000 --output bench.json
+    python -m benchmarks.run_benchmarks --baseline bench.json   # compare with an earlier run
+
+Results are written as JSON: one entry per benchmark with timing statistics
+(seconds) and the number of simulated Sheets API calls per operation.
+"""
+
+import argparse
+import itertools
+import json
+import platform
+import sys
+from datetime import datetime
+
+from benchmarks import fake_sheets, synthetic
+from benchmarks.harness import import_app, summarize, time_callable
+from qms import sheets
+
+
+def _sample_products(app, count=20):
+    """Pick (category, product name) pairs that have quotes in the USD sheet"""
+    usd = app.get_cached_data("QuoteUSD")
+    pairs = usd[['Products', 'Product Name']].drop_duplicates().head(count)
+    return list(pairs.itertuples(index=False, name=None))
+
+
+def bench_load_all_data(app, spreadsheet):
+    def run():
+        app.load_all_data()
+    return run, None
+
+
+def bench_get_latest_quotes(app, spreadsheet):
+    products = itertools.cycle(_sample_products(app))
+
+    def run():
+        category, name = next(products)
+        app.get_latest_quotes(category, name)
+    return run, None
+
+
+def bench_get_latest_quotes_with_distributor(app, spreadsheet):
+    products = itertools.cycle(_sample_products(app))
+
+    def run():
+        category, name = next(products)
+        app.get_latest_quotes_with_distributor(category, name)
+    return run, None
+
+
+def bench_extract_quotes_from_sheet(app, spreadsheet):
+    usd = app.get_cached_data("QuoteUSD")
+    products = itertools.cycle(_sample_products(app))
+
+    def run():
+        category, name = next(products)
+        app.extract_quotes_from_sheet(usd, category, name, "USD")
+    return run, None
+
+
+def bench_dashboard_aggregation(app, spreadsheet):
+    usd = app.get_cached_data("QuoteUSD")
+    rmb = app.get_cached_data("QuoteRMB")
+
+    def run():
+        app.normalized_quotes(usd, rmb, app.get_name_aliases())
+    return run, None
+
+
+def bench_dashboard_figures(app, spreadsheet):
+    from qms import charts
+
+    quotes_df = app.get_quotes_dataframe()
+
+    def run():
+        # A dashboard rerun: aggregate, then fetch each figure (cached after the first run)
+        charts.cached_figure("category", quotes_df['Product_Category'].value_counts(), charts.category_pie)
+        charts.cached_figure("currency", quotes_df['Currency'].value_counts(), charts.currency_bar)
+        timeline_counts, label = charts.quote_timeline(quotes_df)
+        charts.cached_figure("timeline", timeline_counts, charts.timeline_line, title=f"{label} Quotes Activity")
+        charts.cached_figure("customers", quotes_df['Customer'].value_counts().head(10), charts.customers_bar)
+    return run, None
+
+
+def bench_parametric_search(app, spreadsheet):
+    from qms.specs import SPEC_FILTERS, SpecSearch
+
+    spec_search = SpecSearch(app.get_cached_data("MOS"), SPEC_FILTERS["MOS"])
+
+    def run():
+        spec_search.filter({"VDS (V)": (30, 100), "ID (A)": (5, 20)}, {"Type": ["N-Channel"]})
+    return run, None
+
+
+def bench_facet_counts(app, spreadsheet):
+    from qms.facets import FacetIndex
+
+    df = app.get_cached_data("MOS")
+    facet_index = FacetIndex(df, quotes=app.get_normalized_quotes())
+    package = df['Package'].iloc[0]
+
+    def run():
+        # One Price Lookup rerun: counts for every facet, then the filtered rows
+        selections = {'Package': [package], 'Distributor': ['Arrow']}
+        facet_index.counts(selections)
+        facet_index.filter(selections)
+    return run, None
+
+
+def bench_similar_parts(app, spreadsheet):
+    from qms.recommend import SimilarParts
+
+    df = app.get_all_products_view()
+    recommender = SimilarParts(df)
+    rows = itertools.cycle(range(0, len(df), max(1, len(df) // 50)))
+
+    def run():
+        recommender.neighbours(next(rows), 10)
+    return run, None
+
+
+def bench_price_history_update(app, spreadsheet):
+    from qms.history import PriceHistory
+
+    quotes = app.get_normalized_quotes()
+    edited = quotes.copy()
+    edited.loc[0, 'Raw_Price'] = edited.loc[0, 'Raw_Price'] + '0'
+    history = PriceHistory()
+    history.update(quotes)
+    versions = itertools.cycle([edited, quotes])
+
+    def run():
+        # One product changes per update, as after adding a quote
+        history.update(next(versions))
+    return run, None
+
+
+def bench_margin_report(app, spreadsheet):
+    from qms import fx
+    from qms.margins import lowest_margins, margin_table
+
+    df = app.get_all_products_view()
+    rates = fx.get_rates(fx.EXAMPLE_RATES_PATH)
+    quotes = fx.convert_quotes(app.get_normalized_quotes(), rates, "USD")
+
+    def run():
+        # A full rebuild, as after any catalogue or quote change
+        lowest_margins(margin_table(df, quotes, rates, "USD"))
+    return run, None
+
+
+def bench_anomaly_check(app, spreadsheet):
+    from qms.anomaly import QuoteAnomalies
+
+    quotes = app.get_normalized_quotes().dropna(subset=['Price'])
+    detector = QuoteAnomalies()
+    detector.update(quotes)
+    samples = itertools.cycle(quotes[['Product_Name', 'Currency', 'Price', 'Customer']].head(200).itertuples(index=False))
+
+    def run():
+        # A slipped decimal point, as checked when a quote is submitted
+        name, currency, price, customer = next(samples)
+        detector.check(name, currency, price * 10, customer)
+    return run, None
+
+
+def bench_anomaly_scan(app, spreadsheet):
+    from qms.anomaly import scan
+
+    quotes = app.get_normalized_quotes()
+
+    def run():
+        scan(quotes)
+    return run, None
+
+
+def bench_lookup_sorted_page(app, spreadsheet):
+    from qms.indexes import SortIndex
+
+    df = app.get_all_products_view()
+    sort_index = SortIndex(df)
+    positions = app.get_search_engine("All Products", df, ['Product Name', 'Magnias P/N']).search("1")
+    pages = itertools.cycle([True, False])
+
+    def run():
+        # One Price Lookup rerun: sort the results (or the whole catalogue), format one page
+        within = positions if next(pages) else None
+        ordered = sort_index.order('Parts USD Price', descending=True, within=within)
+        page = df.iloc[ordered[:app.LOOKUP_PAGE_SIZES[0]]][['Magnias P/N', 'Parts USD Price']].copy()
+        page['Parts USD Price'] = page['Parts USD Price'].apply(lambda x: app.format_price_display(x, "USD"))
+    return run, None
+
+
+def bench_export_results(app, spreadsheet):
+    import os
+    import tempfile
+
+    from qms.export import write_export
+
+    df = app.get_all_products_view()
+    rows = list(range(0, len(df), 2))
+    path = os.path.join(tempfile.mkdtemp(), "export.parquet")
+
+    def run():
+        # Half the catalogue, as after filtering in Price Lookup
+        write_export(df, path, "Parquet", rows)
+    return run, None
+
+
+def bench_quotation_batch(app, spreadsheet):
+    from datetime import date, timedelta
+
+    from qms import fx, quotation
+
+    catalogue = app.get_all_products_view()
+    quotes = app.get_normalized_quotes()
+    rates = fx.get_rates(fx.EXAMPLE_RATES_PATH)
+    customers = list(quotes['Customer'].value_counts().index[:5])
+    parts = list(quotes['Product_Name'].drop_duplicates().head(20))
+    days = itertools.count()
+
+    def run():
+        # A new date each time, so every document is rendered rather than cached
+        quote_date = date(2026, 1, 1) + timedelta(days=next(days))
+        documents = [quotation.quotation_document(catalogue, quotes, customer, parts, "USD", rates, quote_date)
+                     for customer in customers]
+        quotation.generate(documents, "HTML")
+    return run, None
+
+
+def bench_api_request(app, spreadsheet):
+    import tempfile
+
+    from qms import api, snapshot
+
+    directory = tempfile.mkdtemp(prefix="qms-bench-snapshot-")
+    snapshot.refresh_snapshot(directory, spreadsheet)
+    quote_api = api.QuoteApi(snapshot.get_reader(directory))
+    quote_api.respond("/api/status")
+    products = itertools.cycle(name for _, name in _sample_products(app))
+    requests = itertools.count()
+
+    def run():
+        # A distinct query string each time, so every request misses the response cache
+        part = next(products)
+        n = next(requests)
+        quote_api.respond(f"/api/parts/{part}/quotes?limit={n % 50 + 1}")
+        quote_api.respond(f"/api/parts?q={part[:-(n % 4 + 1)]}&page={n % 3 + 1}")
+    return run, None
+
+
+def bench_add_quote_new_row(app, spreadsheet):
+    counter = itertools.count()
+
+    def run():
+        app.add_quote_to_sheet("USD", "MOS", f"BENCHNEW{next(counter):06d}", 0.1234,
+                               "Bench Customer", "Arrow", "1/2/2026")
+    return run, None
+
+
+def bench_add_quote_existing_row(app, spreadsheet):
+    worksheet = spreadsheet.worksheet("QuoteUSD")
+    headers = sheets.QUOTE_SHEET_HEADERS
+    counter = itertools.count()
+
+    def setup():
+        # Seed a product row with DC-1 filled so the timed call fills DC-2
+        name = f"BENCHOLD{next(counter):06d}"
+        row = [""] * len(headers)
+        row[headers.index('Products')] = "MOS"
+        row[headers.index('Product Name')] = name
+        row[headers.index('DC-1')] = "$0.1000"
+        row[headers.index('End Customer 1')] = "Seed Customer"
+        row[headers.index('Quote Date 1')] = "1/1/2026"
+        worksheet.seed_rows([row])
+        return (name,)
+
+    def run(name):
+        app.add_quote_to_sheet("USD", "MOS", name, 0.1234, "Bench Customer", "Arrow", "1/2/2026")
+    return run, setup
+
+
+def bench_import_quotes(app, spreadsheet):
+    counter = itertools.count()
+
+    def run():
+        # One bulk import: 100 quotes spread over 50 new products
+        batch = next(counter)
+        quotes = [{'product_category': "MOS", 'product_name': f"BENCHIMP{batch:04d}{i % 50:03d}", 'price': 0.1234,
+                   'customer': "Bench Customer", 'distributor': "Arrow", 'quote_date': "1/2/2026"}
+                  for i in range(100)]
+        sheets.add_quotes(spreadsheet, "USD", quotes)
+    return run, None
+
+
+def bench_add_product(app, spreadsheet):
+    columns = app.get_column_names("MOS")
+    counter = itertools.count()
+
+    def run():
+        data = {column: '' for column in columns}
+        data['Magnias P/N'] = f"BENCHPN{next(counter):06d}"
+        data['Quote Date'] = "2026.01.02"
+        data['Parts RMB Price'] = "0.12345"
+        data['Parts USD Price'] = "0.01739"
+        app.update_google_sheet("MOS", data)
+    return run, None
+
+
+BENCHMARKS = {
+    "load_all_data": bench_load_all_data,
+    "get_latest_quotes": bench_get_latest_quotes,
+    "get_latest_quotes_with_distributor": bench_get_latest_quotes_with_distributor,
+    "extract_quotes_from_sheet": bench_extract_quotes_from_sheet,
+    "dashboard_aggregation": bench_dashboard_aggregation,
+    "dashboard_figures": bench_dashboard_figures,
+    "parametric_search": bench_parametric_search,
+    "facet_counts": bench_facet_counts,
+    "similar_parts": bench_similar_parts,
+    "price_history_update": bench_price_history_update,
+    "margin_report": bench_margin_report,
+    "anomaly_check": bench_anomaly_check,
+    "anomaly_scan": bench_anomaly_scan,
+    "lookup_sorted_page": bench_lookup_sorted_page,
+    "export_results": bench_export_results,
+    "quotation_batch": bench_quotation_batch,
+    "api_request": bench_api_request,
+    "add_quote_new_row": bench_add_quote_new_row,
+    "add_quote_existing_row": bench_add_quote_existing_row,
+    "import_quotes": bench_import_quotes,
+    "add_product": bench_add_product,
+}
+
+
+def run_benchmarks(names, rows, quote_rows, repeats, latency_ms, row_latency_us, seed):
+    """Run the selected benchmarks and return the result document"""
+    app = import_app()
+    latency = fake_sheets.LatencyModel(per_call=latency_ms / 1000.0, per_row=row_latency_us / 1e6)
+    spreadsheet = synthetic.build_spreadsheet(rows, quote_rows, seed=seed, latency=latency)
+    restore = fake_sheets.install(app, spreadsheet)
+    results = []
+    try:
+        app.load_all_data()
+        for name in names:
+            run, setup = BENCHMARKS[name](app, spreadsheet)
+            spreadsheet.stats.reset()
+            durations = time_callable(run, repeats=repeats, setup=setup)
+            calls = spreadsheet.stats.snapshot()
+            # Calls are averaged over warmup + timed iterations
+            iterations = repeats + 1
+            results.append({
+                "name": name,
+                "seconds": summarize(durations),
+                "api_calls_per_op": round(spreadsheet.stats.total / iterations, 2),
+                "api_reads_per_op": round(spreadsheet.stats.reads / iterations, 2),
+                "api_writes_per_op": round(spreadsheet.stats.writes / iterations, 2),
+                "api_calls_by_method": {method: count / iterations for method, count in sorted(calls.items())},
+            })
+    finally:
+        restore()
+    return {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "environment": {
+            "python": platform.python_version(),
+            "pandas": sys.modules["pandas"].__version__,
+            "platform": platform.platform(),
+        },
+        "parameters": {
+            "rows_per_category": rows,
+            "quote_rows": quote_rows,
+            "repeats": repeats,
+            "latency_ms": latency_ms,
+            "row_latency_us": row_latency_us,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def compare(current, baseline, threshold):
+    """Print median deltas against a baseline run; return names that regressed"""
+    previous = {entry["name"]: entry for entry in baseline.get("results", [])}
+    regressions = []
+    print(f"{'benchmark':40} {'baseline':>12} {'current':>12} {'ratio':>8}")
+    for entry in current["results"]:
+        before = previous.get(entry["name"])
+        if before is None:
+            continue
+        old = before["seconds"]["median"]
+        new = entry["seconds"]["median"]
+        ratio = new / old if old else float("inf")
+        flag = "  REGRESSION" if ratio > 1 + threshold else ""
+        print(f"{entry['name']:40} {old * 1000:10.2f}ms {new * 1000:10.2f}ms {ratio:8.2f}{flag}")
+        if flag:
+            regressions.append(entry["name"])
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run offline data-layer benchmarks")
+    parser.add_argument("--rows", type=int, default=1000, help="rows per category tab")
+    parser.add_argument("--quote-rows", type=int, default=2000, help="rows in each quote tab")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="simulated latency per API call")
+    parser.add_argument("--row-latency-us", type=float, default=0.0, help="simulated latency per row transferred")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="run only these benchmarks")
+    parser.add_argument("--output", default="benchmark_results.json", help="JSON file to write results to")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative slowdown reported as a regression")
+    args = parser.parse_args(argv)
+
+    names = args.only or list(BENCHMARKS)
+    document = run_benchmarks(names, args.rows, args.quote_rows, args.repeats,
+                              args.latency_ms, args.row_latency_us, args.seed)
+    with open(args.output, "w") as handle:
+        json.dump(document, handle, indent=2)
+
+    for entry in document["results"]:
+        stats = entry["seconds"]
+        print(f"{entry['name']:40} median {stats['median'] * 1000:9.2f}ms  "
+              f"p95 {stats['p95'] * 1000:9.2f}ms  api calls/op {entry['api_calls_per_op']}")
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as handle:
+            baseline = json.load(handle)
+        if compare(document, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
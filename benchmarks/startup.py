@@ -0,0 +1,159 @@
+"""Startup benchmark: cold import of app.py and time to first render.
+
+Every sample runs in a fresh interpreter, as a newly started server process
+would:
+
+    import      `import app` and everything it pulls in at import time
+    login       first script run, which shows the login page
+    dashboard   first signed-in run of the Dashboard, reading worksheets from
+                an Arrow snapshot of the synthetic spreadsheet
+    rerun       the next run of the same page, with modules and caches warm
+
+Usage:
+    python -m benchmarks.startup --repeats 5 --output startup.json
+    python -m benchmarks.startup --baseline startup.json   # compare with an earlier run
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks.harness import PROJECT_ROOT, summarize
+
+STAGES = ["import", "login", "dashboard", "rerun"]
+# Optional modules that should only load on the pages that use them (pandas itself imports base pyarrow)
+HEAVY_MODULES = ["plotly.express", "gspread", "google.oauth2", "pyarrow.parquet", "openpyxl", "reportlab", "http.server"]
+
+
+def _loaded():
+    return [name for name in HEAVY_MODULES if name in sys.modules]
+
+
+def measure_import():
+    start = time.perf_counter()
+    import app  # noqa: F401
+    return {"import": time.perf_counter() - start, "modules": {"import": _loaded()}}
+
+
+def measure_render(snapshot_directory):
+    from streamlit.testing.v1 import AppTest
+
+    script = os.path.join(PROJECT_ROOT, "app.py")
+    result = {"modules": {}}
+
+    login = AppTest.from_file(script, default_timeout=300)
+    start = time.perf_counter()
+    login.run()
+    result["login"] = time.perf_counter() - start
+    result["modules"]["login"] = _loaded()
+
+    os.environ["QMS_SNAPSHOT_DIR"] = snapshot_directory
+    dashboard = AppTest.from_file(script, default_timeout=300)
+    dashboard.session_state["authenticated"] = True
+    dashboard.session_state["username"] = "admin"
+    start = time.perf_counter()
+    dashboard.run()
+    result["dashboard"] = time.perf_counter() - start
+    result["modules"]["dashboard"] = _loaded()
+    start = time.perf_counter()
+    dashboard.run()
+    result["rerun"] = time.perf_counter() - start
+    result["modules"]["rerun"] = _loaded()
+    errors = [str(exception.value) for exception in dashboard.exception]
+    if errors:
+        result["errors"] = errors
+    return result
+
+
+def _child(mode, snapshot_directory):
+    """Run one measurement in a fresh interpreter and return its JSON result"""
+    command = [sys.executable, "-m", "benchmarks.startup", "--child", mode]
+    if snapshot_directory:
+        command += ["--snapshot", snapshot_directory]
+    completed = subprocess.run(command, cwd=PROJECT_ROOT, capture_output=True, text=True, check=True)
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def run_startup(repeats, rows, quote_rows, seed):
+    """Run every stage repeats times and return the result document"""
+    from benchmarks import synthetic
+    from qms import snapshot
+
+    directory = tempfile.mkdtemp(prefix="qms-startup-")
+    try:
+        snapshot.refresh_snapshot(directory, synthetic.build_spreadsheet(rows, quote_rows, seed=seed))
+        samples = {stage: [] for stage in STAGES}
+        modules, errors = {}, []
+        for _ in range(repeats):
+            for mode, arguments in (("import", None), ("render", directory)):
+                result = _child(mode, arguments)
+                for stage in STAGES:
+                    if stage in result:
+                        samples[stage].append(result[stage])
+                modules.update(result["modules"])
+                errors.extend(result.get("errors", []))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    return {
+        "generated": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {"repeats": repeats, "rows": rows, "quote_rows": quote_rows, "seed": seed},
+        "results": [{"name": f"startup_{stage}", "seconds": summarize(samples[stage]),
+                     "heavy_modules_loaded": modules.get(stage, [])} for stage in STAGES],
+        "errors": sorted(set(errors)),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure app import time and time to first render")
+    parser.add_argument("--repeats", type=int, default=5, help="fresh interpreters per stage")
+    parser.add_argument("--rows", type=int, default=1000, help="rows per category tab")
+    parser.add_argument("--quote-rows", type=int, default=2000, help="rows in each quote tab")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="startup_results.json", help="JSON file to write results to")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative slowdown reported as a regression")
+    parser.add_argument("--child", choices=["import", "render"], help=argparse.SUPPRESS)
+    parser.add_argument("--snapshot", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        if PROJECT_ROOT not in sys.path:
+            sys.path.insert(0, PROJECT_ROOT)
+        result = measure_import() if args.child == "import" else measure_render(args.snapshot)
+        print(json.dumps(result))
+        return 0
+
+    document = run_startup(args.repeats, args.rows, args.quote_rows, args.seed)
+    with open(args.output, "w") as handle:
+        json.dump(document, handle, indent=2)
+    for entry in document["results"]:
+        stats = entry["seconds"]
+        loaded = ", ".join(entry["heavy_modules_loaded"]) or "none"
+        print(f"{entry['name']:20} median {stats['median'] * 1000:9.1f}ms  p95 {stats['p95'] * 1000:9.1f}ms  "
+              f"heavy modules: {loaded}")
+    for error in document["errors"]:
+        print(f"Error during render: {error}", file=sys.stderr)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        from benchmarks.run_benchmarks import compare
+
+        with open(args.baseline) as handle:
+            baseline = json.load(handle)
+        if compare(document, baseline, args.threshold):
+            return 1
+    return 0 if not document["errors"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+"""Synthetic data generators for the ten category tabs and the wide quote tabs.
+
+All generators are deterministic for a given seed so benchmark runs are
+comparable. Column layouts come from the app itself (get_column_names and
+qms.sheets.QUOTE_SHEET_HEADERS) so the fake data stays in sync with the real sheets.
+"""
+
+import random
+from datetime import date, timedelta
+
+from benchmarks.fake_sheets import FakeSpreadsheet
+
+CATEGORIES = ["ESD", "CMF", "Transistor", "MOS", "SKY", "Zener", "PowerSwitch", "TVS", "Misc", "SDOthers"]
+
+PACKAGES = ["SOT-23", "SOT-323", "SOD-123", "SOD-323", "SOD-523", "DFN1006", "DFN2020", "SOP-8", "TO-252", "SMA", "SMB"]
+FG_SUPPLIERS = ["Yangjie", "Changjing", "Wayon", "Leiditech", "Prisemi", "Slkor", "Goodwork", "Hottech", "UMW", "Lrc"]
+WAFER_SUPPLIERS = ["Silan", "CR Micro", "Hua Hong", "SMIC", "Nexchip"]
+# Customer and distributor names deliberately include spelling variants of the same company
+CUSTOMERS = [
+    "Huawei", "HUAWEI", "Huawei Technologies", "BYD", "BYD Co., Ltd", "Xiaomi", "XiaoMi", "Oppo", "OPPO",
+    "Vivo", "Lenovo", "Lenovo Ltd.", "TCL", "Hisense", "Haier", "Midea", "Gree", "Foxconn", "Luxshare",
+    "Goertek", "Sunwoda", "Desay", "Inventec", "Quanta", "Pegatron", "Wingtech", "Huaqin", "Longcheer",
+]
+DISTRIBUTORS = ["", "", "Arrow", "Avnet", "WPG", "WPI", "Comtech", "Cogobuy", "Excelpoint", "Excel Point", "Future"]
+
+RMB_PER_USD = 7.1
+
+
+def _part_number(category, index):
+    return f"MG{category[:3].upper()}{index:06d}"
+
+
+def _catalogue_value(column, category, index, rng, today):
+    """Generate a plausible value for one catalogue cell"""
+    if column == 'Quote Date':
+        quote_day = today - timedelta(days=rng.randint(0, 900))
+        return quote_day.strftime('%Y.%m.%d')
+    if column in ('Magnias P/N', 'Product Name'):
+        return _part_number(category, index)
+    if column == 'Package':
+        return rng.choice(PACKAGES)
+    if column in ('FG Supplier', 'Finished product supplier'):
+        return rng.choice(FG_SUPPLIERS)
+    if column in ('FG Supplier P/N', 'Finished Product Supplier Material Name'):
+        return f"{rng.choice('ABCDEFGHJK')}{rng.randint(1000, 99999)}"
+    if column == 'Wafer Supplier':
+        return rng.choice(WAFER_SUPPLIERS)
+    if column == 'Wafer Supplier P/N':
+        return f"W{rng.randint(10000, 99999)}"
+    if column == 'Magnias Wafer P/N':
+        return f"MGW{index:06d}"
+    if column == 'Wafer Price (RMB)':
+        return f"{rng.uniform(8, 60):.5f}"
+    if column == 'Type':
+        return rng.choice(["N-Channel", "P-Channel"])
+    if column == 'Polarity':
+        return rng.choice(["NPN", "PNP"])
+    if column == 'VDS (V)':
+        return rng.choice([20, 30, 40, 60, 100, 150, 200])
+    if column == 'ID (A)':
+        return round(rng.uniform(0.1, 80), 1)
+    if column == 'IF (mA)':
+        return rng.choice([100, 200, 500, 1000, 2000, 3000])
+    if column == 'IFSM (A)':
+        return rng.choice([1, 2, 5, 10, 30, 50])
+    if column == 'VRRM (V)':
+        return rng.choice([20, 30, 40, 60, 100, 200])
+    if column == 'Vf @ If= 1mA':
+        return round(rng.uniform(0.2, 0.6), 3)
+    if column == 'PPK @ 10/1000us (W)':
+        return rng.choice([200, 400, 600, 1500, 3000])
+    if column == 'Notes':
+        return "" if rng.random() < 0.9 else "EOL soon"
+    return ""
+
+
+def generate_category_rows(category, row_count, seed=0, column_names=None):
+    """Return [header, *rows] for one category tab"""
+    if column_names is None:
+        from app import get_column_names
+        column_names = get_column_names
+    rng = random.Random(f"{seed}-{category}")
+    today = date.today()
+    columns = column_names(category)
+    rows = [columns]
+    for index in range(row_count):
+        values = {column: _catalogue_value(column, category, index, rng, today) for column in columns}
+        # Keep RMB/USD price pairs and distributor prices consistent with each other
+        parts_rmb = rng.uniform(0.01, 3.0)
+        values['Parts RMB Price'] = f"{parts_rmb:.5f}"
+        values['Parts USD Price'] = f"{parts_rmb / RMB_PER_USD:.5f}"
+        if 'Distributor RMB Price' in values:
+            values['Distributor RMB Price'] = f"{parts_rmb * 1.15:.5f}"
+            values['Distributor USD Price'] = f"{parts_rmb * 1.15 / RMB_PER_USD:.5f}"
+        rows.append([values.get(column, "") for column in columns])
+    return rows
+
+
+def generate_quote_rows(currency, catalogue_sizes, quote_rows, seed=0, headers=None):
+    """Return [header, *rows] for a wide QuoteUSD/QuoteRMB tab.
+
+    Each row is one product with between one and eight filled DC slots.
+    catalogue_sizes maps category to number of products so quoted part
+    numbers exist in the catalogue tabs.
+    """
+    if headers is None:
+        from qms.sheets import QUOTE_SHEET_HEADERS
+        headers = QUOTE_SHEET_HEADERS
+    rng = random.Random(f"{seed}-quote-{currency}")
+    today = date.today()
+    symbol = "$" if currency == "USD" else "¥"
+    scale = 1.0 if currency == "USD" else RMB_PER_USD
+    weighted = [category for category, size in catalogue_sizes.items() if size > 0]
+    rows = [list(headers)]
+    column_index = {header: position for position, header in enumerate(headers)}
+    for _ in range(quote_rows):
+        category = rng.choice(weighted)
+        product_index = rng.randrange(catalogue_sizes[category])
+        row = [""] * len(headers)
+        row[column_index['Products']] = category
+        row[column_index['Product Name']] = _part_number(category, product_index)
+        base_price = rng.uniform(0.01, 0.5) * scale
+        for slot in range(1, rng.randint(1, 8) + 1):
+            customer_col = f'End Customers {slot}' if f'End Customers {slot}' in column_index else f'End Customer {slot}'
+            quote_day = today - timedelta(days=rng.randint(0, 730))
+            price = base_price * rng.uniform(0.85, 1.15)
+            row[column_index[f'DC-{slot}']] = f"{symbol}{price:.4f}"
+            row[column_index[f'Quote Date {slot}']] = f"{quote_day.month}/{quote_day.day}/{quote_day.year}"
+            row[column_index[customer_col]] = rng.choice(CUSTOMERS)
+            row[column_index[f'Distributor-{slot}']] = rng.choice(DISTRIBUTORS)
+        rows.append(row)
+    return rows
+
+
+def build_spreadsheet(rows_per_category=500, quote_rows=2000, seed=0, latency=None, stats=None):
+    """Build a FakeSpreadsheet populated with all twelve worksheets"""
+    spreadsheet = FakeSpreadsheet(latency=latency, stats=stats)
+    if isinstance(rows_per_category, int):
+        sizes = {category: rows_per_category for category in CATEGORIES}
+    else:
+        sizes = dict(rows_per_category)
+    for category in CATEGORIES:
+        spreadsheet.add_worksheet_rows(category, generate_category_rows(category, sizes.get(category, 0), seed))
+    for currency in ("USD", "RMB"):
+        spreadsheet.add_worksheet_rows(f"Quote{currency}", generate_quote_rows(currency, sizes, quote_rows, seed))
+    return spreadsheet
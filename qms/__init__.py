@@ -0,0 +1 @@
+"""Data and search engines for the Quotation Management System, free of any Streamlit UI code"""
@@ -0,0 +1,7 @@
+"""python -m qms: see qms.cli"""
+
+import sys
+
+from qms.cli import main
+
+sys.exit(main())
@@ -0,0 +1,162 @@
+"""Price anomaly detection over the normalized quote table.
+
+Prices are compared on a log scale, so a slipped decimal point (1.7501 for
+0.17501) is the same distance from the norm whatever the product's price.
+Per product and currency the detector keeps the median and median absolute
+deviation (MAD) of log prices plus each customer's last price. Like
+PriceHistory, it fingerprints every product's quotes on update and
+recomputes statistics only for the products that changed; checking a new
+quote is then a couple of dictionary lookups.
+"""
+
+import numpy as np
+import pandas as pd
+
+from qms.normalize import to_text
+
+# Modified z-score (0.6745 * deviation / MAD) above which a price is an outlier
+OUTLIER_Z = 3.5
+# Quotes a product needs in a currency before its spread is trusted
+MIN_HISTORY = 3
+# Floor on the MAD of log prices, so products always quoted at one price still
+# tolerate small changes
+MIN_SPREAD = np.log1p(0.05)
+# A price this many times above or below the customer's last one is flagged
+CUSTOMER_RATIO = 3.0
+
+REPORT_COLUMNS = [
+    'Product_Category', 'Product_Name', 'Currency', 'Customer', 'Quote_Date', 'Price',
+    'Median Price', 'Robust Z', 'Previous Price', 'Reason',
+]
+
+# Columns whose change means a quote changed
+_IDENTITY_COLUMNS = ['Product_Name', 'Currency', 'Raw_Price', 'Customer', 'Distributor', 'Raw_Date']
+
+
+def _key(value):
+    return str(value).strip().casefold()
+
+
+def _usable(quotes):
+    quotes = quotes[quotes['Price'].notna() & (quotes['Price'] > 0)]
+    return quotes.assign(
+        Key=to_text(quotes['Product_Name']).str.casefold(),
+        Customer_Key=to_text(quotes['Customer']).str.casefold(),
+        Log_Price=np.log(quotes['Price'].to_numpy(dtype=float)),
+    )
+
+
+def _group_statistics(quotes):
+    """Median, MAD and count of log price per product and currency, aligned to each quote"""
+    groups = quotes.groupby(['Key', 'Currency'], sort=False)['Log_Price']
+    median = groups.transform('median')
+    deviation = (quotes['Log_Price'] - median).abs()
+    mad = deviation.groupby([quotes['Key'], quotes['Currency']], sort=False).transform('median')
+    return median, np.maximum(mad, MIN_SPREAD), groups.transform('size')
+
+
+def _robust_z(log_price, median, mad):
+    return 0.6745 * (log_price - median) / mad
+
+
+def _ratio_text(ratio):
+    return f"{ratio:.1f}x" if ratio >= 1 else f"1/{1 / ratio:.1f}x"
+
+
+class QuoteAnomalies:
+    """Per-product price statistics for outlier checks on new quotes and over the history"""
+
+    def __init__(self):
+        self._stats = {}
+        self._last = {}
+        self._signatures = pd.Series(dtype='uint64')
+        self.version = 0
+
+    def update(self, quotes):
+        """Bring the statistics in line with a normalized quote table; returns the products rebuilt"""
+        quotes = _usable(quotes)
+        row_hashes = pd.util.hash_pandas_object(quotes[_IDENTITY_COLUMNS], index=False)
+        # Order-independent fingerprint of each product's quotes (sums wrap around)
+        signatures = pd.Series(row_hashes.to_numpy(), index=quotes['Key'].to_numpy()).groupby(level=0).sum()
+
+        previous = self._signatures
+        common = signatures.index.intersection(previous.index)
+        unchanged = common[signatures[common].to_numpy() == previous[common].to_numpy()]
+        changed = signatures.index.difference(unchanged)
+        removed = previous.index.difference(signatures.index)
+        for key in removed.union(changed):
+            self._stats.pop(key, None)
+            self._last.pop(key, None)
+        if len(changed):
+            self._rebuild(quotes[quotes['Key'].isin(changed).to_numpy()])
+        self._signatures = signatures
+        if len(changed) or len(removed):
+            self.version += 1
+        return len(changed) + len(removed)
+
+    def _rebuild(self, quotes):
+        median, mad, count = _group_statistics(quotes)
+        stats = pd.DataFrame({'Key': quotes['Key'], 'Currency': quotes['Currency'],
+                              'Median': median, 'MAD': mad, 'Count': count}).drop_duplicates(['Key', 'Currency'])
+        for key, currency, median, mad, count in zip(*(stats[column].tolist() for column in stats.columns)):
+            self._stats.setdefault(key, {})[currency] = (median, mad, count)
+        # Undated quotes sort first, so a dated quote is always the "last" one when there is any
+        latest = quotes.sort_values('Quote_Date', kind='stable', na_position='first')
+        latest = latest.drop_duplicates(['Key', 'Currency', 'Customer_Key'], keep='last')
+        columns = ['Key', 'Currency', 'Customer_Key', 'Price']
+        for key, currency, customer, price in zip(*(latest[column].tolist() for column in columns)):
+            self._last.setdefault(key, {})[(currency, customer)] = price
+
+    def check(self, product_name, currency, price, customer=None):
+        """Reasons a new quote's price looks wrong; empty when it looks normal"""
+        if price is None or not price > 0:
+            return []
+        key = _key(product_name)
+        reasons = []
+        stats = self._stats.get(key, {}).get(currency)
+        if stats is not None and stats[2] >= MIN_HISTORY:
+            median, mad, _ = stats
+            z = _robust_z(np.log(price), median, mad)
+            if abs(z) > OUTLIER_Z:
+                reasons.append(f"{_ratio_text(price / np.exp(median))} the median {currency} quote "
+                               f"({np.exp(median):.5f}) for this product")
+        if customer:
+            last = self._last.get(key, {}).get((currency, _key(customer)))
+            if last is not None:
+                ratio = price / last
+                if ratio > CUSTOMER_RATIO or ratio < 1 / CUSTOMER_RATIO:
+                    reasons.append(f"{_ratio_text(ratio)} this customer's last {currency} quote ({last:.5f})")
+        return reasons
+
+
+def scan(quotes):
+    """Every historical quote that is an outlier for its product or against the customer's previous quote.
+
+    One vectorized pass: group medians and MADs by transform, and each
+    customer's previous price by a grouped shift in date order.
+    """
+    quotes = _usable(quotes)
+    if quotes.empty:
+        return pd.DataFrame(columns=REPORT_COLUMNS)
+    median, mad, count = _group_statistics(quotes)
+    z = _robust_z(quotes['Log_Price'], median, mad).where(count >= MIN_HISTORY)
+
+    ordered = quotes.sort_values('Quote_Date', kind='stable', na_position='first')
+    previous = ordered.groupby(['Key', 'Currency', 'Customer_Key'], sort=False)['Price'].shift(1).reindex(quotes.index)
+    ratio = quotes['Price'] / previous
+
+    outlier = z.abs() > OUTLIER_Z
+    jump = (ratio > CUSTOMER_RATIO) | (ratio < 1 / CUSTOMER_RATIO)
+    reason = np.select(
+        [outlier & jump, outlier, jump],
+        ["Product outlier; jump from customer's previous quote", "Product outlier", "Jump from customer's previous quote"],
+        default=""
+    )
+    report = quotes.assign(**{
+        'Median Price': np.exp(median),
+        'Robust Z': z,
+        'Previous Price': previous,
+        'Reason': reason,
+    })[(outlier | jump).to_numpy()]
+    order = report['Robust Z'].abs().fillna(0).sort_values(ascending=False, kind='stable').index
+    return report.loc[order, REPORT_COLUMNS].reset_index(drop=True)
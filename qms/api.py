@@ -0,0 +1,312 @@
+"""Read-only JSON API over the published snapshot, for ERP and pricing scripts.
+
+Integrations call this instead of scraping the spreadsheet, so they cost no
+Sheets quota: responses are built from the memory-mapped snapshot the app
+workers share, with the same engines the app uses (substring part search,
+per-product price history, canonical customer names).
+
+    GET /api/status
+    GET /api/parts?q=SMBJ&category=TVS&page=1&page_size=50
+    GET /api/parts/<part>
+    GET /api/parts/<part>/quotes?currency=USD&customer=Midea&limit=10
+    GET /api/parts/<part>/history?currency=USD&resolution=month&page=1
+
+Quote and history responses include the quotes archived out of the sheet
+when an archive directory is configured. Every response carries an ETag
+derived from the snapshot, alias map and archive versions and the request, so a client sending If-None-Match gets a 304
+without the response being rebuilt. Rendered responses are kept in a
+process-wide LRU cache until a new snapshot is published.
+"""
+
+import hashlib
+import hmac
+import json
+import logging
+import threading
+from datetime import date, datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from qms import names
+from qms.archive import QuoteArchive
+from qms.facets import product_keys
+from qms.history import PriceHistory, summarize
+from qms.normalize import to_text
+from qms.search import IncrementalSearch, LRUCache, page_bounds
+from qms.workspace import Workspace
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 8765
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+LATEST_QUOTES = 10
+MAX_LATEST_QUOTES = 100
+RESPONSE_CACHE_SIZE = 1024
+# Catalogue columns searched by /api/parts?q=
+PART_SEARCH_COLUMNS = ['Product Name', 'Magnias P/N']
+# Query values of resolution= and the pandas period code each one resamples to
+HISTORY_RESOLUTIONS = {"quote": None, "month": "M", "quarter": "Q"}
+QUOTE_FIELDS = ['Quote_Date', 'Currency', 'Price', 'Customer', 'Distributor']
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _json_value(value):
+    if isinstance(value, (pd.Timestamp, datetime, date)):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+def _records(frame):
+    """Rows as dicts, with missing values as null"""
+    values = frame.astype(object).where(frame.notna(), None)
+    columns = [str(column) for column in frame.columns]
+    return [dict(zip(columns, row)) for row in values.itertuples(index=False, name=None)]
+
+
+def _integer(query, name, default, low, high):
+    raw = query.get(name, [None])[0]
+    if raw in (None, ''):
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        raise ApiError(400, f"{name} must be an integer")
+    if not low <= value <= high:
+        raise ApiError(400, f"{name} must be between {low} and {high}")
+    return value
+
+
+def _text(query, name):
+    return (query.get(name, [''])[0] or '').strip()
+
+
+def _page(frame, query):
+    page_size = _integer(query, 'page_size', DEFAULT_PAGE_SIZE, 1, MAX_PAGE_SIZE)
+    page = _integer(query, 'page', 1, 1, 10 ** 9)
+    start, stop, pages = page_bounds(len(frame), page, page_size)
+    return {'data': _records(frame.iloc[start:stop]), 'page': min(page, pages), 'page_size': page_size,
+            'pages': pages, 'total': len(frame)}
+
+
+class _Data:
+    """Catalogue, search index and price history of one snapshot version"""
+
+    def __init__(self, current, aliases_path, previous_history, archive_directory=None):
+        workspace = Workspace(current=current, aliases_path=aliases_path, archive_directory=archive_directory)
+        self.version = current.version
+        self.created = current.created
+        self.catalogue = workspace.catalogue()
+        self.keys = product_keys(self.catalogue).to_numpy()
+        self.search = IncrementalSearch(self.catalogue, PART_SEARCH_COLUMNS)
+        self.search_lock = threading.Lock()
+        # Updated from a copy: requests still answering from the previous version keep reading its history
+        self.history = previous_history.copy()
+        self.history.update(workspace.history())
+
+
+class QuoteApi:
+    """Request handling independent of the HTTP server, over a SnapshotReader"""
+
+    def __init__(self, reader, aliases_path=names.DEFAULT_ALIASES_PATH, token=None, archive_directory=None):
+        self.reader = reader
+        self.aliases_path = aliases_path
+        self.token = token
+        self.archive = QuoteArchive(archive_directory) if archive_directory else None
+        self._data = None
+        self._data_key = None
+        # The latest version's history; the next one copies it and rebuilds only the products whose quotes changed
+        self._history = PriceHistory()
+        self._lock = threading.Lock()
+        self._responses = LRUCache(RESPONSE_CACHE_SIZE)
+        self._responses_lock = threading.Lock()
+
+    def _version(self):
+        current = self.reader.current()
+        if current is None:
+            raise ApiError(503, "No snapshot has been published yet")
+        archive_version = self.archive.version if self.archive is not None else None
+        return current, (current.version, names.aliases_version(self.aliases_path), archive_version)
+
+    def _current_data(self, current, key):
+        with self._lock:
+            if self._data_key != key:
+                self._data = _Data(current, self.aliases_path, self._history,
+                                   self.archive.directory if self.archive is not None else None)
+                self._data_key = key
+                self._history = self._data.history
+                with self._responses_lock:
+                    self._responses.clear()
+            return self._data
+
+    def authorized(self, header):
+        if not self.token:
+            return True
+        scheme, _, supplied = (header or '').partition(' ')
+        return scheme.lower() == 'bearer' and hmac.compare_digest(supplied.strip(), self.token)
+
+    def respond(self, target, if_none_match=None):
+        """(status, ETag or None, JSON body bytes or None) for a GET of target"""
+        url = urlsplit(target)
+        query = parse_qs(url.query)
+        try:
+            current, key = self._version()
+            canonical = json.dumps([key, url.path, sorted(query.items())], default=str)
+            etag = f'"{hashlib.sha1(canonical.encode()).hexdigest()[:24]}"'
+            tags = [tag.strip() for tag in if_none_match.split(',')] if if_none_match else []
+            if etag in tags:
+                return 304, etag, None
+            with self._responses_lock:
+                body = self._responses.get(etag)
+            if body is None:
+                data = self._current_data(current, key)
+                payload = self._route(data, [unquote(part) for part in url.path.strip('/').split('/')], query)
+                body = json.dumps(payload, default=_json_value, ensure_ascii=False).encode('utf-8')
+                with self._responses_lock:
+                    self._responses.put(etag, body)
+            # "*" matches any existing resource, so it is honoured only once the route has resolved
+            if '*' in tags:
+                return 304, etag, None
+            return 200, etag, body
+        except ApiError as e:
+            return e.status, None, json.dumps({'error': str(e)}).encode('utf-8')
+        except Exception:
+            logger.exception("Error answering %s", target)
+            return 500, None, json.dumps({'error': "Internal server error"}).encode('utf-8')
+
+    def _route(self, data, parts, query):
+        if parts[:1] != ['api']:
+            raise ApiError(404, "Not found")
+        if parts[1:] == ['status']:
+            return {'snapshot_version': data.version, 'snapshot_created': data.created,
+                    'parts': len(data.catalogue), 'products_quoted': len(data.history)}
+        if parts[1:2] == ['parts']:
+            if len(parts) == 2:
+                return self._search(data, query)
+            if len(parts) == 3:
+                return self._part(data, parts[2])
+            if len(parts) == 4 and parts[3] == 'quotes':
+                return self._latest_quotes(data, parts[2], query)
+            if len(parts) == 4 and parts[3] == 'history':
+                return self._history_page(data, parts[2], query)
+        raise ApiError(404, "Not found")
+
+    def _search(self, data, query):
+        with data.search_lock:
+            positions = data.search.search(_text(query, 'q'))
+        results = data.catalogue.iloc[positions]
+        category = _text(query, 'category')
+        if category and 'Category' in results.columns:
+            results = results[to_text(results['Category']).str.casefold().eq(category.casefold()).to_numpy()]
+        return _page(results, query)
+
+    def _rows(self, data, part):
+        rows = data.catalogue[data.keys == part.strip().casefold()]
+        if rows.empty:
+            raise ApiError(404, f"Part {part} is not in the catalogue")
+        return rows
+
+    def _part(self, data, part):
+        return {'data': _records(self._rows(data, part))}
+
+    def _series(self, data, part, query):
+        currency = _text(query, 'currency').upper() or None
+        customer = _text(query, 'customer') or None
+        series = data.history.series(part, currency=currency)
+        if customer is not None:
+            # Any spelling of the customer: the history holds canonical names
+            wanted = names.name_key(customer)
+            series = series[series['Customer'].map(names.name_key).eq(wanted).to_numpy()]
+        return series
+
+    def _latest_quotes(self, data, part, query):
+        limit = _integer(query, 'limit', LATEST_QUOTES, 1, MAX_LATEST_QUOTES)
+        series = self._series(data, part, query)
+        if series.empty and not (data.keys == part.strip().casefold()).any():
+            raise ApiError(404, f"Part {part} is not in the catalogue")
+        return {'data': _records(series[QUOTE_FIELDS].iloc[::-1].head(limit))}
+
+    def _history_page(self, data, part, query):
+        resolution = _text(query, 'resolution') or 'quote'
+        if resolution not in HISTORY_RESOLUTIONS:
+            raise ApiError(400, f"resolution must be one of {', '.join(HISTORY_RESOLUTIONS)}")
+        frequency = HISTORY_RESOLUTIONS[resolution]
+        series = self._series(data, part, query)
+        if frequency is not None:
+            series = summarize(series, frequency)
+        return _page(series, query)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "QMSApi/1"
+
+    def do_GET(self):
+        self._handle(send_body=True)
+
+    def do_HEAD(self):
+        self._handle(send_body=False)
+
+    def _refuse(self):
+        self._send(405, None, json.dumps({'error': "This API is read-only"}).encode(), True, {'Allow': 'GET, HEAD'})
+
+    do_POST = do_PUT = do_PATCH = do_DELETE = _refuse
+
+    def _handle(self, send_body):
+        api = self.server.api
+        if not api.authorized(self.headers.get('Authorization')):
+            self._send(401, None, json.dumps({'error': "Missing or wrong API token"}).encode(), send_body,
+                       {'WWW-Authenticate': 'Bearer'})
+            return
+        status, etag, body = api.respond(self.path, self.headers.get('If-None-Match'))
+        self._send(status, etag, body, send_body)
+
+    def _send(self, status, etag, body, send_body, extra=None):
+        self.send_response(status)
+        if etag:
+            self.send_header('ETag', etag)
+            # Clients may keep responses but must revalidate: a new snapshot can land at any time
+            self.send_header('Cache-Control', 'no-cache')
+        for name, value in (extra or {}).items():
+            self.send_header(name, value)
+        if body is not None:
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if body is not None and send_body:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.info("%s %s", self.address_string(), format % args)
+
+
+class ApiServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, api):
+        super().__init__(address, _Handler)
+        self.api = api
+
+
+_servers = {}
+_servers_lock = threading.Lock()
+
+
+def start_server(reader, host="127.0.0.1", port=DEFAULT_PORT, aliases_path=names.DEFAULT_ALIASES_PATH, token=None,
+                 archive_directory=None):
+    """Process-wide API server on a background thread, started once per address"""
+    with _servers_lock:
+        if (host, port) not in _servers:
+            server = ApiServer((host, port), QuoteApi(reader, aliases_path, token, archive_directory))
+            threading.Thread(target=server.serve_forever, name="qms-api", daemon=True).start()
+            _servers[(host, port)] = server
+        return _servers[(host, port)]
@@ -0,0 +1,363 @@
+"""Cold storage for old quotes: compressed Parquet files, one per year.
+
+The QuoteUSD/QuoteRMB tabs only need recent quotes, and every load, write
+and dashboard run pays for each row they hold. archive_quotes() (`python -m
+qms archive`) moves the quotes older than a horizon out of the tabs. They
+are added to <directory>/year=YYYY/quotes-vNNNNNN.parquet (zstd), so each
+year stays one file, and archive.json (the manifest) is replaced atomically
+with the run marked pending. Only then are their DC slots cleared in the
+sheet, which also frees the slots for new quotes: each tab is read again
+and a quote is cleared only where it still stands, so a row inserted,
+sorted or edited meanwhile is never cleared blindly. A quote edited before
+it could be cleared stays in the sheet and is taken out of the archive
+again. A run interrupted after the manifest was written is finished by the
+next one instead of being archived twice.
+
+union_quotes() puts hot and archived quotes back together for history
+queries. The manifest records each year's date range, so a query with a
+date range opens only the years that overlap it. Year tables are cached per
+process; a rewritten year is a new file, so cached tables never go stale.
+"""
+
+import json
+import os
+import threading
+from datetime import datetime
+
+import pandas as pd
+
+from qms.normalize import QUOTE_COLUMNS, customer_column, normalize_quotes
+from qms.search import LRUCache
+
+MANIFEST = "archive.json"
+COMPRESSION = "zstd"
+DEFAULT_HORIZON_DAYS = 730
+PARTITION_CACHE_SIZE = 32
+# Normalized quote columns returned by reads (sheet positions mean nothing once archived)
+ARCHIVE_COLUMNS = [column for column in QUOTE_COLUMNS if column not in ('Slot', 'Source_Row')]
+# Stored with each row: the run that archived it and where it stood in the sheet
+RUN_COLUMNS = ['Archive_Run', 'Source_Row', 'Slot']
+# What a quote's DC slot holds, to find it in the sheet again
+SLOT_CONTENTS = ['Product_Category', 'Product_Name', 'Slot', 'Raw_Price', 'Customer', 'Distributor', 'Raw_Date']
+
+_partitions = LRUCache(PARTITION_CACHE_SIZE)
+_partitions_lock = threading.Lock()
+
+
+def read_manifest(directory):
+    """Current manifest, or an empty one when nothing has been archived yet"""
+    try:
+        with open(os.path.join(directory, MANIFEST)) as handle:
+            return json.load(handle)
+    except FileNotFoundError:
+        return {"version": 0, "partitions": {}, "pending_run": None}
+
+
+def _typed(frame):
+    frame = frame.reindex(columns=ARCHIVE_COLUMNS + RUN_COLUMNS)
+    frame['Quote_Date'] = pd.to_datetime(frame['Quote_Date']).astype('datetime64[ns]')
+    frame['Price'] = pd.to_numeric(frame['Price'], errors='coerce')
+    for column in RUN_COLUMNS:
+        frame[column] = pd.to_numeric(frame[column], errors='coerce').astype('Int64')
+    return frame
+
+
+def _positions_list(quotes):
+    """(currency, source row, slot) of each quote"""
+    return list(zip(quotes['Currency'], quotes['Source_Row'].astype(int), quotes['Slot'].astype(int)))
+
+
+class QuoteArchive:
+    """Archived quotes under a directory, one Parquet file per year"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._manifest = None
+        self._manifest_key = None
+
+    def manifest(self):
+        """Current manifest, read again only when the file has changed"""
+        try:
+            stat = os.stat(os.path.join(self.directory, MANIFEST))
+        except FileNotFoundError:
+            return read_manifest(self.directory)
+        key = (stat.st_mtime_ns, stat.st_size)
+        if key != self._manifest_key:
+            self._manifest = read_manifest(self.directory)
+            self._manifest_key = key
+        return self._manifest
+
+    @property
+    def version(self):
+        """Changes whenever archived quotes are added or removed"""
+        return self.manifest()["version"]
+
+    @property
+    def pending_run(self):
+        """Run whose quotes are archived but may not all be cleared from the sheet yet, or None"""
+        return self.manifest().get("pending_run")
+
+    def partitions(self, since=None, until=None):
+        """Manifest entries of the years with quotes on or after since and before until, oldest first"""
+        selected = []
+        for year, entry in sorted(self.manifest()["partitions"].items()):
+            if since is not None and pd.Timestamp(entry["max_date"]) < pd.Timestamp(since):
+                continue
+            if until is not None and pd.Timestamp(entry["min_date"]) >= pd.Timestamp(until):
+                continue
+            selected.append(entry)
+        return selected
+
+    def _read_partition(self, entry):
+        path = os.path.join(self.directory, entry["file"])
+        with _partitions_lock:
+            cached = _partitions.get(path)
+        if cached is None:
+            import pyarrow.parquet as pq
+
+            cached = _typed(pq.read_table(path).to_pandas())
+            with _partitions_lock:
+                _partitions.put(path, cached)
+        return cached
+
+    def _rows(self, since=None, until=None):
+        frames = [self._read_partition(entry) for entry in self.partitions(since, until)]
+        if not frames:
+            return _typed(pd.DataFrame(columns=ARCHIVE_COLUMNS))
+        return pd.concat(frames, ignore_index=True)
+
+    def read(self, since=None, until=None, columns=None):
+        """Archived quotes dated on or after since and before until, reading only the years that overlap"""
+        quotes = self._rows(since, until)
+        if since is not None:
+            quotes = quotes[quotes['Quote_Date'] >= pd.Timestamp(since)]
+        if until is not None:
+            quotes = quotes[quotes['Quote_Date'] < pd.Timestamp(until)]
+        quotes = quotes[ARCHIVE_COLUMNS].reset_index(drop=True)
+        return quotes if columns is None else quotes[columns]
+
+    def run_quotes(self, run):
+        """Quotes archived by one run, with the sheet positions they were read from"""
+        quotes = self._rows()
+        return quotes[quotes['Archive_Run'].eq(run).fillna(False).to_numpy()].reset_index(drop=True)
+
+    def _write_year(self, year, rows, version):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        rows = rows.sort_values('Quote_Date', kind='stable').reset_index(drop=True)
+        name = f"year={year}/quotes-v{version:06d}.parquet"
+        path = os.path.join(self.directory, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        pq.write_table(pa.Table.from_pandas(rows, preserve_index=False), path + ".tmp", compression=COMPRESSION)
+        os.replace(path + ".tmp", path)
+        return {
+            "file": name,
+            "rows": len(rows),
+            "min_date": rows['Quote_Date'].min().isoformat(),
+            "max_date": rows['Quote_Date'].max().isoformat(),
+        }
+
+    def _publish(self, version, partitions, pending_run, superseded):
+        manifest = {"version": version, "updated": datetime.now().isoformat(timespec="seconds"),
+                    "partitions": partitions, "pending_run": pending_run}
+        temporary = os.path.join(self.directory, MANIFEST + ".tmp")
+        with open(temporary, "w") as handle:
+            json.dump(manifest, handle, indent=2)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(temporary, os.path.join(self.directory, MANIFEST))
+        stat = os.stat(os.path.join(self.directory, MANIFEST))
+        self._manifest, self._manifest_key = manifest, (stat.st_mtime_ns, stat.st_size)
+        for name in superseded:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+
+    def write(self, quotes):
+        """Archive normalized quotes (with Source_Row and Slot) as a new pending run; returns (run, rows per year).
+
+        Every row is kept, so identical quotes from different slots are all archived.
+        """
+        if self.pending_run is not None:
+            raise RuntimeError(f"Archive run {self.pending_run} has not been finished")
+        quotes = quotes[pd.to_datetime(quotes['Quote_Date']).notna()]
+        if quotes.empty:
+            return None, {}
+        os.makedirs(self.directory, exist_ok=True)
+        manifest = self.manifest()
+        version = manifest["version"] + 1
+        quotes = _typed(quotes.assign(Archive_Run=version))
+        partitions = dict(manifest["partitions"])
+        added = {}
+        superseded = []
+        for year, group in quotes.groupby(quotes['Quote_Date'].dt.year):
+            year = str(int(year))
+            previous = partitions.get(year)
+            rows = pd.concat([self._read_partition(previous), group], ignore_index=True) if previous else group
+            partitions[year] = self._write_year(year, rows, version)
+            added[year] = len(group)
+            if previous:
+                superseded.append(previous["file"])
+        self._publish(version, partitions, version, superseded)
+        return version, added
+
+    def finish(self, run, dropped=()):
+        """Mark run done, first taking out its quotes at the (currency, source row, slot) positions in dropped"""
+        manifest = self.manifest()
+        dropped = set(dropped)
+        version = manifest["version"]
+        partitions = dict(manifest["partitions"])
+        superseded = []
+        if dropped:
+            version += 1
+            for year, entry in manifest["partitions"].items():
+                rows = self._read_partition(entry)
+                in_run = rows['Archive_Run'].eq(run).fillna(False).to_numpy()
+                if not in_run.any():
+                    continue
+                positions = zip(rows['Currency'], rows['Source_Row'].fillna(-1).astype(int),
+                                rows['Slot'].fillna(-1).astype(int))
+                remove = in_run & pd.Series([position in dropped for position in positions]).to_numpy()
+                if not remove.any():
+                    continue
+                kept = rows[~remove]
+                if kept.empty:
+                    del partitions[year]
+                else:
+                    partitions[year] = self._write_year(year, kept, version)
+                superseded.append(entry["file"])
+        self._publish(version, partitions, None, superseded)
+
+
+_archives = {}
+_archives_lock = threading.Lock()
+
+
+def get_archive(directory):
+    """Process-wide archive for a directory"""
+    directory = os.path.abspath(directory)
+    with _archives_lock:
+        if directory not in _archives:
+            _archives[directory] = QuoteArchive(directory)
+        return _archives[directory]
+
+
+def union_quotes(hot, archive, since=None, until=None):
+    """Hot normalized quotes and archived ones in [since, until) as one table with hot's columns.
+
+    Archived rows have no Slot or Source_Row. Without an archive this is hot, filtered by date.
+    """
+    if since is not None:
+        hot = hot[hot['Quote_Date'] >= pd.Timestamp(since)]
+    if until is not None:
+        hot = hot[hot['Quote_Date'] < pd.Timestamp(until)]
+    if archive is None:
+        return hot.reset_index(drop=True)
+    cold = archive.read(since, until)
+    if cold.empty:
+        return hot.reset_index(drop=True)
+    if hot.empty:
+        return cold.reindex(columns=hot.columns)
+    return pd.concat([hot, cold.reindex(columns=hot.columns)], ignore_index=True)
+
+
+def _read_tab(spreadsheet, currency):
+    """(worksheet, header, normalized quotes) of one quote tab, read now"""
+    worksheet = spreadsheet.worksheet(f"Quote{currency}")
+    values = worksheet.get_all_values()
+    if len(values) < 2:
+        return worksheet, list(values[0]) if values else [], normalize_quotes(None, currency)
+    header = list(values[0])
+    rows = [list(row[:len(header)]) + [''] * (len(header) - len(row)) for row in values[1:]]
+    return worksheet, header, normalize_quotes(pd.DataFrame(rows, columns=header), currency)
+
+
+def _clear_archived(spreadsheet, archived):
+    """Clear the DC slots still holding archived quotes; returns the positions of those no longer in the sheet.
+
+    Each tab is read again first and every archived quote is looked up by its
+    product and slot contents, so a quote moved by an inserted, deleted or
+    sorted row is cleared where it is now. A quote that is no longer there and
+    whose original slot holds a different quote was edited meanwhile and is
+    left alone. One whose original slot is empty was already cleared.
+    """
+    from gspread.utils import rowcol_to_a1
+
+    changed = set()
+    for currency, quotes in archived.groupby('Currency'):
+        worksheet, header, current = _read_tab(spreadsheet, currency)
+        current_contents = current[SLOT_CONTENTS].astype(str).itertuples(index=False, name=None)
+        # Where each slot content stands now, and what each position holds
+        standing = {}
+        for contents, position in zip(current_contents, zip(current['Source_Row'], current['Slot'])):
+            standing.setdefault(contents, []).append(position)
+        occupied = {position for positions in standing.values() for position in positions}
+
+        updates = []
+        archived_contents = quotes[SLOT_CONTENTS].astype(str).itertuples(index=False, name=None)
+        for contents, source_row, slot in zip(archived_contents, quotes['Source_Row'], quotes['Slot']):
+            original = (int(source_row), int(slot))
+            candidates = standing.get(contents, [])
+            if candidates:
+                position = original if original in candidates else candidates[0]
+                candidates.remove(position)
+            elif original in occupied:
+                changed.add((currency, *original))
+                continue
+            else:
+                continue
+            row, slot = position
+            for column in (f'DC-{slot}', f'Quote Date {slot}', customer_column(header, slot), f'Distributor-{slot}'):
+                if column in header:
+                    # Row 1 is the header
+                    updates.append({'range': rowcol_to_a1(int(row) + 2, header.index(column) + 1),
+                                    'values': [['']]})
+        if updates:
+            worksheet.batch_update(updates, value_input_option='USER_ENTERED')
+    return changed
+
+
+def archive_quotes(spreadsheet, archive, cutoff, dry_run=False):
+    """Move the quotes dated before cutoff from both quote tabs into the archive.
+
+    Quotes are archived before their slots are cleared, so a failure leaves
+    them in the sheet, and the next run finishes clearing them instead of
+    archiving them again. Quotes whose date does not parse stay in the sheet.
+    Returns a summary with the quotes moved and the quotes left in place
+    because they changed before they could be cleared, per tab, and the
+    archive rows added per year.
+    """
+    cutoff = pd.Timestamp(cutoff)
+    summary = {"cutoff": cutoff.date().isoformat(), "moved": {}, "changed": {}, "years": {}}
+
+    def finish(run):
+        archived = archive.run_quotes(run)
+        changed = _clear_archived(spreadsheet, archived) if not archived.empty else set()
+        archive.finish(run, changed)
+        for currency, quotes in archived.groupby('Currency'):
+            kept = quotes[[position in changed for position in _positions_list(quotes)]]
+            summary["moved"][currency] = summary["moved"].get(currency, 0) + len(quotes) - len(kept)
+            summary["changed"][currency] = summary["changed"].get(currency, 0) + len(kept)
+            for year, count in kept['Quote_Date'].dt.year.value_counts().items():
+                if str(year) in summary["years"]:
+                    summary["years"][str(year)] -= count
+
+    if archive.pending_run is not None and not dry_run:
+        finish(archive.pending_run)
+
+    old_quotes = []
+    for currency in ("USD", "RMB"):
+        _, _, quotes = _read_tab(spreadsheet, currency)
+        old = quotes[quotes['Quote_Date'] < cutoff]
+        if dry_run:
+            summary["moved"][currency] = len(old)
+        elif not old.empty:
+            old_quotes.append(old)
+    if dry_run or not old_quotes:
+        return summary
+
+    run, summary["years"] = archive.write(pd.concat(old_quotes, ignore_index=True))
+    finish(run)
+    return summary
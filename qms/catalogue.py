@@ -0,0 +1,85 @@
+"""Catalogue-wide views built from the per-category worksheets"""
+
+import pandas as pd
+
+
+class UnionView:
+    """All product categories stacked into one frame with a shared column schema.
+
+    Each category block is conformed to the shared schema once, when that
+    category's data version changes; the stacked frame is rebuilt from the
+    conformed blocks only after an update, never on a plain read. The view's
+    own version increases on every change so dependent caches can key on it.
+    """
+
+    def __init__(self, categories, category_column='Category'):
+        self.categories = list(categories)
+        self.category_column = category_column
+        self.version = 0
+        self._sources = {}
+        self._source_versions = {}
+        self._conformed = {}
+        self._columns = []
+        self._frame = None
+
+    @property
+    def columns(self):
+        """Shared schema: every column seen in any category, in first-seen order"""
+        return list(self._columns)
+
+    def _schema(self):
+        columns = []
+        seen = set()
+        for category in self.categories:
+            source = self._sources.get(category)
+            if source is None:
+                continue
+            for column in source.columns:
+                if column not in seen:
+                    seen.add(column)
+                    columns.append(column)
+        return columns
+
+    def _conform(self, category):
+        source = self._sources[category]
+        block = source.reindex(columns=self._columns)
+        block[self.category_column] = pd.Categorical([category] * len(block), categories=self.categories)
+        return block
+
+    def update(self, category, df, source_version):
+        """Replace one category's rows; returns True when the view changed"""
+        if category in self._source_versions and self._source_versions[category] == source_version:
+            return False
+        self._source_versions[category] = source_version
+        if df is None or df.empty:
+            self._sources.pop(category, None)
+            self._conformed.pop(category, None)
+        else:
+            self._sources[category] = df
+
+        columns = self._schema()
+        if columns != self._columns:
+            # A new or dropped column changes every block's shape
+            self._columns = columns
+            self._conformed = {name: self._conform(name) for name in self._sources}
+        elif category in self._sources:
+            self._conformed[category] = self._conform(category)
+
+        self._frame = None
+        self.version += 1
+        return True
+
+    def frame(self):
+        """The stacked DataFrame, in category order"""
+        if self._frame is None:
+            blocks = [self._conformed[category] for category in self.categories if category in self._conformed]
+            if blocks:
+                self._frame = pd.concat(blocks, ignore_index=True, sort=False)
+            else:
+                self._frame = pd.DataFrame(columns=self._columns + [self.category_column])
+        return self._frame
+
+    @property
+    def built_frame(self):
+        """The stacked DataFrame if frame() has built it since the last change, else None"""
+        return self._frame
@@ -0,0 +1,137 @@
+"""Dashboard figures memoized by a hash of the aggregates they plot.
+
+Building a Plotly Express figure costs far more than the small aggregate
+behind it, so figures are cached process-wide under a digest of that
+aggregate: every session looking at the same data reuses one figure object
+until the numbers change. Plotly Express is imported by the figure builders
+on first use, so pages without charts never pay for loading it.
+"""
+
+import hashlib
+import threading
+
+import pandas as pd
+
+from qms.search import LRUCache
+
+FIGURE_CACHE_SIZE = 64
+
+# Timeline buckets, finest first; the first that fits TIMELINE_MAX_POINTS is used
+TIMELINE_FREQUENCIES = [("M", "Monthly"), ("Q", "Quarterly"), ("Y", "Yearly")]
+# A 12-month range that starts mid-month touches 13 calendar months, and still plots monthly
+TIMELINE_MAX_POINTS = 13
+
+_figures = LRUCache(FIGURE_CACHE_SIZE)
+_figures_lock = threading.Lock()
+
+
+def digest(data):
+    """Stable content hash of a DataFrame or Series, index included"""
+    hasher = hashlib.sha1()
+    hasher.update(repr(list(data.columns) if isinstance(data, pd.DataFrame) else data.name).encode())
+    hasher.update(pd.util.hash_pandas_object(data, index=True).to_numpy().tobytes())
+    return hasher.hexdigest()
+
+
+def cached_figure(kind, data, build, **options):
+    """Figure for data from the cache, building it with build(data, **options) on a miss"""
+    key = (kind, digest(data), tuple(sorted(options.items())))
+    with _figures_lock:
+        figure = _figures.get(key)
+    if figure is None:
+        figure = build(data, **options)
+        with _figures_lock:
+            _figures.put(key, figure)
+    return figure
+
+
+def timeline_frequency(start, end, max_points=TIMELINE_MAX_POINTS):
+    """Finest bucket size that shows the period start..end in at most max_points points"""
+    for frequency, label in TIMELINE_FREQUENCIES:
+        if len(pd.period_range(start, end, freq=frequency)) <= max_points:
+            return frequency, label
+    return TIMELINE_FREQUENCIES[-1]
+
+
+def quote_timeline(quotes_df, since=None, max_points=TIMELINE_MAX_POINTS):
+    """Quote counts per period and currency, downsampled to at most max_points periods"""
+    quotes = quotes_df if since is None else quotes_df[quotes_df['Quote_Date'] >= since]
+    if quotes.empty:
+        return pd.DataFrame(columns=['Period', 'Currency', 'Count']), TIMELINE_FREQUENCIES[0][1]
+    frequency, label = timeline_frequency(quotes['Quote_Date'].min(), quotes['Quote_Date'].max(), max_points)
+    periods = quotes['Quote_Date'].dt.to_period(frequency)
+    counts = quotes.groupby([periods.rename('Period'), 'Currency']).size().reset_index(name='Count')
+    counts['Period'] = counts['Period'].astype(str)
+    return counts, label
+
+
+def category_pie(category_counts):
+    import plotly.express as px
+
+    return px.pie(
+        values=category_counts.values,
+        names=category_counts.index,
+        title="Quotes Distribution by Product Category"
+    )
+
+
+def currency_bar(currency_counts):
+    import plotly.express as px
+
+    return px.bar(
+        x=currency_counts.index,
+        y=currency_counts.values,
+        title="Quotes by Currency",
+        labels={'x': 'Currency', 'y': 'Number of Quotes'}
+    )
+
+
+def timeline_line(timeline_counts, title):
+    import plotly.express as px
+
+    return px.line(
+        timeline_counts,
+        x='Period',
+        y='Count',
+        color='Currency',
+        title=title,
+        markers=True
+    )
+
+
+def customers_bar(top_customers):
+    import plotly.express as px
+
+    return px.bar(
+        x=top_customers.values,
+        y=top_customers.index,
+        orientation='h',
+        title="Top 10 Customers",
+        labels={'x': 'Number of Quotes', 'y': 'Customer'}
+    )
+
+
+def price_history_line(history_frame, title):
+    import plotly.express as px
+
+    return px.line(
+        history_frame,
+        x='Quote_Date',
+        y='Price',
+        color='Currency',
+        line_dash='Series',
+        title=title,
+        markers=True,
+        labels={'Quote_Date': 'Quote Date'}
+    )
+
+
+def median_price_bar(medians, title):
+    import plotly.express as px
+
+    return px.bar(
+        x=medians.index,
+        y=medians.values,
+        title=title,
+        labels={'x': 'Product Category', 'y': 'Median Price'}
+    )
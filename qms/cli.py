@@ -0,0 +1,355 @@
+"""Command line for the data jobs that do not need the Streamlit app.
+
+    python -m qms refresh --directory /srv/qms/snapshot
+    python -m qms sync --directory /srv/qms/snapshot --interval 300
+    python -m qms import quotes.csv --dry-run
+    python -m qms report margins --output margins.xlsx --currency USD --lowest 100
+    python -m qms serve --directory /srv/qms/snapshot --port 8765
+    python -m qms archive --archive /srv/qms/archive --horizon-days 730 --dry-run
+    python -m qms bench -- --only margin_report
+
+Settings resolve like the app's: command line options, then the QMS_*
+environment variables, then the [snapshot], [fx], [names], [invalidation],
+[api] and [archive] blocks of the Streamlit secrets file. Reports read the
+snapshot when one is configured and the live spreadsheet otherwise.
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+import pandas as pd
+
+from qms import archive, export, fx, names, sheets, snapshot
+from qms.invalidation import get_bus
+from qms.margins import lowest_margins
+from qms.normalize import parse_dates
+from qms.workspace import Workspace
+
+REPORTS = ["margins", "anomalies", "quotes"]
+# Columns of a bulk import file; Currency may instead come from --currency
+IMPORT_COLUMNS = ['Currency', 'Category', 'Product Name', 'Price', 'Customer', 'Distributor', 'Quote Date']
+# Quotes written per read-and-write round trip during an import
+IMPORT_BATCH_SIZE = 500
+
+
+class Settings:
+    """Option, environment variable or secrets value for each setting"""
+
+    def __init__(self, secrets_path):
+        self.secrets_path = secrets_path
+        self._secrets = None
+
+    @property
+    def secrets(self):
+        if self._secrets is None:
+            self._secrets = sheets.load_secrets(self.secrets_path) if os.path.exists(self.secrets_path) else {}
+        return self._secrets
+
+    def get(self, option, env_name, section, key, default=None):
+        if option:
+            return option
+        if os.environ.get(env_name):
+            return os.environ[env_name]
+        return self.secrets.get(section, {}).get(key, default)
+
+    def spreadsheet(self):
+        try:
+            creds_info = self.secrets["connections"]["gsheets"]
+        except KeyError:
+            raise SystemExit(f"No [connections.gsheets] block in {self.secrets_path}")
+        return sheets.open_spreadsheet(creds_info)
+
+    def snapshot_directory(self, option=None):
+        return self.get(option, "QMS_SNAPSHOT_DIR", "snapshot", "directory")
+
+    def archive_directory(self, option=None):
+        return self.get(option, "QMS_ARCHIVE_DIR", "archive", "directory")
+
+    def workspace(self, args):
+        directory = None if args.live else self.snapshot_directory(args.directory)
+        if directory and snapshot.read_manifest(directory) is None:
+            print(f"No snapshot in {directory}; reading the live spreadsheet", file=sys.stderr)
+            directory = None
+        return Workspace(
+            spreadsheet=None if directory else self.spreadsheet(),
+            snapshot_directory=directory,
+            aliases_path=self.get(None, "QMS_NAME_ALIASES", "names", "path", names.DEFAULT_ALIASES_PATH),
+            rates_path=self.get(None, "QMS_FX_RATES", "fx", "path", fx.DEFAULT_RATES_PATH),
+            archive_directory=self.archive_directory(),
+        )
+
+    def bus(self):
+        return get_bus(self.get(None, "QMS_INVALIDATION_LOG", "invalidation", "path"))
+
+
+def _require_directory(settings, args):
+    directory = settings.snapshot_directory(args.directory)
+    if not directory:
+        raise SystemExit("No snapshot directory: pass --directory or set QMS_SNAPSHOT_DIR")
+    return directory
+
+
+def run_refresh(settings, args):
+    directory = _require_directory(settings, args)
+    started = time.monotonic()
+    version = snapshot.refresh_snapshot(directory, settings.spreadsheet())
+    print(f"Published snapshot version {version} in {time.monotonic() - started:.1f}s")
+    return 0
+
+
+def run_sync(settings, args):
+    directory = _require_directory(settings, args)
+    while True:
+        started = time.monotonic()
+        try:
+            version, changed = snapshot.sync_snapshot(directory, settings.spreadsheet(), force=args.force)
+            if changed:
+                print(f"Published snapshot version {version} ({', '.join(changed)} changed) "
+                      f"in {time.monotonic() - started:.1f}s")
+            else:
+                print(f"Snapshot version {version} is current ({time.monotonic() - started:.1f}s)")
+        except Exception as e:
+            # Workers keep serving the last published version
+            print(f"Snapshot sync failed: {str(e)}", file=sys.stderr)
+            if not args.interval:
+                return 1
+        if not args.interval:
+            return 0
+        time.sleep(args.interval)
+
+
+def read_import_file(path, currency=None):
+    """Quotes to import grouped by currency, plus (line, problem) for rows that cannot be imported"""
+    frame = pd.read_csv(path, dtype=str, keep_default_na=False, encoding="utf-8-sig")
+    frame.columns = [str(column).strip() for column in frame.columns]
+    if 'Currency' not in frame.columns and currency:
+        frame['Currency'] = currency
+    missing = [column for column in IMPORT_COLUMNS if column not in frame.columns]
+    if missing:
+        raise SystemExit(f"{path} is missing columns: {', '.join(missing)}")
+
+    frame = frame[IMPORT_COLUMNS].apply(lambda column: column.str.strip())
+    prices = pd.to_numeric(frame['Price'], errors='coerce')
+    dates = parse_dates(frame['Quote Date'], ['%m/%d/%Y', '%Y-%m-%d', '%Y.%m.%d'])
+    frame['Currency'] = frame['Currency'].str.upper()
+
+    quotes, problems = {}, []
+    columns = (frame[column].tolist() for column in IMPORT_COLUMNS)
+    for position, (quote_currency, category, product_name, raw_price, customer, distributor, raw_date) in enumerate(
+            zip(*columns)):
+        # Line numbers as shown in a spreadsheet: the header is line 1
+        line = position + 2
+        price, quote_date = prices.iloc[position], dates.iloc[position]
+        if quote_currency not in fx.REPORTING_CURRENCIES:
+            problems.append((line, f"unknown currency {quote_currency!r}"))
+        elif not category or not product_name:
+            problems.append((line, "category and product name are required"))
+        elif pd.isna(price) or price <= 0:
+            problems.append((line, f"invalid price {raw_price!r}"))
+        elif not customer:
+            problems.append((line, "customer is required"))
+        elif pd.isna(quote_date):
+            problems.append((line, f"invalid quote date {raw_date!r}"))
+        else:
+            quotes.setdefault(quote_currency, []).append((line, {
+                'product_category': category,
+                'product_name': product_name,
+                'price': round(float(price), 4),
+                'customer': customer,
+                'distributor': distributor or 'N/A',
+                # M/D/YYYY, as the Add Quote form writes it
+                'quote_date': f"{quote_date.month}/{quote_date.day}/{quote_date.year}",
+            }))
+    return quotes, problems
+
+
+def run_import(settings, args):
+    quotes, problems = read_import_file(args.file, args.currency)
+    for line, problem in problems:
+        print(f"Line {line}: {problem}", file=sys.stderr)
+    total = sum(len(batch) for batch in quotes.values())
+    if args.dry_run:
+        print(f"{total} quotes would be imported, {len(problems)} rows rejected")
+        return 1 if problems else 0
+
+    spreadsheet = settings.spreadsheet() if total else None
+    added = 0
+    for currency, rows in quotes.items():
+        written = 0
+        for start in range(0, len(rows), IMPORT_BATCH_SIZE):
+            batch = rows[start:start + IMPORT_BATCH_SIZE]
+            results = sheets.add_quotes(spreadsheet, currency, [quote for _, quote in batch])
+            for (line, _), (success, message) in zip(batch, results):
+                if success:
+                    written += 1
+                else:
+                    problems.append((line, message))
+                    print(f"Line {line}: {message}", file=sys.stderr)
+        if written:
+            # Running sessions reload the tab live instead of waiting for the next snapshot
+            settings.bus().publish(f"Quote{currency}", origin="import")
+        added += written
+    print(f"Imported {added} quotes, {len(problems)} rows rejected")
+    return 1 if problems else 0
+
+
+def _date_option(value, option):
+    if value is None:
+        return None
+    date = parse_dates(pd.Series([value]), ['%Y-%m-%d', '%m/%d/%Y'])[0]
+    if pd.isna(date):
+        raise SystemExit(f"{option} must be a date such as 2024-01-31")
+    return date
+
+
+def run_report(settings, args):
+    export_format = args.format or {
+        ".csv": "CSV", ".xlsx": "XLSX", ".parquet": "Parquet",
+    }.get(os.path.splitext(args.output)[1].lower())
+    if export_format not in export.available_formats():
+        raise SystemExit(f"Unsupported report format for {args.output}; choose one of "
+                         f"{', '.join(export.available_formats())}")
+    workspace = settings.workspace(args)
+    if args.report == "margins":
+        table = workspace.margins(args.currency)
+        if table is None:
+            raise SystemExit(f"Margin reports need exchange rates ({workspace.rates_path})")
+        if args.lowest:
+            table = lowest_margins(table, args.sort, args.lowest)
+    elif args.report == "anomalies":
+        table = workspace.anomalies()
+        if args.lowest:
+            table = table.head(args.lowest)
+    else:
+        table = workspace.quote_history(_date_option(args.since, "--since"), _date_option(args.until, "--until"))
+    rows = export.write_export(table, args.output, export_format)
+    print(f"Wrote {rows} rows to {args.output}")
+    return 0
+
+
+def run_serve(settings, args):
+    from qms import api
+
+    directory = _require_directory(settings, args)
+    host = settings.get(args.host, "QMS_API_HOST", "api", "host", "127.0.0.1")
+    port = int(settings.get(args.port, "QMS_API_PORT", "api", "port", api.DEFAULT_PORT))
+    quote_api = api.QuoteApi(
+        snapshot.get_reader(directory),
+        aliases_path=settings.get(None, "QMS_NAME_ALIASES", "names", "path", names.DEFAULT_ALIASES_PATH),
+        token=settings.get(None, "QMS_API_TOKEN", "api", "token"),
+        archive_directory=settings.archive_directory(),
+    )
+    server = api.ApiServer((host, port), quote_api)
+    # Access log lines
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    print(f"Serving the quotation API on http://{host}:{server.server_address[1]}/api/status")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+def run_archive(settings, args):
+    directory = settings.archive_directory(args.archive)
+    if not directory:
+        raise SystemExit("No archive directory: pass --archive or set QMS_ARCHIVE_DIR")
+    if args.before:
+        cutoff = _date_option(args.before, "--before")
+    else:
+        horizon = int(settings.get(args.horizon_days, "QMS_ARCHIVE_HORIZON_DAYS", "archive", "horizon_days",
+                                   archive.DEFAULT_HORIZON_DAYS))
+        cutoff = pd.Timestamp.now().normalize() - pd.Timedelta(days=horizon)
+    started = time.monotonic()
+    summary = archive.archive_quotes(settings.spreadsheet(), archive.QuoteArchive(directory), cutoff,
+                                     dry_run=args.dry_run)
+    moved = ", ".join(f"{count} from Quote{currency}" for currency, count in summary["moved"].items())
+    if args.dry_run:
+        print(f"Quotes dated before {summary['cutoff']} that would be archived: {moved or 'none'}")
+        return 0
+    for currency, count in summary["moved"].items():
+        if count:
+            # Running sessions reload the tab live instead of waiting for the next snapshot
+            settings.bus().publish(f"Quote{currency}", origin="archive")
+    years = ", ".join(f"{year}: +{count}" for year, count in sorted(summary["years"].items()))
+    print(f"Archived quotes dated before {summary['cutoff']} ({moved or 'none'}; {years or 'no new rows'}) "
+          f"in {time.monotonic() - started:.1f}s")
+    changed = ", ".join(f"{count} in Quote{currency}" for currency, count in summary["changed"].items() if count)
+    if changed:
+        print(f"Left in the sheet because they were edited while archiving: {changed}")
+    return 0
+
+
+def run_bench(settings, args):
+    from benchmarks import run_benchmarks
+
+    arguments = args.arguments[1:] if args.arguments[:1] == ["--"] else args.arguments
+    return run_benchmarks.main(arguments)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m qms", description="Quotation Management System data jobs")
+    parser.add_argument("--secrets", default=".streamlit/secrets.toml",
+                        help="Streamlit secrets file with [connections.gsheets] and optional settings")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    refresh = commands.add_parser("refresh", help="publish a full snapshot of every worksheet")
+    refresh.add_argument("--directory", help="snapshot directory (default: QMS_SNAPSHOT_DIR or [snapshot] directory)")
+    refresh.set_defaults(run=run_refresh)
+
+    sync = commands.add_parser("sync", help="publish a new snapshot only when the spreadsheet changed")
+    sync.add_argument("--directory", help="snapshot directory (default: QMS_SNAPSHOT_DIR or [snapshot] directory)")
+    sync.add_argument("--interval", type=float, default=0, help="seconds between syncs; 0 runs once")
+    sync.add_argument("--force", action="store_true", help="publish even when nothing changed")
+    sync.set_defaults(run=run_sync)
+
+    bulk = commands.add_parser("import", help="add the quotes in a CSV file to the quote tabs")
+    bulk.add_argument("file", help=f"CSV with columns {', '.join(IMPORT_COLUMNS)}")
+    bulk.add_argument("--currency", choices=fx.REPORTING_CURRENCIES, help="currency of every row without a Currency column")
+    bulk.add_argument("--dry-run", action="store_true", help="check the file without writing anything")
+    bulk.set_defaults(run=run_import)
+
+    report = commands.add_parser("report", help="write a report or the quote history to a file")
+    report.add_argument("report", choices=REPORTS)
+    report.add_argument("--output", required=True, help="file to write; the extension picks the format")
+    report.add_argument("--format", choices=list(export.EXPORT_FORMATS), help="format, when the extension does not say")
+    report.add_argument("--currency", choices=fx.REPORTING_CURRENCIES, default=fx.REPORTING_CURRENCIES[0],
+                        help="reporting currency for margins")
+    report.add_argument("--sort", choices=["Margin %", "Markup %", "Distributor Margin %"], default="Margin %",
+                        help="ordering of --lowest margins")
+    report.add_argument("--lowest", type=int, help="only the N lowest margins, or the N strongest anomalies")
+    report.add_argument("--directory", help="snapshot directory to read (default: QMS_SNAPSHOT_DIR or [snapshot] directory)")
+    report.add_argument("--live", action="store_true", help="read the live spreadsheet even when a snapshot exists")
+    report.add_argument("--since", help="quotes report: only quotes dated on or after this date")
+    report.add_argument("--until", help="quotes report: only quotes dated before this date")
+    report.set_defaults(run=run_report)
+
+    serve = commands.add_parser("serve", help="serve the read-only JSON API from the snapshot")
+    serve.add_argument("--directory", help="snapshot directory (default: QMS_SNAPSHOT_DIR or [snapshot] directory)")
+    serve.add_argument("--host", help="address to listen on (default: QMS_API_HOST, [api] host or 127.0.0.1)")
+    serve.add_argument("--port", type=int, help="port to listen on (default: QMS_API_PORT, [api] port or 8765)")
+    serve.set_defaults(run=run_serve)
+
+    cold = commands.add_parser("archive", help="move old quotes from the quote tabs into the yearly archive")
+    cold.add_argument("--archive", help="archive directory (default: QMS_ARCHIVE_DIR or [archive] directory)")
+    cold.add_argument("--horizon-days", type=int,
+                      help="archive quotes older than this many days (default: QMS_ARCHIVE_HORIZON_DAYS, "
+                           f"[archive] horizon_days or {archive.DEFAULT_HORIZON_DAYS})")
+    cold.add_argument("--before", help="archive quotes dated before this date instead")
+    cold.add_argument("--dry-run", action="store_true", help="count the quotes without moving anything")
+    cold.set_defaults(run=run_archive)
+
+    bench = commands.add_parser("bench", help="run the offline benchmarks (arguments after -- are passed on)")
+    bench.add_argument("arguments", nargs=argparse.REMAINDER)
+    bench.set_defaults(run=run_bench)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.run(Settings(args.secrets), args)
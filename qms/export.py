@@ -0,0 +1,196 @@
+"""Chunked export of catalogue views and quote history to CSV, XLSX or Parquet.
+
+Rows are sliced from the session's existing frame a chunk at a time and
+appended to a temporary file, so an export never holds a second copy of the
+data in memory. Large exports run on a background thread that reports
+progress; the finished file is served from disk.
+"""
+
+import os
+import tempfile
+import threading
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from qms.normalize import to_text
+
+EXPORT_FORMATS = {
+    "CSV": ("csv", "text/csv"),
+    "XLSX": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+}
+CHUNK_ROWS = 5000
+# Excel's sheet size limit, header row included
+XLSX_MAX_ROWS = 1_048_575
+# Export files older than this are deleted when a new export starts
+EXPORT_MAX_AGE_SECONDS = 6 * 60 * 60
+EXPORT_DIR = os.path.join(tempfile.gettempdir(), "qms-exports")
+# Normalized quote columns included in a quote history export
+QUOTE_EXPORT_COLUMNS = ['Product_Category', 'Product_Name', 'Currency', 'Price', 'Customer', 'Distributor', 'Quote_Date']
+
+
+def available_formats():
+    """Formats whose writer is installed (XLSX needs openpyxl)"""
+    formats = ["CSV", "Parquet"]
+    try:
+        import openpyxl  # noqa: F401
+    except ImportError:
+        return formats
+    return ["CSV", "XLSX", "Parquet"]
+
+
+def _chunks(frame, rows, chunk_rows):
+    """Successive row slices of frame (all rows, or the positions in rows)"""
+    total = len(frame) if rows is None else len(rows)
+    for start in range(0, total, chunk_rows):
+        stop = min(start + chunk_rows, total)
+        yield frame.iloc[start:stop] if rows is None else frame.iloc[rows[start:stop]]
+
+
+def _plain(chunk):
+    # Object columns can mix types between chunks; write them as text
+    return chunk.assign(**{column: to_text(chunk[column]) for column in chunk.columns if chunk[column].dtype == object})
+
+
+def _parquet_schema(frame):
+    schema = pa.Schema.from_pandas(_plain(frame.iloc[:0]), preserve_index=False)
+    return pa.schema([field.with_type(pa.string()) if pa.types.is_null(field.type) else field for field in schema])
+
+
+def write_export(frame, path, export_format, rows=None, chunk_rows=CHUNK_ROWS, progress=None, cancelled=None):
+    """Write frame (or the rows at positions rows) to path chunk by chunk.
+
+    progress(rows_written) is called after each chunk; cancelled() returning
+    True stops the export early. Returns the number of rows written.
+    """
+    total = len(frame) if rows is None else len(rows)
+    if export_format == "XLSX" and total > XLSX_MAX_ROWS:
+        raise ValueError(f"XLSX sheets hold at most {XLSX_MAX_ROWS:,} rows; use CSV or Parquet")
+    written = 0
+    if export_format == "CSV":
+        # utf-8-sig so Excel shows Chinese customer names correctly
+        with open(path, "w", encoding="utf-8-sig", newline="") as handle:
+            frame.iloc[:0].to_csv(handle, index=False)
+            for chunk in _chunks(frame, rows, chunk_rows):
+                if cancelled is not None and cancelled():
+                    break
+                chunk.to_csv(handle, header=False, index=False)
+                written += len(chunk)
+                if progress is not None:
+                    progress(written)
+    elif export_format == "Parquet":
+        import pyarrow.parquet as pq
+
+        schema = _parquet_schema(frame)
+        with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+            for chunk in _chunks(frame, rows, chunk_rows):
+                if cancelled is not None and cancelled():
+                    break
+                writer.write_table(pa.Table.from_pandas(_plain(chunk), schema=schema, preserve_index=False))
+                written += len(chunk)
+                if progress is not None:
+                    progress(written)
+    elif export_format == "XLSX":
+        from openpyxl import Workbook
+
+        # Write-only workbooks stream rows to disk instead of building the sheet in memory
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet("Export")
+        sheet.append([str(column) for column in frame.columns])
+        for chunk in _chunks(frame, rows, chunk_rows):
+            if cancelled is not None and cancelled():
+                break
+            values = chunk.astype(object).where(chunk.notna(), None)
+            for record in values.itertuples(index=False, name=None):
+                sheet.append(list(record))
+            written += len(chunk)
+            if progress is not None:
+                progress(written)
+        workbook.save(path)
+    else:
+        raise ValueError(f"Unknown export format: {export_format}")
+    return written
+
+
+def remove_stale_exports(max_age=EXPORT_MAX_AGE_SECONDS):
+    """Delete export files left behind by sessions that never downloaded them"""
+    try:
+        entries = list(os.scandir(EXPORT_DIR))
+    except FileNotFoundError:
+        return
+    cutoff = time.time() - max_age
+    for entry in entries:
+        try:
+            if entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+        except OSError:
+            pass
+
+
+class ExportJob:
+    """One export written to a temporary file, optionally on a background thread.
+
+    The thread only updates this object's counters; the session reads them
+    on its next script run, so session state is never touched off-thread.
+    """
+
+    def __init__(self, frame, export_format, name, rows=None, background=True, chunk_rows=CHUNK_ROWS):
+        extension, self.mime = EXPORT_FORMATS[export_format]
+        self.export_format = export_format
+        self.file_name = f"{name}.{extension}"
+        self.total = len(frame) if rows is None else len(rows)
+        self.written = 0
+        self.error = None
+        self.done = False
+        self.cancelled = False
+        self.started = time.perf_counter()
+        self.finished = None
+        remove_stale_exports()
+        os.makedirs(EXPORT_DIR, exist_ok=True)
+        self.path = os.path.join(EXPORT_DIR, f"{uuid.uuid4().hex}.{extension}")
+        rows = None if rows is None else np.asarray(rows)
+        args = (frame, rows, chunk_rows)
+        if background:
+            self._thread = threading.Thread(target=self._run, args=args, name="export", daemon=True)
+            self._thread.start()
+        else:
+            self._thread = None
+            self._run(*args)
+
+    def _run(self, frame, rows, chunk_rows):
+        try:
+            write_export(frame, self.path, self.export_format, rows, chunk_rows,
+                         progress=self._progress, cancelled=lambda: self.cancelled)
+        except Exception as e:
+            self.error = e
+        self.finished = time.perf_counter()
+        self.done = True
+
+    def _progress(self, written):
+        self.written = written
+
+    @property
+    def progress(self):
+        return self.written / self.total if self.total else 1.0
+
+    @property
+    def ready(self):
+        return self.done and self.error is None and not self.cancelled
+
+    def open(self):
+        """The finished file for download"""
+        return open(self.path, "rb")
+
+    def cancel(self):
+        """Stop the export and delete its file"""
+        self.cancelled = True
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
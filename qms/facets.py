@@ -0,0 +1,75 @@
+"""Faceted filtering of catalogue rows with live counts per facet value"""
+
+import numpy as np
+import pandas as pd
+
+from qms.indexes import BitmapIndex, bitmap_count, bitmap_positions, full_bitmap, positions_bitmap
+from qms.normalize import to_text
+
+# Catalogue columns offered as facets
+CATALOGUE_FACETS = ['FG Supplier', 'Package', 'Wafer Supplier']
+
+# Facets taken from the quotes of each product: facet name -> normalized quote column
+QUOTE_FACETS = {'Distributor': 'Distributor', 'Customer': 'Customer'}
+
+
+def product_keys(df):
+    """Case-insensitive product identifier per row: Magnias P/N, else Product Name"""
+    keys = pd.Series('', index=df.index)
+    for column in ('Product Name', 'Magnias P/N'):
+        if column in df.columns:
+            text = to_text(df[column])
+            keys = text.where(text.ne(''), keys)
+    return keys.str.casefold()
+
+
+class FacetIndex:
+    """Per-value bitmaps for each facet, built once per data version.
+
+    Counts follow the usual faceted-search rule: a facet's counts apply the
+    selections of every other facet but not its own, so picking one supplier
+    still shows how many parts the other suppliers would add.
+    """
+
+    def __init__(self, df, columns=CATALOGUE_FACETS, quotes=None):
+        self.row_count = len(df)
+        self.facets = {column: BitmapIndex(df[column]) for column in columns if column in df.columns}
+        if quotes is not None and not quotes.empty:
+            self._add_quote_facets(df, quotes)
+
+    def _add_quote_facets(self, df, quotes):
+        catalogue = pd.DataFrame({'key': product_keys(df).to_numpy(), 'row': np.arange(self.row_count)})
+        catalogue = catalogue[catalogue['key'] != '']
+        quoted = pd.DataFrame({
+            'key': to_text(quotes['Product_Name']).str.casefold().to_numpy(),
+            'quote': np.arange(len(quotes)),
+        })
+        # A part number listed on several catalogue rows matches all of them
+        joined = quoted.merge(catalogue, on='key', how='inner')
+        rows = joined['row'].to_numpy(dtype=np.int64)
+        matched = joined['quote'].to_numpy(dtype=np.int64)
+        for facet, column in QUOTE_FACETS.items():
+            values = to_text(quotes[column]).to_numpy(dtype=object)[matched]
+            self.facets[facet] = BitmapIndex.from_pairs(rows, values, self.row_count)
+
+    def _bitmap(self, selections, within, skip=None):
+        result = full_bitmap(self.row_count) if within is None else positions_bitmap(within, self.row_count)
+        for facet, values in selections.items():
+            if facet != skip and values and facet in self.facets:
+                result &= self.facets[facet].match(values)
+        return result
+
+    def filter(self, selections, within=None):
+        """Positions of rows matching every facet selection (values within a facet are OR-ed)"""
+        return bitmap_positions(self._bitmap(selections, within), self.row_count)
+
+    def counts(self, selections, within=None):
+        """Matching rows per value of every facet, given the other facets' selections"""
+        return {
+            facet: index.counts(self._bitmap(selections, within, skip=facet))
+            for facet, index in self.facets.items()
+        }
+
+    def total(self, selections, within=None):
+        """Number of rows matching every selection"""
+        return bitmap_count(self._bitmap(selections, within))
@@ -0,0 +1,133 @@
+"""Currency normalization against a local, dated FX rate table.
+
+The table is a CSV with one row per rate change:
+
+    Date,Currency,Rate
+    2025-01-01,RMB,7.30
+
+Rate is units of Currency per 1 USD and applies from Date until the next
+row for that currency. Conversions look rates up as of each amount's date
+with one vectorized as-of search per currency, never row by row.
+"""
+
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from qms.normalize import parse_prices
+
+BASE_CURRENCY = "USD"
+REPORTING_CURRENCIES = ["USD", "RMB"]
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Not shipped: conversions stay off until a real rate history is put here or configured elsewhere
+DEFAULT_RATES_PATH = os.path.join(_ROOT, "fx_rates.csv")
+# Format sample with a placeholder rate; never used to convert real prices
+EXAMPLE_RATES_PATH = os.path.join(_ROOT, "fx_rates.example.csv")
+
+
+class FxRates:
+    """Dated exchange rates with vectorized as-of conversion"""
+
+    def __init__(self, table):
+        table = table.copy()
+        table['Date'] = pd.to_datetime(table['Date'])
+        table['Currency'] = table['Currency'].astype(str).str.strip().str.upper()
+        table['Rate'] = pd.to_numeric(table['Rate'], errors='coerce')
+        table = table.dropna(subset=['Date', 'Rate'])
+        self.table = table[['Date', 'Currency', 'Rate']].sort_values('Date', kind='stable').reset_index(drop=True)
+        self.currencies = {BASE_CURRENCY} | set(self.table['Currency'])
+        self._dated = {
+            currency: (group['Date'].to_numpy(dtype='datetime64[ns]'), group['Rate'].to_numpy(dtype=float))
+            for currency, group in self.table.groupby('Currency', sort=False)
+        }
+
+    @classmethod
+    def load(cls, path=DEFAULT_RATES_PATH):
+        return cls(pd.read_csv(path))
+
+    def rates(self, currencies, dates):
+        """Units of each currency per USD as of each date.
+
+        Each currency's rates are binary-searched for all its dates at once.
+        Dates before the first rate use the first rate, missing dates use
+        the latest one, and unknown currencies give NaN.
+        """
+        codes, uniques = pd.factorize(np.asarray(currencies, dtype=object))
+        dates = pd.to_datetime(pd.Series(dates).reset_index(drop=True)).to_numpy(dtype='datetime64[ns]')
+        result = np.full(len(codes), np.nan)
+        for code, currency in enumerate(uniques):
+            currency = str(currency).strip().upper()
+            rows = codes == code
+            if currency == BASE_CURRENCY:
+                result[rows] = 1.0
+                continue
+            if currency not in self._dated:
+                continue
+            rate_dates, rate_values = self._dated[currency]
+            when = dates[rows]
+            when = np.where(np.isnat(when), rate_dates[-1], when)
+            positions = np.searchsorted(rate_dates, when, side='right') - 1
+            result[rows] = rate_values[np.clip(positions, 0, None)]
+        return result
+
+    def convert(self, amounts, from_currencies, dates, to_currency):
+        """Amounts converted from their own currencies into to_currency as of each date"""
+        amounts = np.asarray(amounts, dtype=float)
+        from_rates = self.rates(from_currencies, dates)
+        if to_currency == BASE_CURRENCY:
+            return amounts / from_rates
+        to_rates = self.rates(np.full(len(amounts), to_currency, dtype=object), dates)
+        return amounts / from_rates * to_rates
+
+
+def convert_quotes(quotes, fx, to_currency):
+    """Normalized quotes with a Reporting_Price column in to_currency as of each quote date"""
+    quotes = quotes.copy()
+    quotes['Reporting_Price'] = fx.convert(quotes['Price'], quotes['Currency'], quotes['Quote_Date'], to_currency)
+    return quotes
+
+
+# Catalogue price columns per currency
+PARTS_PRICE_COLUMNS = {"USD": 'Parts USD Price', "RMB": 'Parts RMB Price'}
+DISTRIBUTOR_PRICE_COLUMNS = {"USD": 'Distributor USD Price', "RMB": 'Distributor RMB Price'}
+
+
+def catalogue_prices(df, fx, to_currency, columns=PARTS_PRICE_COLUMNS):
+    """Catalogue prices in to_currency from a pair of per-currency price columns.
+
+    The price column already in to_currency wins; otherwise the other
+    currency's price is converted as of the row's Quote Date.
+    """
+    dates = df['Quote Date'] if 'Quote Date' in df.columns else pd.Series(pd.NaT, index=df.index)
+    result = pd.Series(np.nan, index=df.index)
+    for currency in [to_currency] + [code for code in columns if code != to_currency]:
+        column = columns.get(currency)
+        if column not in df.columns:
+            continue
+        remaining = result.isna()
+        if not remaining.any():
+            break
+        prices = df.loc[remaining, column]
+        if not pd.api.types.is_numeric_dtype(prices):
+            prices = parse_prices(prices)
+        result[remaining] = fx.convert(prices, np.full(int(remaining.sum()), currency, dtype=object),
+                                       dates[remaining], to_currency)
+    return result
+
+
+_rates = {}
+_rates_lock = threading.Lock()
+
+
+def get_rates(path=DEFAULT_RATES_PATH):
+    """Process-wide rate table, reloaded when the file changes on disk"""
+    path = os.path.abspath(path)
+    modified = os.path.getmtime(path)
+    with _rates_lock:
+        cached = _rates.get(path)
+        if cached is None or cached[0] != modified:
+            cached = (modified, FxRates.load(path))
+            _rates[path] = cached
+        return cached[1]
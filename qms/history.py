@@ -0,0 +1,119 @@
+"""Price history per product over the normalized quote table.
+
+Quotes are kept as one date-sorted block per product. When the quote tabs
+change, each product's quotes are fingerprinted in one vectorized pass and
+only the products whose fingerprint changed are rebuilt, so adding a quote
+costs one block rather than a full rebuild.
+"""
+
+import numpy as np
+import pandas as pd
+
+from qms.normalize import to_text
+
+HISTORY_COLUMNS = ['Quote_Date', 'Currency', 'Price', 'Customer', 'Distributor']
+
+# Columns whose change means a quote changed
+_IDENTITY_COLUMNS = ['Product_Name', 'Currency', 'Raw_Price', 'Customer', 'Distributor', 'Raw_Date']
+
+
+def product_key(product_name):
+    return str(product_name).strip().casefold()
+
+
+def summarize(series, frequency='M'):
+    """Median, min, max and count of a series() frame's prices per period and currency"""
+    if series.empty:
+        return pd.DataFrame(columns=['Quote_Date', 'Currency', 'Price', 'Min', 'Max', 'Count'])
+    periods = series['Quote_Date'].dt.to_period(frequency).dt.start_time.rename('Quote_Date')
+    grouped = series.groupby([periods, 'Currency'])['Price']
+    return grouped.agg(Price='median', Min='min', Max='max', Count='size').reset_index()
+
+
+class PriceHistory:
+    """Date-sorted quote history per product with as-of, resampling and rolling statistics"""
+
+    def __init__(self):
+        self._blocks = {}
+        self._signatures = pd.Series(dtype='uint64')
+        self.version = 0
+
+    def __len__(self):
+        """Number of products with quotes"""
+        return len(self._blocks)
+
+    def copy(self):
+        """History that can be updated without changing this one; unchanged product blocks are shared"""
+        history = PriceHistory()
+        history._blocks = dict(self._blocks)
+        history._signatures = self._signatures
+        history.version = self.version
+        return history
+
+    def update(self, quotes):
+        """Bring the history in line with a normalized quote table; returns the products rebuilt"""
+        quotes = quotes[quotes['Quote_Date'].notna() & quotes['Price'].notna()]
+        keys = to_text(quotes['Product_Name']).str.casefold()
+        row_hashes = pd.util.hash_pandas_object(quotes[_IDENTITY_COLUMNS], index=False)
+        # Order-independent fingerprint of each product's quotes (sums wrap around)
+        signatures = pd.Series(row_hashes.to_numpy(), index=keys.to_numpy()).groupby(level=0).sum()
+
+        previous = self._signatures
+        common = signatures.index.intersection(previous.index)
+        unchanged = common[signatures[common].to_numpy() == previous[common].to_numpy()]
+        changed = signatures.index.difference(unchanged)
+        removed = previous.index.difference(signatures.index)
+        for key in removed:
+            self._blocks.pop(key, None)
+        if len(changed):
+            selected = keys.isin(changed).to_numpy()
+            # One stable sort by product then date, so each product's block is a contiguous slice
+            rebuilt = quotes.loc[selected, HISTORY_COLUMNS].assign(Key=keys[selected].to_numpy())
+            rebuilt = rebuilt.sort_values(['Key', 'Quote_Date'], kind='stable', ignore_index=True)
+            block_keys = rebuilt.pop('Key').to_numpy()
+            starts = np.flatnonzero(np.r_[True, block_keys[1:] != block_keys[:-1]])
+            stops = np.r_[starts[1:], len(rebuilt)]
+            for start, stop in zip(starts.tolist(), stops.tolist()):
+                self._blocks[block_keys[start]] = rebuilt.iloc[start:stop].reset_index(drop=True)
+        self._signatures = signatures
+        if len(changed) or len(removed):
+            self.version += 1
+        return len(changed) + len(removed)
+
+    def series(self, product_name, currency=None, customer=None, distributor=None):
+        """Quotes for a product in date order, optionally for one currency, customer or distributor"""
+        block = self._blocks.get(product_key(product_name))
+        if block is None:
+            return pd.DataFrame(columns=HISTORY_COLUMNS)
+        mask = np.ones(len(block), dtype=bool)
+        for column, value in (('Currency', currency), ('Customer', customer), ('Distributor', distributor)):
+            if value is not None:
+                mask &= block[column].eq(value).to_numpy()
+        return block if mask.all() else block[mask].reset_index(drop=True)
+
+    def as_of(self, product_name, when, currency=None, customer=None, distributor=None):
+        """Last quote on or before when (a row of series()), or None"""
+        series = self.series(product_name, currency, customer, distributor)
+        position = series['Quote_Date'].searchsorted(pd.Timestamp(when), side='right') - 1
+        return series.iloc[position] if position >= 0 else None
+
+    def resample(self, product_name, frequency='M', currency=None, customer=None, distributor=None):
+        """Median, min, max and count of prices per period and currency"""
+        return summarize(self.series(product_name, currency, customer, distributor), frequency)
+
+    def rolling(self, product_name, window='90D', currency=None, customer=None, distributor=None):
+        """Rolling min, max and median price over a time window, per currency"""
+        series = self.series(product_name, currency, customer, distributor)
+        parts = []
+        for currency_code, group in series.groupby('Currency', sort=True):
+            window_prices = group.set_index('Quote_Date')['Price'].rolling(window)
+            parts.append(pd.DataFrame({
+                'Quote_Date': group['Quote_Date'].to_numpy(),
+                'Currency': currency_code,
+                'Rolling Min': window_prices.min().to_numpy(),
+                'Rolling Max': window_prices.max().to_numpy(),
+                'Rolling Median': window_prices.median().to_numpy(),
+            }))
+        if not parts:
+            return pd.DataFrame(columns=['Quote_Date', 'Currency', 'Rolling Min', 'Rolling Max', 'Rolling Median'])
+        return pd.concat(parts, ignore_index=True)
@@ -0,0 +1,160 @@
+"""Column indexes that answer filters without scanning the catalogue.
+
+Row sets are packed bitmaps (one bit per row, numpy uint8), so combining
+filters is a bitwise AND/OR over n/8 bytes and counting matches is a table
+lookup per byte.
+"""
+
+import numpy as np
+import pandas as pd
+
+from qms.normalize import to_text
+
+# Number of set bits in each possible byte
+_POPCOUNT = np.array([bin(byte).count("1") for byte in range(256)], dtype=np.uint32)
+
+
+def pack(mask):
+    """Bitmap from a boolean array"""
+    return np.packbits(np.asarray(mask, dtype=bool))
+
+
+def full_bitmap(row_count):
+    """Bitmap with every row set"""
+    return pack(np.ones(row_count, dtype=bool))
+
+
+def positions_bitmap(positions, row_count):
+    """Bitmap with the given row positions set"""
+    mask = np.zeros(row_count, dtype=bool)
+    mask[positions] = True
+    return pack(mask)
+
+
+def bitmap_positions(bitmap, row_count):
+    """Row positions set in a bitmap, in ascending order"""
+    return np.flatnonzero(np.unpackbits(bitmap, count=row_count))
+
+
+def bitmap_count(bitmap):
+    """Number of rows set in a bitmap"""
+    return int(_POPCOUNT[bitmap].sum())
+
+
+class NumericIndex:
+    """A numeric column's values in sorted order, for range lookups by binary search"""
+
+    def __init__(self, series):
+        if not pd.api.types.is_numeric_dtype(series):
+            # Columns with a few non-numeric cells stay text after normalization
+            series = pd.to_numeric(to_text(series).str.replace(',', '', regex=False), errors='coerce')
+        values = series.to_numpy(dtype=float, na_value=np.nan)
+        self.row_count = len(values)
+        valid = np.flatnonzero(~np.isnan(values))
+        order = np.argsort(values[valid], kind='stable')
+        self.rows = valid[order]
+        self.values = values[self.rows]
+
+    @property
+    def bounds(self):
+        """Smallest and largest value, or None for a column without numbers"""
+        if not len(self.values):
+            return None
+        return float(self.values[0]), float(self.values[-1])
+
+    def range(self, low=None, high=None):
+        """Bitmap of rows with low <= value <= high; None leaves that side open"""
+        start = 0 if low is None else np.searchsorted(self.values, low, side='left')
+        end = len(self.values) if high is None else np.searchsorted(self.values, high, side='right')
+        return positions_bitmap(self.rows[start:end], self.row_count)
+
+
+class BitmapIndex:
+    """One bitmap per distinct value of a column; blank cells are not indexed"""
+
+    def __init__(self, series):
+        text = to_text(series)
+        self.row_count = len(text)
+        self.bitmaps = self._build(np.arange(self.row_count), text.to_numpy(dtype=object))
+
+    @classmethod
+    def from_pairs(cls, rows, values, row_count):
+        """Index for a multi-valued attribute: row rows[i] has value values[i]"""
+        index = cls.__new__(cls)
+        index.row_count = row_count
+        index.bitmaps = index._build(np.asarray(rows, dtype=np.int64), np.asarray(values, dtype=object))
+        return index
+
+    def _build(self, rows, values):
+        codes, uniques = pd.factorize(values, sort=True)
+        order = np.argsort(codes, kind='stable')
+        boundaries = np.flatnonzero(np.diff(codes[order])) + 1
+        bitmaps = {}
+        for group in np.split(order, boundaries):
+            if len(group) and codes[group[0]] >= 0 and uniques[codes[group[0]]] != '':
+                bitmaps[uniques[codes[group[0]]]] = positions_bitmap(rows[group], self.row_count)
+        return bitmaps
+
+    @property
+    def values(self):
+        """Indexed values in sorted order"""
+        return list(self.bitmaps)
+
+    def match(self, values):
+        """Bitmap of rows whose value is any of values"""
+        result = np.zeros((self.row_count + 7) // 8, dtype=np.uint8)
+        for value in values:
+            bitmap = self.bitmaps.get(value)
+            if bitmap is not None:
+                result |= bitmap
+        return result
+
+    def counts(self, within=None):
+        """Rows per value, optionally restricted to the rows set in within"""
+        if within is None:
+            return {value: bitmap_count(bitmap) for value, bitmap in self.bitmaps.items()}
+        return {value: bitmap_count(bitmap & within) for value, bitmap in self.bitmaps.items()}
+
+
+class SortIndex:
+    """Dense sort keys of a frame's columns, built per column on first use.
+
+    Sorting a result set is then an integer argsort of its keys, and a sorted
+    page of the unfiltered frame is a slice of an order computed once. Text
+    sorts case-insensitively; missing and blank values sort last in both
+    directions, and ties keep their earlier order.
+    """
+
+    def __init__(self, df):
+        self._df = df
+        self.row_count = len(df)
+        self._keys = {}
+        self._orders = {}
+
+    def _build_keys(self, column):
+        series = self._df[column]
+        if not (pd.api.types.is_numeric_dtype(series) or pd.api.types.is_datetime64_any_dtype(series)):
+            series = to_text(series).str.casefold()
+            series = series.mask(series.eq(''))
+        codes, uniques = pd.factorize(series, sort=True)
+        missing = codes < 0
+        ascending = codes.astype(np.int32)
+        descending = (len(uniques) - 1 - ascending).astype(np.int32)
+        ascending[missing] = descending[missing] = len(uniques)
+        return ascending, descending
+
+    def keys(self, column, descending=False):
+        """Per-row sort key of column (smaller sorts first)"""
+        if column not in self._keys:
+            self._keys[column] = self._build_keys(column)
+        return self._keys[column][1 if descending else 0]
+
+    def order(self, column, descending=False, within=None):
+        """Row positions sorted by column, of every row or only of the positions in within"""
+        key = self.keys(column, descending)
+        if within is None:
+            if (column, descending) not in self._orders:
+                self._orders[(column, descending)] = np.argsort(key, kind='stable')
+            return self._orders[(column, descending)]
+        within = np.asarray(within)
+        return within[np.argsort(key[within], kind='stable')]
@@ -0,0 +1,108 @@
+"""Broadcast of "worksheet X changed at version N" events between sessions.
+
+Every successful write publishes one event. Sessions poll the bus on each
+rerun with their own cursor and mark only the changed worksheets stale, so
+a write by one user costs every other user a single tab reload, done lazily
+when a page next needs that tab.
+
+Without a path the bus lives in this process only. With a path, events are
+also appended to a shared JSON-lines log so app workers on the same machine
+see each other's writes; the log is tiny (one line per write) and polling
+it costs a stat() call when nothing has changed.
+"""
+
+import json
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process deployments only need the in-process lock
+    fcntl = None
+
+
+class InvalidationBus:
+    """Ordered log of worksheet change events with per-worksheet versions"""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.versions = {}
+        self._events = []
+        self._offset = 0  # bytes of the shared log already applied to versions
+        self._lock = threading.Lock()
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            open(path, "a").close()
+
+    def cursor(self):
+        """Position after the newest event; new sessions start here"""
+        with self._lock:
+            if self.path:
+                return os.path.getsize(self.path)
+            return len(self._events)
+
+    def publish(self, worksheet_name, origin=None):
+        """Record that worksheet_name changed; returns its new version"""
+        with self._lock:
+            if not self.path:
+                version = self.versions.get(worksheet_name, 0) + 1
+                self.versions[worksheet_name] = version
+                self._events.append(self._event(worksheet_name, version, origin))
+                return version
+
+            with open(self.path, "a+") as handle:
+                if fcntl is not None:
+                    fcntl.flock(handle, fcntl.LOCK_EX)
+                try:
+                    # Catch up with other processes so versions stay consecutive
+                    handle.seek(self._offset)
+                    self._apply(handle.read())
+                    version = self.versions.get(worksheet_name, 0) + 1
+                    self.versions[worksheet_name] = version
+                    handle.write(json.dumps(self._event(worksheet_name, version, origin)) + "\n")
+                    handle.flush()
+                    self._offset = handle.tell()
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(handle, fcntl.LOCK_UN)
+            return version
+
+    def poll(self, cursor):
+        """Events published after cursor, and the cursor to use next time"""
+        with self._lock:
+            if not self.path:
+                return list(self._events[cursor:]), len(self._events)
+
+            if os.path.getsize(self.path) <= cursor:
+                return [], cursor
+            with open(self.path) as handle:
+                handle.seek(cursor)
+                text = handle.read()
+            # Ignore a line another process is still writing
+            complete = text[:text.rfind("\n") + 1]
+            events = [json.loads(line) for line in complete.splitlines() if line]
+            return events, cursor + len(complete.encode())
+
+    def _apply(self, text):
+        for line in text.splitlines():
+            if line:
+                event = json.loads(line)
+                self.versions[event["worksheet"]] = max(self.versions.get(event["worksheet"], 0), event["version"])
+
+    @staticmethod
+    def _event(worksheet_name, version, origin):
+        return {"worksheet": worksheet_name, "version": version, "origin": origin, "time": time.time()}
+
+
+_buses = {}
+_buses_lock = threading.Lock()
+
+
+def get_bus(path=None):
+    """Process-wide bus, shared through the log at path when one is given"""
+    key = os.path.abspath(path) if path else None
+    with _buses_lock:
+        if key not in _buses:
+            _buses[key] = InvalidationBus(key)
+        return _buses[key]
@@ -0,0 +1,82 @@
+"""Margin analytics: catalogue costs against the latest customer quote per product.
+
+The latest quote for every product is found with one sort and de-duplication
+of the normalized quote table, joined to the catalogue by part number, and
+margin, markup and distributor margin are computed as whole-column array
+arithmetic in the reporting currency. Zero or missing costs give NaN rather
+than a meaningless 100% margin.
+"""
+
+import numpy as np
+import pandas as pd
+
+from qms.facets import product_keys
+from qms.fx import DISTRIBUTOR_PRICE_COLUMNS, PARTS_PRICE_COLUMNS, catalogue_prices
+from qms.normalize import to_text
+
+MARGIN_COLUMNS = [
+    'Category', 'Part', 'Parts Cost', 'Distributor Price', 'Wafer Price', 'Latest Quote', 'Quote Date',
+    'Customer', 'Distributor', 'Margin %', 'Markup %', 'Distributor Margin %',
+]
+
+
+def latest_quotes(quotes):
+    """The most recent quote per product (by part number, case-insensitive)"""
+    dated = quotes[quotes['Quote_Date'].notna() & quotes['Reporting_Price'].notna()]
+    dated = dated.assign(Key=to_text(dated['Product_Name']).str.casefold())
+    ordered = dated.sort_values(['Quote_Date', 'Source_Row', 'Slot'], kind='stable')
+    return ordered.drop_duplicates('Key', keep='last').set_index('Key')
+
+
+def _positive(values):
+    values = np.asarray(values, dtype=float)
+    # Zero is how the add product form records a missing price
+    return np.where(values > 0, values, np.nan)
+
+
+def margin_table(catalogue, reporting_quotes, fx, currency):
+    """One row per catalogue part with its costs, latest quote, margin and markup in currency"""
+    parts_cost = _positive(catalogue_prices(catalogue, fx, currency, PARTS_PRICE_COLUMNS))
+    distributor_price = _positive(catalogue_prices(catalogue, fx, currency, DISTRIBUTOR_PRICE_COLUMNS))
+    if 'Wafer Price (RMB)' in catalogue.columns:
+        wafer_rmb = pd.to_numeric(catalogue['Wafer Price (RMB)'], errors='coerce')
+        dates = catalogue['Quote Date'] if 'Quote Date' in catalogue.columns else pd.Series(pd.NaT, index=catalogue.index)
+        wafer_price = _positive(fx.convert(wafer_rmb, np.full(len(catalogue), "RMB", dtype=object), dates, currency))
+    else:
+        wafer_price = np.full(len(catalogue), np.nan)
+
+    keys = product_keys(catalogue)
+    latest = latest_quotes(reporting_quotes).reindex(keys.to_numpy())
+    quote = latest['Reporting_Price'].to_numpy(dtype=float)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        table = pd.DataFrame({
+            'Category': catalogue['Category'].to_numpy() if 'Category' in catalogue.columns else '',
+            'Part': _part_labels(catalogue),
+            'Parts Cost': parts_cost,
+            'Distributor Price': distributor_price,
+            'Wafer Price': wafer_price,
+            'Latest Quote': quote,
+            'Quote Date': latest['Quote_Date'].to_numpy(),
+            'Customer': latest['Customer'].to_numpy(),
+            'Distributor': latest['Distributor'].to_numpy(),
+            'Margin %': (quote - parts_cost) / quote * 100,
+            'Markup %': (quote - parts_cost) / parts_cost * 100,
+            'Distributor Margin %': (quote - distributor_price) / quote * 100,
+        })
+    return table[MARGIN_COLUMNS]
+
+
+def _part_labels(catalogue):
+    """Magnias P/N, else Product Name, as shown in the catalogue"""
+    labels = pd.Series('', index=catalogue.index)
+    for column in ('Product Name', 'Magnias P/N'):
+        if column in catalogue.columns:
+            text = to_text(catalogue[column])
+            labels = text.where(text.ne(''), labels)
+    return labels.to_numpy()
+
+
+def lowest_margins(table, sort_by='Margin %', limit=50):
+    """Quoted parts with the lowest values of sort_by first"""
+    return table.dropna(subset=[sort_by]).nsmallest(limit, sort_by)
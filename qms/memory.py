@@ -0,0 +1,283 @@
+"""Memory budget for the objects each session derives from its worksheets.
+
+Sessions keep their worksheet DataFrames in session state, but the indexes,
+reports and converted quote tables built from them are handed to one
+process-wide governor, keyed by session and name. The governor knows every
+session's worksheet and derived bytes, so it can enforce two budgets: when a
+session, or the process as a whole, goes over budget, the least recently
+used derived objects are dropped, whichever session owns them. Objects
+nobody has used for idle_seconds are dropped even under budget, so idle
+sessions give back everything but their worksheets. A dropped object is
+rebuilt by its getter the next time a page needs it.
+
+Sizes are estimates: DataFrames and arrays count their column buffers, and
+containers and plain objects are walked. Object arrays and large containers
+are sized from an evenly spaced sample of their elements. Worksheet frames an index merely refers to are
+excluded by the caller so they are not charged twice. Tables that many sessions
+share, such as the frames of a memory-mapped snapshot, are reported by key and
+counted once per process, not against any one session's budget.
+"""
+
+import sys
+import threading
+import time
+import types
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_SESSION_BUDGET_MB = 512
+DEFAULT_PROCESS_BUDGET_MB = 2048
+DEFAULT_IDLE_SECONDS = 30 * 60
+# Elements of an object array, and of a large dict or list, sampled to estimate the size of the rest
+OBJECT_SAMPLE_SIZE = 200
+CONTAINER_SAMPLE_SIZE = 32
+MB = 1 << 20
+
+_SKIPPED_TYPES = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType)
+
+
+def _sample(items, size):
+    """items, or an evenly spaced sample of them, and the weight each returned item stands for"""
+    items = list(items)
+    if len(items) <= size:
+        return items, 1.0
+    sample = items[::len(items) // size]
+    return sample, len(items) / len(sample)
+
+
+def estimate_bytes(value, exclude=()):
+    """Approximate deep size of value; objects whose id is in exclude are not counted.
+
+    Large containers are estimated from a sample of their elements, as are object arrays.
+    """
+    seen = set(exclude)
+    total = 0.0
+    stack = [(value, 1.0)]
+    while stack:
+        item, weight = stack.pop()
+        if id(item) in seen or isinstance(item, _SKIPPED_TYPES):
+            continue
+        seen.add(id(item))
+        if isinstance(item, pd.DataFrame):
+            # Column buffers: much cheaper than memory_usage(deep=True) on many small frames
+            size = 0
+            stack.append((item.index, weight))
+            stack.extend((column.array, weight) for _, column in item.items())
+        elif isinstance(item, (pd.Series, pd.Index)):
+            size = 0
+            stack.append((item.array, weight))
+        elif isinstance(item, np.ndarray) or (isinstance(item, pd.api.extensions.ExtensionArray)
+                                              and item.dtype == object):
+            item = np.asarray(item)
+            size = item.nbytes
+            if item.dtype == object and item.size:
+                sample, scale = _sample(item.ravel(), OBJECT_SAMPLE_SIZE)
+                size += sum(sys.getsizeof(element) for element in sample) * scale
+        elif isinstance(item, dict):
+            size = sys.getsizeof(item)
+            sample, scale = _sample(item.items(), CONTAINER_SAMPLE_SIZE)
+            stack.extend((element, weight * scale) for pair in sample for element in pair)
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            size = sys.getsizeof(item)
+            sample, scale = _sample(item, CONTAINER_SAMPLE_SIZE)
+            stack.extend((element, weight * scale) for element in sample)
+        elif isinstance(getattr(item, 'nbytes', None), int):
+            # Arrow tables and arrays, pandas extension arrays
+            size = item.nbytes
+        elif hasattr(item, '__dict__') and not isinstance(item, (str, bytes)):
+            size = sys.getsizeof(item)
+            stack.append((vars(item), weight))
+        else:
+            size = sys.getsizeof(item)
+        total += size * weight
+    return int(total)
+
+
+class SessionToken:
+    """Kept in a session's state; when Streamlit discards the session, the governor forgets it"""
+
+
+class _Entry:
+    __slots__ = ('value', 'nbytes', 'last_used')
+
+    def __init__(self, value, nbytes, last_used):
+        self.value = value
+        self.nbytes = nbytes
+        self.last_used = last_used
+
+
+class MemoryGovernor:
+    """Derived objects of every session, evicted least recently used first under byte budgets"""
+
+    def __init__(self, session_budget=DEFAULT_SESSION_BUDGET_MB * MB, process_budget=DEFAULT_PROCESS_BUDGET_MB * MB,
+                 idle_seconds=DEFAULT_IDLE_SECONDS, clock=time.monotonic):
+        self.session_budget = session_budget
+        self.process_budget = process_budget
+        self.idle_seconds = idle_seconds
+        self.clock = clock
+        # (session, name) -> entry, least recently used first
+        self._entries = OrderedDict()
+        self._worksheet_bytes = {}
+        # session -> {shared table key: bytes}
+        self._shared_tables = {}
+        self._last_seen = {}
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.evicted_bytes = 0
+
+    def configure(self, session_budget=None, process_budget=None, idle_seconds=None):
+        """Change budgets (bytes) or the idle timeout; None keeps the current value"""
+        with self._lock:
+            if session_budget is not None:
+                self.session_budget = session_budget
+            if process_budget is not None:
+                self.process_budget = process_budget
+            if idle_seconds is not None:
+                self.idle_seconds = idle_seconds
+            self._enforce()
+
+    def register(self, session, token):
+        """Forget session's objects once token (kept in its session state) is garbage collected"""
+        weakref.finalize(token, self.forget, session)
+
+    def get(self, session, name):
+        """The object stored under name for session, or None when it was never stored or was evicted"""
+        with self._lock:
+            entry = self._entries.get((session, name))
+            now = self.clock()
+            self._last_seen[session] = now
+            if entry is None:
+                return None
+            self._entries.move_to_end((session, name))
+            entry.last_used = now
+            return entry.value
+
+    def put(self, session, name, value, exclude=()):
+        """Store value under name for session and return it; may evict other objects to stay in budget"""
+        nbytes = estimate_bytes(value, exclude)
+        with self._lock:
+            now = self.clock()
+            self._entries[(session, name)] = _Entry(value, nbytes, now)
+            self._entries.move_to_end((session, name))
+            self._last_seen[session] = now
+            self._enforce(keep=(session, name))
+        return value
+
+    def discard(self, session, name=None):
+        """Drop one of session's objects, or all of them when name is None"""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == session and (name is None or key[1] == name)]:
+                del self._entries[key]
+
+    def set_worksheet_bytes(self, session, nbytes, shared=None):
+        """Record the worksheet data session holds; it counts against the budgets but is never evicted.
+
+        nbytes is the data session holds itself. shared maps the key of each table session shares with others
+        (a snapshot version and tab, say) to its bytes; each key counts once towards the process budget.
+        """
+        with self._lock:
+            self._worksheet_bytes[session] = nbytes
+            self._shared_tables[session] = dict(shared or {})
+            self._last_seen[session] = self.clock()
+            self._enforce()
+
+    def forget(self, session):
+        """Drop everything known about a session that has ended"""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == session]:
+                del self._entries[key]
+            self._worksheet_bytes.pop(session, None)
+            self._shared_tables.pop(session, None)
+            self._last_seen.pop(session, None)
+
+    def _evict(self, key):
+        entry = self._entries.pop(key)
+        self.evictions += 1
+        self.evicted_bytes += entry.nbytes
+        return entry.nbytes
+
+    def _session_totals(self):
+        totals = dict(self._worksheet_bytes)
+        for (session, _), entry in self._entries.items():
+            totals[session] = totals.get(session, 0) + entry.nbytes
+        return totals
+
+    def _shared_bytes(self):
+        tables = {}
+        for shared in self._shared_tables.values():
+            tables.update(shared)
+        return sum(tables.values())
+
+    def _enforce(self, keep=None):
+        """Evict idle objects, then least recently used ones while a budget is exceeded; never keep"""
+        now = self.clock()
+        for key, entry in list(self._entries.items()):
+            if now - entry.last_used <= self.idle_seconds:
+                break
+            if key != keep:
+                self._evict(key)
+        totals = self._session_totals()
+        process_total = sum(totals.values()) + self._shared_bytes()
+        for key in list(self._entries):
+            session = key[0]
+            over_process = process_total > self.process_budget
+            if not over_process and totals[session] <= self.session_budget:
+                continue
+            if key == keep:
+                continue
+            freed = self._evict(key)
+            totals[session] -= freed
+            process_total -= freed
+            if process_total <= self.process_budget and all(total <= self.session_budget for total in totals.values()):
+                break
+
+    def total_bytes(self):
+        """Worksheet and derived bytes of every session, with each shared table counted once"""
+        with self._lock:
+            return sum(self._session_totals().values()) + self._shared_bytes()
+
+    def shared_bytes(self):
+        """Bytes of the tables sessions share, each counted once"""
+        with self._lock:
+            return self._shared_bytes()
+
+    def sessions(self):
+        """One row per known session: its own worksheet bytes, the shared tables it uses, derived bytes, objects
+        and idle time"""
+        with self._lock:
+            now = self.clock()
+            rows = {session: {'session': session, 'worksheet_bytes': nbytes,
+                              'shared_bytes': sum(self._shared_tables.get(session, {}).values()),
+                              'derived_bytes': 0, 'objects': 0}
+                    for session, nbytes in self._worksheet_bytes.items()}
+            for (session, _), entry in self._entries.items():
+                row = rows.setdefault(session, {'session': session, 'worksheet_bytes': 0, 'shared_bytes': 0,
+                                                'derived_bytes': 0, 'objects': 0})
+                row['derived_bytes'] += entry.nbytes
+                row['objects'] += 1
+            for session, row in rows.items():
+                row['idle_seconds'] = now - self._last_seen.get(session, now)
+            return list(rows.values())
+
+    def objects(self, session):
+        """session's derived objects as (name, bytes, idle seconds), least recently used first"""
+        with self._lock:
+            now = self.clock()
+            return [(name, entry.nbytes, now - entry.last_used)
+                    for (owner, name), entry in self._entries.items() if owner == session]
+
+
+_governor = None
+_governor_lock = threading.Lock()
+
+
+def get_governor():
+    """Process-wide memory governor"""
+    global _governor
+    with _governor_lock:
+        if _governor is None:
+            _governor = MemoryGovernor()
+        return _governor
@@ -0,0 +1,228 @@
+"""Canonical customer and distributor names.
+
+End customer and distributor cells are free text, so one company shows up
+as "Midea", "MIDEA Co., Ltd." and "Midea Grp". Names are first reduced to a
+key (case, punctuation and legal suffixes dropped); keys are then compared
+with a trigram-blocked fuzzy index, which only scores pairs sharing an
+uncommon trigram instead of every pair. Keys that match closely enough are
+merged automatically, and a persisted alias map (variant -> canonical name)
+overrides both and records merges confirmed by hand:
+
+    {"Customer": {"Midea Grp": "Midea"}, "Distributor": {}}
+
+Each merged group is shown under its alias target, or else its most quoted
+spelling.
+"""
+
+import json
+import os
+import re
+import threading
+from collections import Counter
+
+import pandas as pd
+
+from qms.normalize import to_text
+from qms.search import LRUCache
+
+NAME_KINDS = ["Customer", "Distributor"]
+DEFAULT_ALIASES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "name_aliases.json")
+
+# Trailing words that do not distinguish one company from another
+LEGAL_SUFFIXES = {
+    'co', 'company', 'corp', 'corporation', 'inc', 'incorporated', 'ltd', 'limited', 'llc', 'plc',
+    'gmbh', 'ag', 'sa', 'bv', 'group', 'grp', 'holdings',
+}
+# Dice similarity of trigram sets at which two keys are merged without asking
+AUTO_MERGE_SIMILARITY = 0.9
+# Lowest similarity offered as a merge suggestion
+SUGGEST_SIMILARITY = 0.7
+# Trigrams shared by more names than this are too common to block on
+MAX_BLOCK_SIZE = 200
+INDEX_CACHE_SIZE = 8
+
+_indexes = LRUCache(INDEX_CACHE_SIZE)
+_indexes_lock = threading.Lock()
+
+
+def name_key(name):
+    """Comparison key: casefolded words without punctuation or trailing legal suffixes"""
+    words = re.sub(r'[^\w]+', ' ', str(name).casefold().replace('&', ' and ')).split()
+    while len(words) > 1 and words[-1] in LEGAL_SUFFIXES:
+        words.pop()
+    return ' '.join(words)
+
+
+def _trigrams(key):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class NameIndex:
+    """Trigram-blocked fuzzy matching over a set of name keys"""
+
+    def __init__(self, keys):
+        self.keys = sorted(set(keys) - {''})
+        self._grams = [_trigrams(key) for key in self.keys]
+        self._blocks = {}
+        self._pairs = {}
+        for position, grams in enumerate(self._grams):
+            for gram in grams:
+                self._blocks.setdefault(gram, []).append(position)
+
+    def similar(self, key, threshold=SUGGEST_SIMILARITY):
+        """Indexed keys at least threshold similar to key, best first, as (key, similarity)"""
+        grams = _trigrams(key)
+        shared = Counter()
+        for gram in grams:
+            block = self._blocks.get(gram, ())
+            if len(block) <= MAX_BLOCK_SIZE:
+                shared.update(block)
+        matches = []
+        for position in shared:
+            other = self._grams[position]
+            similarity = 2 * len(grams & other) / (len(grams) + len(other))
+            if similarity >= threshold and self.keys[position] != key:
+                matches.append((self.keys[position], similarity))
+        return sorted(matches, key=lambda match: (-match[1], match[0]))
+
+    def pairs(self, threshold=SUGGEST_SIMILARITY):
+        """Every pair of indexed keys at least threshold similar, each pair once (computed once per threshold)"""
+        if threshold not in self._pairs:
+            self._pairs[threshold] = [
+                (key, other, similarity)
+                for key in self.keys
+                for other, similarity in self.similar(key, threshold)
+                if key < other
+            ]
+        return self._pairs[threshold]
+
+
+def get_index(kind, keys):
+    """Process-wide fuzzy index for a set of keys, reused while the set is unchanged"""
+    keys = frozenset(keys)
+    with _indexes_lock:
+        cached = _indexes.get((kind, keys))
+    if cached is None:
+        cached = NameIndex(keys)
+        with _indexes_lock:
+            _indexes.put((kind, keys), cached)
+    return cached
+
+
+class NameCanonicalizer:
+    """Mapping from every spelling of a name to its canonical form"""
+
+    def __init__(self, kind, counts, aliases=None):
+        """counts: quotes per raw spelling; aliases: variant -> canonical name"""
+        aliases = aliases or {}
+        counts = counts[counts.index.map(lambda name: name_key(name) != '')]
+        self.counts = counts
+        keys = {name: name_key(name) for name in counts.index}
+        alias_keys = {name_key(variant): name_key(target) for variant, target in aliases.items()}
+        self.index = get_index(kind, set(keys.values()) | set(alias_keys.values()))
+
+        parent = {key: key for key in self.index.keys}
+
+        def find(key):
+            parent.setdefault(key, key)
+            while parent[key] != key:
+                parent[key] = parent[parent[key]]
+                key = parent[key]
+            return key
+
+        # Suggestion-level pairs are computed once and shared with suggestions()
+        for key, other, similarity in self.index.pairs(SUGGEST_SIMILARITY):
+            if similarity >= AUTO_MERGE_SIMILARITY:
+                parent[find(key)] = find(other)
+        for variant, target in alias_keys.items():
+            parent[find(variant)] = find(target)
+
+        # Alias targets name their group; otherwise the most quoted spelling does
+        names = {}
+        for target in aliases.values():
+            names.setdefault(find(name_key(target)), target)
+        ranked = sorted(counts.items(), key=lambda item: (-item[1], len(item[0]), item[0]))
+        for name, _ in ranked:
+            names.setdefault(find(keys[name]), name)
+
+        self._find = find
+        self._names = names
+        self.mapping = {name: names[find(key)] for name, key in keys.items()}
+        for variant in aliases:
+            self.mapping[variant] = names[find(name_key(variant))]
+
+    def canonical(self, name):
+        """Canonical form of one name; unseen names join the closest group if near enough"""
+        name = str(name).strip()
+        if name in self.mapping:
+            return self.mapping[name]
+        key = name_key(name)
+        if key not in self._names and key not in self.index.keys:
+            matches = self.index.similar(key, AUTO_MERGE_SIMILARITY)
+            if not matches:
+                return name
+            key = matches[0][0]
+        return self._names.get(self._find(key), name)
+
+    def apply(self, series):
+        """Series with each name replaced by its canonical form (blank cells are kept)"""
+        text = to_text(series)
+        return text.map(self.mapping).fillna(text)
+
+    def suggestions(self, threshold=SUGGEST_SIMILARITY):
+        """Likely variants not merged yet: Name, Suggested canonical name, Similarity, Quotes"""
+        rows = []
+        canonical = {name_key(name): self.mapping[name] for name in self.counts.index}
+        # Quotes per canonical name, all spellings included
+        counts = self.counts.groupby(self.counts.index.map(self.mapping)).sum()
+        for key, other, similarity in self.index.pairs(min(threshold, SUGGEST_SIMILARITY)):
+            if similarity < threshold or self._find(key) == self._find(other) or key not in canonical or other not in canonical:
+                continue
+            first, second = canonical[key], canonical[other]
+            # Suggest folding the less quoted name into the more quoted one
+            if counts.get(first, 0) > counts.get(second, 0):
+                first, second = second, first
+            rows.append({'Name': first, 'Suggested': second, 'Similarity': round(similarity, 3),
+                         'Quotes': int(counts.get(first, 0))})
+        frame = pd.DataFrame(rows, columns=['Name', 'Suggested', 'Similarity', 'Quotes'])
+        return frame.drop_duplicates(['Name', 'Suggested']).sort_values(['Similarity', 'Quotes'], ascending=False,
+                                                                        ignore_index=True)
+
+
+def load_aliases(path=DEFAULT_ALIASES_PATH):
+    """Alias map per name kind; a missing file means no aliases"""
+    try:
+        with open(path, encoding='utf-8') as handle:
+            stored = json.load(handle)
+    except FileNotFoundError:
+        stored = {}
+    return {kind: dict(stored.get(kind, {})) for kind in NAME_KINDS}
+
+
+def save_aliases(aliases, path=DEFAULT_ALIASES_PATH):
+    """Write the alias map atomically so readers never see a partial file"""
+    temporary = f"{path}.tmp"
+    with open(temporary, 'w', encoding='utf-8') as handle:
+        json.dump({kind: dict(sorted(aliases.get(kind, {}).items())) for kind in NAME_KINDS},
+                  handle, indent=2, ensure_ascii=False)
+    os.replace(temporary, path)
+
+
+def aliases_version(path=DEFAULT_ALIASES_PATH):
+    """Changes whenever the alias file does (None when there is no file)"""
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def canonicalize_quotes(quotes, aliases):
+    """Normalized quotes with canonical Customer and Distributor names, plus the canonicalizers used"""
+    quotes = quotes.copy()
+    canonicalizers = {}
+    for kind in NAME_KINDS:
+        counts = to_text(quotes[kind]).value_counts()
+        canonicalizers[kind] = NameCanonicalizer(kind, counts, aliases.get(kind))
+        quotes[kind] = canonicalizers[kind].apply(quotes[kind])
+    return quotes, canonicalizers
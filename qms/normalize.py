@@ -0,0 +1,124 @@
+"""Vectorized normalization of raw worksheet records into typed tables.
+
+Catalogue tabs get a parsed Quote Date and numeric price/spec columns; the
+wide QuoteUSD/QuoteRMB tabs are kept as text for the existing wide-layout
+helpers and can also be flattened into one row per quote by normalize_quotes().
+"""
+
+import numpy as np
+import pandas as pd
+
+# Columns converted to numbers when every non-blank value parses as one
+NUMERIC_COLUMNS = [
+    'Parts RMB Price', 'Parts USD Price', 'Wafer Price (RMB)', 'Distributor RMB Price', 'Distributor USD Price',
+    'VDS (V)', 'ID (A)', 'IF (mA)', 'IFSM (A)', 'VRRM (V)', 'Vf @ If= 1mA', 'PPK @ 10/1000us (W)',
+]
+
+QUOTE_SLOTS = range(1, 9)  # DC-1 to DC-8
+
+# Column order of the normalized (long) quote table
+QUOTE_COLUMNS = [
+    'Product_Category', 'Product_Name', 'Currency', 'Price', 'Raw_Price', 'Customer', 'Distributor',
+    'Quote_Date', 'Raw_Date', 'Slot', 'Source_Row',
+]
+
+
+def to_text(series):
+    """Cells as stripped strings, with blanks and missing values as ''"""
+    return series.where(series.notna(), '').astype(str).str.strip()
+
+
+def parse_prices(series):
+    """Numeric prices from cells such as 0.1234, '$0.1234' or '¥1,234.5'"""
+    text = to_text(series).str.replace(r'[$¥,]', '', regex=True)
+    return pd.to_numeric(text, errors='coerce')
+
+
+def parse_dates(series, formats):
+    """Parse dates trying each explicit format in turn, then pandas' mixed-format parser"""
+    text = to_text(series)
+    parsed = pd.Series(pd.NaT, index=series.index, dtype='datetime64[ns]')
+    remaining = text.ne('')
+    for date_format in formats:
+        if not remaining.any():
+            break
+        attempt = pd.to_datetime(text[remaining], format=date_format, errors='coerce')
+        parsed[attempt.index] = attempt
+        remaining &= parsed.isna()
+    if remaining.any():
+        parsed[remaining] = pd.to_datetime(text[remaining], format='mixed', errors='coerce')
+    return parsed
+
+
+def numeric_or_text(series):
+    """Numbers if every non-blank cell parses as one, otherwise text"""
+    numbers = parse_prices(series)
+    blank = to_text(series).eq('')
+    if (numbers.notna() | blank).all():
+        return numbers
+    return to_text(series)
+
+
+def normalize_catalogue(df):
+    """Typed copy of a catalogue tab"""
+    df = df.copy()
+    for column in df.columns:
+        if column == 'Quote Date':
+            # Handle both 'YYYY.MM.DD' and 'YYYY-MM-DD' formats
+            df[column] = parse_dates(to_text(df[column]).str.replace('.', '-', regex=False), ['%Y-%m-%d'])
+        elif column in NUMERIC_COLUMNS:
+            df[column] = numeric_or_text(df[column])
+        else:
+            df[column] = to_text(df[column])
+    return df
+
+
+def normalize_wide_quotes(df):
+    """Wide quote tab with every cell as text"""
+    return df.apply(to_text) if not df.empty else df.copy()
+
+
+def customer_column(columns, slot):
+    """End customer column for a DC slot; the sheets mix 'End Customer' and 'End Customers'"""
+    preferred = f'End Customers {slot}' if slot in (3, 4) else f'End Customer {slot}'
+    alternative = f'End Customer {slot}' if slot in (3, 4) else f'End Customers {slot}'
+    return preferred if preferred in columns else alternative
+
+
+def normalize_quotes(df, currency):
+    """Flatten a wide quote tab into one row per filled DC slot"""
+    if df is None or df.empty or 'Products' not in df.columns or 'Product Name' not in df.columns:
+        return pd.DataFrame({column: pd.Series(dtype=object) for column in QUOTE_COLUMNS})
+
+    categories = to_text(df['Products'])
+    names = to_text(df['Product Name'])
+    source_rows = np.arange(len(df))
+    parts = []
+    for slot in QUOTE_SLOTS:
+        dc_col = f'DC-{slot}'
+        date_col = f'Quote Date {slot}'
+        distributor_col = f'Distributor-{slot}'
+        customer_col = customer_column(df.columns, slot)
+        if any(column not in df.columns for column in (dc_col, date_col, distributor_col, customer_col)):
+            continue
+        parts.append(pd.DataFrame({
+            'Product_Category': categories.to_numpy(),
+            'Product_Name': names.to_numpy(),
+            'Raw_Price': to_text(df[dc_col]).to_numpy(),
+            'Customer': to_text(df[customer_col]).to_numpy(),
+            'Distributor': to_text(df[distributor_col]).to_numpy(),
+            'Raw_Date': to_text(df[date_col]).to_numpy(),
+            'Slot': slot,
+            'Source_Row': source_rows,
+        }))
+    if not parts:
+        return normalize_quotes(None, currency)
+
+    quotes = pd.concat(parts, ignore_index=True)
+    filled = quotes['Raw_Price'].ne('') & quotes['Customer'].ne('') & quotes['Raw_Date'].ne('')
+    quotes = quotes[filled].reset_index(drop=True)
+    quotes['Currency'] = currency
+    quotes['Distributor'] = quotes['Distributor'].where(quotes['Distributor'].ne(''), 'N/A')
+    quotes['Price'] = parse_prices(quotes['Raw_Price'])
+    quotes['Quote_Date'] = parse_dates(quotes['Raw_Date'], ['%m/%d/%Y', '%Y-%m-%d', '%Y.%m.%d'])
+    return quotes[QUOTE_COLUMNS]
@@ -0,0 +1,320 @@
+"""Customer quotation documents (HTML, or PDF when reportlab is installed).
+
+A quotation is built in two steps. quotation_document() picks a unit price
+for each requested part from the session's catalogue and normalized quotes
+and returns plain data. render() turns that data into a file. Rendering is
+the expensive step, so rendered files are cached process-wide under a hash
+of the document and format. A batch covering several customers renders its
+uncached documents in a process pool.
+"""
+
+import hashlib
+import html
+import io
+import json
+import multiprocessing
+import os
+import re
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from qms.facets import product_keys
+from qms.fx import PARTS_PRICE_COLUMNS, catalogue_prices
+from qms.normalize import parse_prices, to_text
+from qms.search import LRUCache
+
+QUOTATION_FORMATS = {"HTML": ("html", "text/html"), "PDF": ("pdf", "application/pdf")}
+# Columns summarized in a line's description, in order
+DESCRIPTION_COLUMNS = [
+    'Package', 'Type', 'Polarity', 'VDS (V)', 'ID (A)', 'IF (mA)', 'IFSM (A)', 'VRRM (V)', 'Vf @ If= 1mA',
+    'PPK @ 10/1000us (W)',
+]
+VALID_DAYS = 30
+DOCUMENT_CACHE_SIZE = 256
+POOL_WORKERS = min(4, os.cpu_count() or 1)
+# Bump when the layout changes so cached documents are regenerated
+TEMPLATE_VERSION = 1
+
+_documents = LRUCache(DOCUMENT_CACHE_SIZE)
+_documents_lock = threading.Lock()
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def available_formats():
+    """Formats whose renderer is installed (PDF needs reportlab)"""
+    try:
+        import reportlab  # noqa: F401
+    except ImportError:
+        return ["HTML"]
+    return ["HTML", "PDF"]
+
+
+def _latest_by_key(quotes):
+    return quotes.sort_values('Quote_Date', kind='stable').drop_duplicates('Key', keep='last').set_index('Key')
+
+
+def _describe(row):
+    parts = []
+    for column in DESCRIPTION_COLUMNS:
+        value = row.get(column)
+        if value is None or pd.isna(value) or str(value).strip() in ('', 'N/A'):
+            continue
+        value = f"{value:g}" if isinstance(value, (int, float, np.number)) else str(value).strip()
+        parts.append(value if column in ('Package', 'Type', 'Polarity') else f"{column} {value}")
+    return ", ".join(parts)
+
+
+def _part_label(row, typed):
+    for column in ('Magnias P/N', 'Product Name'):
+        value = row.get(column)
+        if value is not None and pd.notna(value) and str(value).strip():
+            return str(value).strip()
+    return typed
+
+
+def quotation_document(catalogue, quotes, customer, part_numbers, currency, fx=None, quote_date=None):
+    """Lines and header of one customer's quotation, as plain (picklable, hashable) data.
+
+    Each part's unit price is the latest price quoted to this customer, else
+    the latest quote to anyone, else the catalogue parts price, converted to
+    currency at the current rate when quoted in the other one.
+    """
+    quote_date = quote_date or date.today()
+    # Parts are matched case-insensitively, so case variants of a part are one line (the first spelling)
+    wanted = {}
+    for part in part_numbers:
+        part = str(part).strip()
+        if part:
+            wanted.setdefault(part.casefold(), part)
+    keys = product_keys(catalogue)
+    first_rows = pd.Series(np.arange(len(catalogue)), index=keys.to_numpy())
+    first_rows = first_rows[~first_rows.index.duplicated()]
+    rows = first_rows.reindex(list(wanted))
+    wanted = list(wanted.values())
+
+    quoted = quotes[quotes['Price'].notna() & quotes['Quote_Date'].notna()]
+    quoted = quoted.assign(Key=to_text(quoted['Product_Name']).str.casefold())
+    quoted = quoted[quoted['Key'].isin(set(rows.index))]
+    latest_any = _latest_by_key(quoted)
+    latest_customer = _latest_by_key(quoted[to_text(quoted['Customer']).str.casefold() == customer.strip().casefold()])
+
+    list_prices = pd.Series(np.nan, index=rows.index)
+    found = rows.notna().to_numpy()
+    if found.any():
+        matched = catalogue.iloc[rows[found].astype(int).to_numpy()]
+        if fx is not None:
+            list_prices[found] = catalogue_prices(matched, fx, currency, PARTS_PRICE_COLUMNS).to_numpy()
+        elif PARTS_PRICE_COLUMNS.get(currency) in matched.columns:
+            # Without rates only a list price already in this currency can be used
+            list_prices[found] = parse_prices(matched[PARTS_PRICE_COLUMNS[currency]]).to_numpy()
+
+    lines = []
+    for number, (part, key) in enumerate(zip(wanted, rows.index), 1):
+        row = catalogue.iloc[int(rows[key])] if pd.notna(rows[key]) else None
+        price, basis = None, "Price on request"
+        for latest, label in ((latest_customer, "Last quoted to you"), (latest_any, "Latest quote")):
+            if key in latest.index:
+                quote = latest.loc[key]
+                price = float(quote['Price'])
+                if quote['Currency'] != currency:
+                    # Today's rate (no date means the latest rate)
+                    price = float(fx.convert([price], [quote['Currency']], [pd.NaT], currency)[0]) if fx is not None else None
+                if price is not None and not np.isnan(price):
+                    basis = f"{label} {quote['Quote_Date']:%Y-%m-%d}"
+                    break
+                price = None
+        if price is None and not np.isnan(list_prices[key]) and list_prices[key] > 0:
+            price, basis = float(list_prices[key]), "List price"
+        lines.append({
+            'Line': number,
+            'Part Number': part if row is None else _part_label(row, part),
+            'Category': '' if row is None else str(row.get('Category', '')),
+            'Description': "Not in catalogue" if row is None else _describe(row),
+            'Unit Price': None if price is None else round(price, 5),
+            'Basis': basis,
+        })
+
+    document = {
+        'customer': customer.strip(),
+        'currency': currency,
+        'date': quote_date.isoformat(),
+        'valid_until': (quote_date + timedelta(days=VALID_DAYS)).isoformat(),
+        'lines': lines,
+    }
+    document['number'] = f"Q-{quote_date:%Y%m%d}-{document_hash(document)[:6].upper()}"
+    return document
+
+
+def document_hash(document, export_format=""):
+    """Stable hash of a document's content (and the format it is rendered in)"""
+    payload = json.dumps([TEMPLATE_VERSION, export_format, document], sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def _price_text(price, currency):
+    if price is None:
+        return "—"
+    symbol = "$" if currency == "USD" else "¥"
+    return f"{symbol}{price:.5f}"
+
+
+def render_html(document):
+    escape = html.escape
+    rows = "\n".join(
+        f"<tr><td>{line['Line']}</td><td>{escape(line['Part Number'])}</td><td>{escape(line['Category'])}</td>"
+        f"<td>{escape(line['Description'])}</td><td class=\"num\">{_price_text(line['Unit Price'], document['currency'])}</td>"
+        f"<td>{escape(line['Basis'])}</td></tr>"
+        for line in document['lines']
+    )
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Quotation {escape(document['number'])}</title>
+<style>
+body {{ font-family: Arial, sans-serif; margin: 2em; color: #222; }}
+table {{ border-collapse: collapse; width: 100%; }}
+th, td {{ border: 1px solid #ccc; padding: 6px 8px; text-align: left; font-size: 13px; }}
+th {{ background: #f0f2f6; }}
+td.num {{ text-align: right; white-space: nowrap; }}
+</style></head>
+<body>
+<h1>Quotation</h1>
+<p><strong>Quotation No.:</strong> {escape(document['number'])}<br>
+<strong>Customer:</strong> {escape(document['customer'])}<br>
+<strong>Date:</strong> {document['date']}<br>
+<strong>Valid until:</strong> {document['valid_until']}<br>
+<strong>Currency:</strong> {escape(document['currency'])}</p>
+<table>
+<tr><th>#</th><th>Part Number</th><th>Category</th><th>Description</th><th>Unit Price</th><th>Basis</th></tr>
+{rows}
+</table>
+<p>Prices are per unit, exclude taxes and shipping, and are valid until {document['valid_until']}.</p>
+</body></html>
+""".encode("utf-8")
+
+
+def render_pdf(document):
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4, landscape
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+    styles = getSampleStyleSheet()
+    cell = styles['BodyText']
+    escape = html.escape
+    buffer = io.BytesIO()
+    pdf = SimpleDocTemplate(buffer, pagesize=landscape(A4), title=f"Quotation {document['number']}")
+    header = (
+        f"<b>Quotation No.:</b> {escape(document['number'])}<br/>"
+        f"<b>Customer:</b> {escape(document['customer'])}<br/>"
+        f"<b>Date:</b> {document['date']}<br/>"
+        f"<b>Valid until:</b> {document['valid_until']}<br/>"
+        f"<b>Currency:</b> {escape(document['currency'])}"
+    )
+    table_rows = [["#", "Part Number", "Category", "Description", "Unit Price", "Basis"]]
+    for line in document['lines']:
+        table_rows.append([
+            str(line['Line']), Paragraph(escape(line['Part Number']), cell), escape(line['Category']),
+            Paragraph(escape(line['Description']), cell), _price_text(line['Unit Price'], document['currency']),
+            Paragraph(escape(line['Basis']), cell),
+        ])
+    table = Table(table_rows, colWidths=[25, 120, 80, 300, 80, 150], repeatRows=1)
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#f0f2f6')),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ('ALIGN', (4, 1), (4, -1), 'RIGHT'),
+    ]))
+    pdf.build([
+        Paragraph("Quotation", styles['Title']),
+        Paragraph(header, styles['Normal']),
+        Spacer(1, 12),
+        table,
+        Spacer(1, 12),
+        Paragraph(f"Prices are per unit, exclude taxes and shipping, and are valid until {document['valid_until']}.",
+                  styles['Normal']),
+    ])
+    return buffer.getvalue()
+
+
+def render(document, export_format):
+    """Document file contents in export_format; runs in pool workers, so it only uses its arguments"""
+    if export_format == "PDF":
+        return render_pdf(document)
+    return render_html(document)
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Spawned, not forked: the server process has threads and open connections
+            _pool = ProcessPoolExecutor(max_workers=POOL_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def generate(documents, export_format):
+    """Rendered files for documents, from the cache where possible.
+
+    Several uncached documents are rendered in the process pool; one is
+    rendered inline, where starting workers would cost more than it saves.
+    """
+    hashes = [document_hash(document, export_format) for document in documents]
+    results = {}
+    with _documents_lock:
+        for digest in hashes:
+            cached = _documents.get(digest)
+            if cached is not None:
+                results[digest] = cached
+    pending = {digest: document for digest, document in zip(hashes, documents) if digest not in results}
+    if len(pending) > 1:
+        try:
+            rendered = list(_get_pool().map(render, pending.values(), [export_format] * len(pending)))
+        except BrokenProcessPool:
+            _reset_pool()
+            rendered = [render(document, export_format) for document in pending.values()]
+    else:
+        rendered = [render(document, export_format) for document in pending.values()]
+    with _documents_lock:
+        for digest, contents in zip(pending, rendered):
+            _documents.put(digest, contents)
+            results[digest] = contents
+    return [results[digest] for digest in hashes]
+
+
+def file_name(document, export_format):
+    customer = re.sub(r'[^\w-]+', '_', document['customer']).strip('_') or "customer"
+    # The number keeps customers whose names sanitize alike (e.g. "A&B" and "A B") apart
+    return f"Quotation_{customer}_{document['number']}.{QUOTATION_FORMATS[export_format][0]}"
+
+
+def bundle(documents, contents, export_format):
+    """(file name, bytes, mime) for one document, or a zip of several"""
+    if len(documents) == 1:
+        return file_name(documents[0], export_format), contents[0], QUOTATION_FORMATS[export_format][1]
+    buffer = io.BytesIO()
+    names = set()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for document, data in zip(documents, contents):
+            name = file_name(document, export_format)
+            stem, extension = os.path.splitext(name)
+            copy = 1
+            while name in names:
+                copy += 1
+                name = f"{stem}_{copy}{extension}"
+            names.add(name)
+            archive.writestr(name, data)
+    return f"Quotations_{documents[0]['date']}.zip", buffer.getvalue(), "application/zip"
@@ -0,0 +1,85 @@
+"""Similar-part recommendations across all product categories.
+
+Every part becomes one row of a normalized feature matrix (log-scaled,
+standardized specs and prices, one-hot package/type/category), built once
+per catalogue version. A query is a single matrix-vector product against
+that matrix followed by a partial sort, so it stays in the millisecond
+range for catalogues of 100k parts.
+"""
+
+import numpy as np
+import pandas as pd
+
+from qms.facets import product_keys
+from qms.normalize import to_text
+
+# Numeric features; values are log-scaled before standardizing
+NUMERIC_FEATURES = [
+    'VDS (V)', 'ID (A)', 'IF (mA)', 'IFSM (A)', 'VRRM (V)', 'Vf @ If= 1mA',
+    'Parts USD Price', 'Parts RMB Price',
+]
+CATEGORICAL_FEATURES = ['Category', 'Package', 'Type', 'Polarity']
+
+# Relative importance of each feature in the distance
+FEATURE_WEIGHTS = {'Category': 2.0, 'Package': 1.5, 'Parts USD Price': 0.75, 'Parts RMB Price': 0.75}
+
+# A part missing a spec another part has differs by this much on that spec
+MISSING_WEIGHT = 1.0
+
+
+def _numeric(series):
+    if not pd.api.types.is_numeric_dtype(series):
+        series = pd.to_numeric(to_text(series).str.replace(r'[$¥,]', '', regex=True), errors='coerce')
+    return series.to_numpy(dtype=float, na_value=np.nan)
+
+
+class SimilarParts:
+    """k-nearest-neighbour search over a normalized feature matrix of the catalogue"""
+
+    def __init__(self, df):
+        self.row_count = len(df)
+        blocks = []
+        for column in NUMERIC_FEATURES:
+            if column not in df.columns:
+                continue
+            values = _numeric(df[column])
+            present = ~np.isnan(values)
+            if present.sum() < 2:
+                continue
+            scaled = np.log1p(np.clip(values, 0, None))
+            mean, std = scaled[present].mean(), scaled[present].std() or 1.0
+            weight = FEATURE_WEIGHTS.get(column, 1.0)
+            blocks.append(np.where(present, (scaled - mean) / std, 0.0)[:, None] * weight)
+            blocks.append((~present).astype(float)[:, None] * MISSING_WEIGHT)
+        for column in CATEGORICAL_FEATURES:
+            if column not in df.columns:
+                continue
+            codes, uniques = pd.factorize(to_text(df[column]))
+            if len(uniques) < 2:
+                continue
+            one_hot = np.zeros((self.row_count, len(uniques)))
+            one_hot[np.arange(self.row_count), codes] = 1.0
+            # Scale so two different values are FEATURE_WEIGHTS apart
+            blocks.append(one_hot * FEATURE_WEIGHTS.get(column, 1.0) / np.sqrt(2))
+
+        self.features = (np.hstack(blocks) if blocks else np.zeros((self.row_count, 1))).astype(np.float32)
+        self._norms = np.einsum('ij,ij->i', self.features, self.features)
+        keys = product_keys(df).to_numpy()
+        # First row wins when a part number appears more than once
+        self._rows = {key: row for row, key in reversed(list(enumerate(keys))) if key}
+
+    def row_for(self, part_number):
+        """Row position of a part number (case-insensitive), or None"""
+        return self._rows.get(str(part_number).strip().casefold())
+
+    def neighbours(self, row, k=10):
+        """Positions and distances of the k parts closest to row, nearest first, excluding itself"""
+        query = self.features[row]
+        distances = self._norms - 2.0 * (self.features @ query) + self._norms[row]
+        distances[row] = np.inf
+        k = min(k, self.row_count - 1)
+        if k <= 0:
+            return np.array([], dtype=np.int64), np.array([])
+        nearest = np.argpartition(distances, k - 1)[:k]
+        nearest = nearest[np.argsort(distances[nearest], kind='stable')]
+        return nearest, np.sqrt(np.clip(distances[nearest], 0, None))
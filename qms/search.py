@@ -0,0 +1,107 @@
+"""Incremental substring search over catalogue columns"""
+
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+class LRUCache:
+    """Small least-recently-used mapping with a fixed number of entries"""
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        if key not in self._data:
+            return default
+        self._data.move_to_end(key)
+        return self._data[key]
+
+    def put(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def keys(self):
+        return list(self._data.keys())
+
+    def clear(self):
+        self._data.clear()
+
+
+def normalize_query(query):
+    """Normalize a search string the way the search index stores text"""
+    return str(query).strip().casefold()
+
+
+class IncrementalSearch:
+    """Case-insensitive substring search that narrows earlier result sets.
+
+    A row matches when any of the search columns contains the query. If a
+    cached query is a substring of the new one, every match of the new query
+    is also a match of the cached one, so only those rows are rescanned. This
+    makes typing a part number character by character cost roughly the size
+    of the shrinking result set rather than the whole catalogue.
+    """
+
+    def __init__(self, df, columns, cache_size=64):
+        self.columns = [column for column in columns if column in df.columns]
+        self.row_count = len(df)
+        # Lower-cased copies of the search columns, built once per data version
+        self._haystacks = [
+            df[column].fillna('').astype(str).str.casefold().to_numpy(dtype=object)
+            for column in self.columns
+        ]
+        self._cache = LRUCache(cache_size)
+        self.rows_scanned = 0
+
+    def _best_base(self, query):
+        """Cached result set of the longest earlier query contained in this one"""
+        best_query = None
+        for cached_query in self._cache.keys():
+            if cached_query in query and (best_query is None or len(cached_query) > len(best_query)):
+                best_query = cached_query
+        if best_query is None:
+            return None
+        return self._cache.get(best_query)
+
+    def search(self, query):
+        """Return the positions (in original row order) of rows matching query"""
+        query = normalize_query(query)
+        if not query:
+            return np.arange(self.row_count)
+
+        cached = self._cache.get(query)
+        if cached is not None:
+            return cached
+
+        candidates = self._best_base(query)
+        if candidates is None:
+            candidates = np.arange(self.row_count)
+
+        self.rows_scanned += len(candidates)
+        mask = np.zeros(len(candidates), dtype=bool)
+        for haystack in self._haystacks:
+            subset = pd.Series(haystack[candidates], dtype=object)
+            mask |= subset.str.contains(query, regex=False).to_numpy(dtype=bool)
+        positions = candidates[mask]
+
+        self._cache.put(query, positions)
+        return positions
+
+
+def page_bounds(total_rows, page_number, page_size):
+    """Start and end row of a 1-based page, clamped to the result size"""
+    page_count = max(1, -(-total_rows // page_size))
+    page_number = min(max(1, int(page_number)), page_count)
+    start = (page_number - 1) * page_size
+    return start, min(start + page_size, total_rows), page_count
@@ -0,0 +1,213 @@
+"""Google Sheets access shared by the app and the background tools"""
+
+import pandas as pd
+
+from qms.normalize import QUOTE_SLOTS, customer_column, normalize_catalogue, normalize_wide_quotes, to_text
+
+# Product category tabs and quote tabs in the spreadsheet
+PRODUCT_CATEGORIES = ["ESD", "CMF", "Transistor", "MOS", "SKY", "Zener", "PowerSwitch", "TVS", "Misc", "SDOthers"]
+QUOTE_SHEETS = ["QuoteUSD", "QuoteRMB"]
+ALL_WORKSHEETS = PRODUCT_CATEGORIES + QUOTE_SHEETS
+
+# Header row of the QuoteUSD/QuoteRMB tabs
+QUOTE_SHEET_HEADERS = [
+    'Products', 'Product Name', 'Distributor-1',
+    'DC-1', 'End Customer 1', 'Quote Date 1',
+    'Distributor-2', 'DC-2', 'End Customer 2', 'Quote Date 2',
+    'Distributor-3', 'DC-3', 'End Customers 3', 'Quote Date 3',
+    'Distributor-4', 'DC-4', 'End Customers 4', 'Quote Date 4',
+    'Distributor-5', 'DC-5', 'End Customers 5', 'Quote Date 5',
+    'Distributor-6', 'DC-6', 'End Customers 6', 'Quote Date 6',
+    'Distributor-7', 'DC-7', 'End Customers 7', 'Quote Date 7',
+    'Distributor-8', 'DC-8', 'End Customers 8', 'Quote Date 8',
+]
+
+SCOPES = [
+    "https://spreadsheets.google.com/feeds",
+    "https://www.googleapis.com/auth/drive"
+]
+
+
+def open_spreadsheet(creds_info):
+    """Open the spreadsheet described by the [connections.gsheets] secrets block"""
+    import gspread
+    from google.oauth2.service_account import Credentials
+
+    credentials = Credentials.from_service_account_info(creds_info, scopes=SCOPES)
+    gc = gspread.authorize(credentials)
+    return gc.open_by_url(creds_info["spreadsheet"])
+
+
+def load_secrets(path=".streamlit/secrets.toml"):
+    """Read Streamlit's secrets file for tools running outside `streamlit run`"""
+    import toml
+
+    return toml.load(path)
+
+
+def worksheet_frame(worksheet_name, records):
+    """Typed DataFrame for a worksheet from gspread's get_all_records() output"""
+    if not records:
+        return pd.DataFrame()
+    df = pd.DataFrame(records)
+    if worksheet_name in QUOTE_SHEETS:
+        return normalize_wide_quotes(df)
+    return normalize_catalogue(df)
+
+
+def fetch_worksheet_frame(spreadsheet, worksheet_name):
+    """Fetch and normalize one worksheet"""
+    worksheet = spreadsheet.worksheet(worksheet_name)
+    return worksheet_frame(worksheet_name, worksheet.get_all_records())
+
+
+def format_quote_price(currency, price):
+    """Price as written to a DC cell: currency symbol and exactly 4 decimal places"""
+    symbol = "$" if currency == "USD" else "¥"
+    return f"{symbol}{round(float(price), 4):.4f}"
+
+
+def add_quote(spreadsheet, currency, product_category, product_name, price, customer, distributor, quote_date):
+    """Add a new quote to the appropriate tab (QuoteUSD or QuoteRMB); returns (success, message)"""
+    try:
+        worksheet = spreadsheet.worksheet(f"Quote{currency}")
+        formatted_price = format_quote_price(currency, price)
+
+        # Get all existing data to find the right row or create new one
+        existing_data = worksheet.get_all_records()
+        existing_df = pd.DataFrame(existing_data) if existing_data else pd.DataFrame()
+
+        # Look for existing row with same product category and product name (exact, case-insensitive, as add_quotes)
+        matching_row = None
+        row_index = None
+
+        if not existing_df.empty:
+            mask = (
+                (to_text(existing_df['Products']).str.casefold() == str(product_category).strip().casefold()) &
+                (to_text(existing_df['Product Name']).str.casefold() == str(product_name).strip().casefold())
+            )
+            matching_rows = existing_df[mask]
+
+            if not matching_rows.empty:
+                matching_row = matching_rows.iloc[0]
+                row_index = matching_rows.index[0]
+
+        if matching_row is not None:
+            # Update existing row - find next available DC column
+            columns = list(existing_df.columns)
+            for i in QUOTE_SLOTS:
+                dc_col = f'DC-{i}'
+                if pd.isna(matching_row.get(dc_col)) or matching_row.get(dc_col) == '':
+                    # Found empty slot, update this column and corresponding date/customer/distributor
+                    # (+1 for gspread indexing; row_index + 2 because row 1 is headers)
+                    sheet_row = row_index + 2
+                    worksheet.update_cell(sheet_row, columns.index(dc_col) + 1, formatted_price)
+                    worksheet.update_cell(sheet_row, columns.index(f'Quote Date {i}') + 1, quote_date)
+                    worksheet.update_cell(sheet_row, columns.index(customer_column(columns, i)) + 1, customer)
+                    worksheet.update_cell(sheet_row, columns.index(f'Distributor-{i}') + 1, distributor)
+
+                    return True, f"Quote added to existing product record in {dc_col}"
+
+            return False, "All DC columns are filled for this product. Cannot add more quotes."
+
+        # Create new row with the quote in DC-1
+        worksheet.append_row(_new_quote_row(QUOTE_SHEET_HEADERS, product_category, product_name,
+                                            formatted_price, customer, distributor, quote_date))
+        return True, "New product quote record created"
+
+    except Exception as e:
+        return False, f"Error adding quote: {str(e)}"
+
+
+def _fill_slot(cells, header, slot, formatted_price, customer, distributor, quote_date):
+    """Write one quote into a DC slot of a row's cell values"""
+    for column, value in ((f'DC-{slot}', formatted_price), (f'Quote Date {slot}', quote_date),
+                          (customer_column(header, slot), customer), (f'Distributor-{slot}', distributor)):
+        if column in header:
+            cells[header.index(column)] = value
+
+
+def _new_quote_row(header, product_category, product_name, formatted_price, customer, distributor, quote_date):
+    cells = [''] * len(header)
+    for column, value in (('Products', product_category), ('Product Name', product_name)):
+        if column in header:
+            cells[header.index(column)] = value
+    _fill_slot(cells, header, 1, formatted_price, customer, distributor, quote_date)
+    return cells
+
+
+def add_quotes(spreadsheet, currency, quotes):
+    """Add many quotes to one quote tab with one read and at most two write requests.
+
+    quotes are dicts with the arguments of add_quote(). Products are matched
+    on exact category and part number (case-insensitive); each quote fills
+    the product row's next empty DC slot, and quotes for products without a
+    row share new rows appended in one request. Returns (success, message)
+    per quote, in order.
+    """
+    from gspread.utils import rowcol_to_a1
+
+    worksheet = spreadsheet.worksheet(f"Quote{currency}")
+    values = worksheet.get_all_values()
+    header = list(values[0]) if values else list(QUOTE_SHEET_HEADERS)
+
+    def cell(cells, column):
+        position = header.index(column) if column in header else len(cells)
+        return str(cells[position]).strip() if position < len(cells) else ''
+
+    # Sheet row number and filled slots of each existing product row
+    rows = {}
+    filled = {}
+    for number, cells in enumerate(values[1:], 2):
+        key = (cell(cells, 'Products').casefold(), cell(cells, 'Product Name').casefold())
+        if key not in rows:
+            rows[key] = number
+            filled[number] = {slot for slot in QUOTE_SLOTS if cell(cells, f'DC-{slot}')}
+
+    updates = []
+    new_rows = {}
+    results = []
+    for quote in quotes:
+        try:
+            formatted_price = format_quote_price(currency, quote['price'])
+        except (TypeError, ValueError) as e:
+            results.append((False, f"Error adding quote: {str(e)}"))
+            continue
+        key = (str(quote['product_category']).strip().casefold(), str(quote['product_name']).strip().casefold())
+        fields = (formatted_price, quote['customer'], quote['distributor'], quote['quote_date'])
+        if key in new_rows:
+            cells, used = new_rows[key]
+            slot = next((slot for slot in QUOTE_SLOTS if slot not in used), None)
+            if slot is not None:
+                _fill_slot(cells, header, slot, *fields)
+                used.add(slot)
+        elif key in rows:
+            used = filled[rows[key]]
+            slot = next((slot for slot in QUOTE_SLOTS if slot not in used), None)
+            if slot is not None:
+                used.add(slot)
+                single = [''] * len(header)
+                _fill_slot(single, header, slot, *fields)
+                for position, value in enumerate(single):
+                    if value != '':
+                        updates.append({'range': rowcol_to_a1(rows[key], position + 1), 'values': [[value]]})
+        else:
+            slot = 1
+            new_rows[key] = (_new_quote_row(header, quote['product_category'], quote['product_name'], *fields), {1})
+        if slot is None:
+            results.append((False, "All DC columns are filled for this product. Cannot add more quotes."))
+        elif slot == 1 and key not in rows:
+            results.append((True, "New product quote record created"))
+        else:
+            results.append((True, f"Quote added to existing product record in DC-{slot}"))
+
+    try:
+        # Cells are entered the way update_cell() enters them, rows the way append_row() does
+        if updates:
+            worksheet.batch_update(updates, value_input_option='USER_ENTERED')
+        if new_rows:
+            worksheet.append_rows([cells for cells, _ in new_rows.values()])
+    except Exception as e:
+        return [(False, f"Error adding quote: {str(e)}") if success else (success, message)
+                for success, message in results]
+    return results
@@ -0,0 +1,252 @@
+"""Versioned Arrow IPC snapshots of the catalogue, shared by every app worker.
+
+One loader process fetches all worksheets, normalizes them and writes each
+table to an uncompressed Arrow IPC file under a new version directory, then
+atomically replaces manifest.json. Workers memory-map the files, so the
+tables live once in the page cache no matter how many processes or sessions
+read them, and switch to a new version by swapping a single reference.
+
+Run the loader with:
+    python -m qms.snapshot --directory /srv/qms/snapshot --interval 300
+
+Each manifest records a digest of every table. sync_snapshot() (`python -m
+qms sync`) publishes a new version only when a digest changed, and skips
+fetching altogether while Drive reports the spreadsheet unmodified.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from qms.normalize import normalize_quotes
+from qms.sheets import ALL_WORKSHEETS, fetch_worksheet_frame, load_secrets, open_spreadsheet
+
+MANIFEST = "manifest.json"
+
+# Name of the normalized one-row-per-quote table in a snapshot
+QUOTES_TABLE = "Quotes"
+
+# Strings map to pandas' Arrow-backed string dtype without copying
+_PANDAS_TYPES = {
+    pa.large_string(): pd.StringDtype("pyarrow", na_value=np.nan),
+    pa.string(): pd.StringDtype("pyarrow", na_value=np.nan),
+}
+
+
+def frame_to_table(df):
+    """Arrow table for a DataFrame, with large_string text so pandas can wrap it zero-copy"""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    fields = [
+        pa.field(field.name, pa.large_string()) if pa.types.is_string(field.type) else field
+        for field in table.schema
+    ]
+    return table.cast(pa.schema(fields, metadata=table.schema.metadata))
+
+
+def read_manifest(directory):
+    """Current manifest, or None when no snapshot has been written yet"""
+    try:
+        with open(os.path.join(directory, MANIFEST)) as handle:
+            return json.load(handle)
+    except FileNotFoundError:
+        return None
+
+
+def write_snapshot(directory, tables, metadata=None, keep=3):
+    """Write tables as a new snapshot version and publish it; returns the version number"""
+    os.makedirs(directory, exist_ok=True)
+    previous = read_manifest(directory)
+    version = (previous["version"] if previous else 0) + 1
+    version_dir = f"v{version:06d}"
+    target = os.path.join(directory, version_dir)
+    os.makedirs(target, exist_ok=True)
+
+    entries = {}
+    for name, df in tables.items():
+        filename = f"{name}.arrow"
+        table = frame_to_table(df)
+        with pa.OSFile(os.path.join(target, filename), "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        entries[name] = {"file": filename, "rows": table.num_rows}
+
+    manifest = {
+        "version": version,
+        "directory": version_dir,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "tables": entries,
+        "metadata": metadata or {},
+    }
+    temporary = os.path.join(directory, MANIFEST + ".tmp")
+    with open(temporary, "w") as handle:
+        json.dump(manifest, handle, indent=2)
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.replace(temporary, os.path.join(directory, MANIFEST))
+
+    # Readers that still map an older version keep their open mappings
+    versions = sorted(name for name in os.listdir(directory) if name.startswith("v") and name[1:].isdigit())
+    for old in versions[:-keep]:
+        shutil.rmtree(os.path.join(directory, old), ignore_errors=True)
+    return version
+
+
+class Snapshot:
+    """One immutable snapshot version: memory-mapped Arrow tables and their DataFrame views"""
+
+    def __init__(self, directory, manifest):
+        self.version = manifest["version"]
+        self.created = manifest.get("created")
+        self.metadata = manifest.get("metadata", {})
+        self.arrow = {}
+        self.tables = {}
+        base = os.path.join(directory, manifest["directory"])
+        for name, entry in manifest["tables"].items():
+            source = pa.memory_map(os.path.join(base, entry["file"]), "r")
+            table = pa.ipc.open_file(source).read_all()
+            self.arrow[name] = table
+            self.tables[name] = table.to_pandas(types_mapper=_PANDAS_TYPES.get, split_blocks=True)
+
+
+class SnapshotReader:
+    """Follows a snapshot directory and maps the newest published version"""
+
+    def __init__(self, directory, check_interval=1.0):
+        self.directory = directory
+        self.check_interval = check_interval
+        self._snapshot = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def current(self):
+        """Newest snapshot, checking the manifest at most once per check_interval"""
+        now = time.monotonic()
+        if now - self._checked >= self.check_interval:
+            with self._lock:
+                if now - self._checked >= self.check_interval:
+                    self._checked = now
+                    self._refresh()
+        return self._snapshot
+
+    def _refresh(self):
+        manifest = read_manifest(self.directory)
+        if manifest is None:
+            return
+        if self._snapshot is None or manifest["version"] != self._snapshot.version:
+            # Map the new version completely before swapping the reference
+            self._snapshot = Snapshot(self.directory, manifest)
+
+
+_readers = {}
+_readers_lock = threading.Lock()
+
+
+def get_reader(directory):
+    """Process-wide reader for a snapshot directory"""
+    directory = os.path.abspath(directory)
+    with _readers_lock:
+        if directory not in _readers:
+            _readers[directory] = SnapshotReader(directory)
+        return _readers[directory]
+
+
+def build_snapshot_tables(spreadsheet):
+    """Fetch and normalize every worksheet plus the flattened quote table"""
+    tables = {name: fetch_worksheet_frame(spreadsheet, name) for name in ALL_WORKSHEETS}
+    tables[QUOTES_TABLE] = pd.concat(
+        [normalize_quotes(tables["QuoteUSD"], "USD"), normalize_quotes(tables["QuoteRMB"], "RMB")],
+        ignore_index=True,
+    )
+    return tables
+
+
+def table_digest(df):
+    """Content hash of a freshly fetched table (column names, order and values)"""
+    digest = hashlib.sha1("\x1f".join(map(str, df.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def spreadsheet_modified(spreadsheet):
+    """Drive's last modified time of the spreadsheet, or None when it cannot be read"""
+    get_modified = getattr(spreadsheet, "get_lastUpdateTime", None)
+    if get_modified is None:
+        return None
+    try:
+        return get_modified()
+    except Exception:
+        return None
+
+
+def _metadata(tables, modified=None):
+    return {
+        "rows": {name: len(df) for name, df in tables.items()},
+        "digests": {name: table_digest(df) for name, df in tables.items() if name != QUOTES_TABLE},
+        "modified": modified,
+    }
+
+
+def refresh_snapshot(directory, spreadsheet):
+    """Build and publish one snapshot version from the live spreadsheet"""
+    modified = spreadsheet_modified(spreadsheet)
+    tables = build_snapshot_tables(spreadsheet)
+    return write_snapshot(directory, tables, metadata=_metadata(tables, modified))
+
+
+def sync_snapshot(directory, spreadsheet, force=False):
+    """Publish a new snapshot version only if the spreadsheet changed since the current one.
+
+    Returns (version, changed worksheet names); changed is empty and the
+    version the current one when nothing was published.
+    """
+    manifest = read_manifest(directory)
+    previous = manifest["metadata"] if manifest else {}
+    modified = spreadsheet_modified(spreadsheet)
+    if not force and manifest and modified is not None and previous.get("modified") == modified:
+        return manifest["version"], []
+
+    tables = build_snapshot_tables(spreadsheet)
+    metadata = _metadata(tables, modified)
+    digests = previous.get("digests", {})
+    changed = [name for name in ALL_WORKSHEETS if digests.get(name) != metadata["digests"][name]]
+    if manifest and not changed and not force:
+        return manifest["version"], []
+    metadata["changed"] = changed
+    return write_snapshot(directory, tables, metadata=metadata), changed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Publish Arrow snapshots of the quotation spreadsheet")
+    parser.add_argument("--directory", required=True, help="snapshot directory shared with the app workers")
+    parser.add_argument("--secrets", default=".streamlit/secrets.toml", help="Streamlit secrets file with [connections.gsheets]")
+    parser.add_argument("--interval", type=float, default=0, help="seconds between refreshes; 0 runs once")
+    args = parser.parse_args(argv)
+
+    creds_info = load_secrets(args.secrets)["connections"]["gsheets"]
+    while True:
+        started = time.monotonic()
+        try:
+            version = refresh_snapshot(args.directory, open_spreadsheet(creds_info))
+            print(f"Published snapshot version {version} in {time.monotonic() - started:.1f}s")
+        except Exception as e:
+            # Workers keep serving the last published version
+            print(f"Snapshot refresh failed: {str(e)}", file=sys.stderr)
+            if not args.interval:
+                return 1
+        if not args.interval:
+            return 0
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,42 @@
+"""Parametric search over the technical spec columns of a category"""
+
+from qms.indexes import BitmapIndex, NumericIndex, bitmap_positions, full_bitmap, positions_bitmap
+
+# Spec columns that can be filtered, per category: "range" or "equal"
+SPEC_FILTERS = {
+    "MOS": {"VDS (V)": "range", "ID (A)": "range", "Type": "equal"},
+    "SKY": {"IF (mA)": "range", "IFSM (A)": "range", "VRRM (V)": "range", "Vf @ If= 1mA": "range"},
+    "Transistor": {"Polarity": "equal", "Package": "equal"},
+}
+
+
+class SpecSearch:
+    """Range and equality filters on spec columns, answered from prebuilt indexes"""
+
+    def __init__(self, df, filters):
+        self.row_count = len(df)
+        self.ranges = {}
+        self.equals = {}
+        for column, kind in filters.items():
+            if column not in df.columns:
+                continue
+            if kind == "range":
+                index = NumericIndex(df[column])
+                if index.bounds is not None:
+                    self.ranges[column] = index
+            else:
+                self.equals[column] = BitmapIndex(df[column])
+
+    def filter(self, ranges=None, equals=None, within=None):
+        """Positions of rows passing every filter.
+
+        ranges maps a column to (low, high), equals maps a column to the
+        accepted values, and within optionally restricts the result to
+        earlier matches (e.g. from the part number search).
+        """
+        result = full_bitmap(self.row_count) if within is None else positions_bitmap(within, self.row_count)
+        for column, (low, high) in (ranges or {}).items():
+            result &= self.ranges[column].range(low, high)
+        for column, values in (equals or {}).items():
+            result &= self.equals[column].match(values)
+        return bitmap_positions(result, self.row_count)
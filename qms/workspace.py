@@ -0,0 +1,156 @@
+"""The app's data without the app: worksheets, quote tables and reports for scripts and jobs.
+
+A Workspace reads worksheets from the published Arrow snapshot when one is
+configured, otherwise from the live spreadsheet, and derives the same
+tables a session builds (canonical quote table, reporting-currency quotes,
+margin and anomaly reports) with the same engines, so a cron job and the
+dashboard report the same numbers. With an archive directory, history()
+also includes the quotes archived out of the sheet. Nothing here imports
+Streamlit. Each table is built once per workspace; make a new workspace to
+see new data.
+"""
+
+import pandas as pd
+
+from qms import fx, names
+from qms.anomaly import scan as scan_quote_anomalies
+from qms.archive import QuoteArchive, union_quotes
+from qms.catalogue import UnionView
+from qms.export import QUOTE_EXPORT_COLUMNS
+from qms.margins import margin_table
+from qms.normalize import normalize_quotes
+from qms.sheets import PRODUCT_CATEGORIES, fetch_worksheet_frame
+from qms.snapshot import QUOTES_TABLE, Snapshot, read_manifest
+
+
+def normalized_quotes(quote_usd, quote_rmb, aliases, flattened=None):
+    """Both quote tabs as one typed row per quote with canonical names, plus the canonicalizers used.
+
+    flattened is the already normalized table (a snapshot's Quotes table), when there is one.
+    """
+    if flattened is None:
+        flattened = pd.concat([normalize_quotes(quote_usd, "USD"), normalize_quotes(quote_rmb, "RMB")],
+                              ignore_index=True)
+    return names.canonicalize_quotes(flattened, aliases)
+
+
+class Workspace:
+    """Worksheets and derived tables from a snapshot directory or a spreadsheet"""
+
+    def __init__(self, spreadsheet=None, snapshot_directory=None, aliases_path=names.DEFAULT_ALIASES_PATH,
+                 rates_path=fx.DEFAULT_RATES_PATH, current=None, archive_directory=None):
+        """current: an already mapped Snapshot to read instead of the directory's newest version"""
+        if spreadsheet is None and snapshot_directory is None and current is None:
+            raise ValueError("A workspace needs a spreadsheet or a snapshot")
+        self.spreadsheet = spreadsheet
+        self.snapshot_directory = snapshot_directory
+        self.aliases_path = aliases_path
+        self.rates_path = rates_path
+        self.archive = QuoteArchive(archive_directory) if archive_directory else None
+        self._snapshot = current
+        self._frames = {}
+        self._derived = {}
+
+    def snapshot(self):
+        """The snapshot version current when first asked for, or None"""
+        if self._snapshot is None and self.snapshot_directory:
+            manifest = read_manifest(self.snapshot_directory)
+            if manifest is not None:
+                self._snapshot = Snapshot(self.snapshot_directory, manifest)
+        return self._snapshot
+
+    def worksheet(self, worksheet_name):
+        """One worksheet's DataFrame, from the snapshot when it has the tab"""
+        if worksheet_name not in self._frames:
+            current = self.snapshot()
+            if current is not None and worksheet_name in current.tables:
+                self._frames[worksheet_name] = current.tables[worksheet_name]
+            elif self.spreadsheet is not None:
+                self._frames[worksheet_name] = fetch_worksheet_frame(self.spreadsheet, worksheet_name)
+            else:
+                raise LookupError(f"No snapshot of {worksheet_name} in {self.snapshot_directory}")
+        return self._frames[worksheet_name]
+
+    def _cached(self, key, build):
+        if key not in self._derived:
+            self._derived[key] = build()
+        return self._derived[key]
+
+    def catalogue(self):
+        """Every product category stacked with a shared schema"""
+        def build():
+            view = UnionView(PRODUCT_CATEGORIES)
+            for category in PRODUCT_CATEGORIES:
+                view.update(category, self.worksheet(category), 1)
+            return view.frame()
+        return self._cached('catalogue', build)
+
+    def rates(self):
+        """Dated FX rates, or None when the rate table is missing or unreadable"""
+        def build():
+            try:
+                return fx.get_rates(self.rates_path)
+            except (OSError, ValueError, KeyError):
+                return None
+        return self._cached('rates', build)
+
+    def aliases(self):
+        try:
+            return names.load_aliases(self.aliases_path)
+        except (OSError, ValueError):
+            return {kind: {} for kind in names.NAME_KINDS}
+
+    def flattened_quotes(self):
+        """The quote tabs as one typed row per quote, names as written"""
+        def build():
+            current = self.snapshot()
+            if current is not None and QUOTES_TABLE in current.tables:
+                return current.tables[QUOTES_TABLE]
+            return pd.concat([normalize_quotes(self.worksheet("QuoteUSD"), "USD"),
+                              normalize_quotes(self.worksheet("QuoteRMB"), "RMB")], ignore_index=True)
+        return self._cached('flattened_quotes', build)
+
+    def quotes(self):
+        """Normalized quotes in the sheet with canonical customer and distributor names"""
+        def build():
+            quotes, _ = normalized_quotes(None, None, self.aliases(), self.flattened_quotes())
+            return quotes
+        return self._cached('quotes', build)
+
+    def history(self, since=None, until=None):
+        """Quotes in the sheet and in the archive dated in [since, until), with canonical names.
+
+        Only the archive years overlapping the range are read.
+        """
+        def build():
+            if self.archive is None and since is None and until is None:
+                return self.quotes()
+            flattened = union_quotes(self.flattened_quotes(), self.archive, since, until)
+            quotes, _ = normalized_quotes(None, None, self.aliases(), flattened)
+            return quotes
+        return self._cached(('history', since, until), build)
+
+    def quote_history(self, since=None, until=None):
+        """The quote history columns Price Lookup exports, archived quotes included"""
+        return self._cached(('quote_history', since, until),
+                            lambda: self.history(since, until)[QUOTE_EXPORT_COLUMNS])
+
+    def reporting_quotes(self, currency):
+        """Quotes converted to currency as of each quote date (None without FX rates)"""
+        def build():
+            rates = self.rates()
+            return None if rates is None else fx.convert_quotes(self.quotes(), rates, currency)
+        return self._cached(('reporting_quotes', currency), build)
+
+    def margins(self, currency):
+        """Margin table of every catalogue part in currency (None without FX rates)"""
+        def build():
+            rates = self.rates()
+            if rates is None:
+                return None
+            return margin_table(self.catalogue(), self.reporting_quotes(currency), rates, currency)
+        return self._cached(('margins', currency), build)
+
+    def anomalies(self):
+        """Outlier quotes across the whole history, archived quotes included"""
+        return self._cached('anomalies', lambda: scan_quote_anomalies(self.history()))
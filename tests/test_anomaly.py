@@ -0,0 +1,65 @@
+import pandas as pd
+
+from qms.anomaly import QuoteAnomalies, scan
+
+
+def _quotes(rows):
+    quotes = pd.DataFrame(rows, columns=['Product_Name', 'Currency', 'Price', 'Customer', 'Raw_Date'])
+    quotes['Product_Category'] = "MOS"
+    quotes['Distributor'] = ""
+    quotes['Quote_Date'] = pd.to_datetime(quotes['Raw_Date'])
+    quotes['Raw_Price'] = quotes['Price'].astype(str)
+    return quotes
+
+
+ROWS = [
+    ("ABC1", "USD", 0.175, "Acme", "2025-01-01"),
+    ("ABC1", "USD", 0.180, "Beta", "2025-02-01"),
+    ("ABC1", "USD", 0.170, "Gamma", "2025-03-01"),
+    ("ABC1", "USD", 0.176, "Delta", "2025-04-01"),
+]
+
+
+def test_slipped_decimal_is_flagged_and_normal_price_is_not():
+    anomalies = QuoteAnomalies()
+    anomalies.update(_quotes(ROWS))
+
+    assert anomalies.check("abc1", "USD", 0.178) == []
+    [reason] = anomalies.check("ABC1", "USD", 1.75)
+    assert "the median USD quote" in reason
+
+
+def test_jump_from_the_customers_last_quote_is_flagged():
+    anomalies = QuoteAnomalies()
+    anomalies.update(_quotes(ROWS[:2]))
+
+    # Too little history for a product outlier, but 4x this customer's last price
+    assert anomalies.check("ABC1", "USD", 0.70, customer=" acme ") == ["4.0x this customer's last USD quote (0.17500)"]
+    assert anomalies.check("ABC1", "USD", 0.70) == []
+
+
+def test_zero_and_missing_prices_are_never_flagged():
+    anomalies = QuoteAnomalies()
+    anomalies.update(_quotes(ROWS + [("ABC1", "USD", 0.0, "Acme", "2025-05-01")]))
+
+    assert anomalies.check("ABC1", "USD", 0.0, customer="Acme") == []
+    assert anomalies.check("ABC1", "USD", None) == []
+    assert anomalies.check("ABC1", "USD", 0.178, customer="Acme") == []
+
+
+def test_update_rebuilds_only_changed_products():
+    anomalies = QuoteAnomalies()
+    assert anomalies.update(_quotes(ROWS + [("XYZ9", "RMB", 3.0, "Acme", "2025-01-01")])) == 2
+
+    assert anomalies.update(_quotes(ROWS + [("XYZ9", "RMB", 9.5, "Acme", "2025-02-01"),
+                                            ("XYZ9", "RMB", 3.0, "Acme", "2025-01-01")])) == 1
+    assert anomalies.check("XYZ9", "RMB", 30.0, customer="Acme")
+
+
+def test_scan_reports_historical_outliers_and_jumps():
+    report = scan(_quotes(ROWS + [("ABC1", "USD", 1.75, "Acme", "2025-05-01")]))
+
+    assert len(report) == 1
+    assert report.iloc[0]['Price'] == 1.75
+    assert report.iloc[0]['Reason'] == "Product outlier; jump from customer's previous quote"
+    assert scan(_quotes([])).empty
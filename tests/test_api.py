@@ -0,0 +1,59 @@
+import json
+
+import pytest
+
+from benchmarks import synthetic
+from qms import api, sheets, snapshot
+
+
+@pytest.fixture
+def published(tmp_path):
+    spreadsheet = synthetic.build_spreadsheet(20, 40)
+    snapshot.refresh_snapshot(str(tmp_path), spreadsheet)
+    return spreadsheet, str(tmp_path), snapshot.SnapshotReader(str(tmp_path), check_interval=0)
+
+
+def _quoted_part(spreadsheet):
+    record = spreadsheet.worksheet("QuoteUSD").get_all_records()[0]
+    return record['Products'], record['Product Name']
+
+
+def test_new_snapshot_leaves_the_previous_history_unchanged(published):
+    spreadsheet, directory, reader = published
+    quote_api = api.QuoteApi(reader)
+    category, part = _quoted_part(spreadsheet)
+    quote_api.respond("/api/status")
+    previous = quote_api._data
+    before = len(previous.history.series(part))
+
+    sheets.add_quote(spreadsheet, "USD", category, part, 1.0, "Acme", "N/A", "1/2/2025")
+    snapshot.refresh_snapshot(directory, spreadsheet)
+    quote_api.respond("/api/status")
+
+    assert quote_api._data is not previous
+    assert len(previous.history.series(part)) == before
+    assert len(quote_api._data.history.series(part)) == before + 1
+
+
+def test_if_none_match_star_does_not_hide_a_missing_part(published):
+    spreadsheet, _, reader = published
+    quote_api = api.QuoteApi(reader)
+    _, part = _quoted_part(spreadsheet)
+
+    status, _, body = quote_api.respond("/api/parts/NO-SUCH-PART", if_none_match="*")
+    assert status == 404
+    assert "error" in json.loads(body)
+    assert quote_api.respond(f"/api/parts/{part}/history", if_none_match="*")[0] == 304
+
+
+def test_unexpected_errors_are_json_500s(published, monkeypatch):
+    _, _, reader = published
+    quote_api = api.QuoteApi(reader)
+
+    def fail(*args):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(quote_api, "_route", fail)
+    status, etag, body = quote_api.respond("/api/status")
+    assert (status, etag) == (500, None)
+    assert json.loads(body) == {'error': "Internal server error"}
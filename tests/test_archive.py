@@ -0,0 +1,120 @@
+import pandas as pd
+import pytest
+
+from benchmarks import synthetic
+from qms import archive
+from qms.workspace import Workspace
+
+CUTOFF = pd.Timestamp("2025-10-19")
+KEY = ['Currency', 'Product_Category', 'Product_Name', 'Raw_Price', 'Customer', 'Distributor', 'Raw_Date']
+
+
+@pytest.fixture
+def spreadsheet():
+    return synthetic.build_spreadsheet(10, 40)
+
+
+def _history(spreadsheet, directory=None):
+    quotes = Workspace(spreadsheet=spreadsheet).flattened_quotes()
+    if directory is not None:
+        quotes = archive.union_quotes(quotes, archive.QuoteArchive(directory))
+    return sorted(quotes[KEY].astype(str).itertuples(index=False, name=None))
+
+
+def _sheet_quotes(spreadsheet):
+    return Workspace(spreadsheet=spreadsheet).flattened_quotes()
+
+
+def _after_write(monkeypatch, change):
+    """Run change(spreadsheet) between the archive write and the clearing of the sheet"""
+    write = archive.QuoteArchive.write
+
+    def write_then_change(self, quotes):
+        result = write(self, quotes)
+        change()
+        return result
+
+    monkeypatch.setattr(archive.QuoteArchive, "write", write_then_change)
+
+
+def test_archiving_moves_old_quotes_without_losing_any(spreadsheet, tmp_path):
+    before = _history(spreadsheet)
+
+    summary = archive.archive_quotes(spreadsheet, archive.QuoteArchive(str(tmp_path)), CUTOFF)
+
+    assert sum(summary["moved"].values()) > 0
+    assert (_sheet_quotes(spreadsheet)['Quote_Date'] >= CUTOFF).all()
+    assert _history(spreadsheet, str(tmp_path)) == before
+
+
+def test_row_inserted_while_archiving_only_clears_archived_quotes(spreadsheet, tmp_path, monkeypatch):
+    worksheet = spreadsheet.worksheet("QuoteUSD")
+    header = worksheet.get_all_values()[0]
+    new_row = [''] * len(header)
+    for column, value in (('Products', "MOS"), ('Product Name', "NEW-PART"), ('DC-1', "$1.0000"),
+                          ('End Customer 1', "Acme"), ('Quote Date 1', "1/2/2020"), ('Distributor-1', "Arrow")):
+        new_row[header.index(column)] = value
+    before = _history(spreadsheet)
+    # An old quote added above every other row after the tab was read: it is not archived, so it must stay
+    _after_write(monkeypatch, lambda: worksheet._rows.insert(1, new_row))
+
+    archive.archive_quotes(spreadsheet, archive.QuoteArchive(str(tmp_path)), CUTOFF)
+
+    remaining = _sheet_quotes(spreadsheet)
+    assert remaining['Product_Name'].eq("NEW-PART").sum() == 1
+    assert (remaining['Quote_Date'][remaining['Product_Name'] != "NEW-PART"] >= CUTOFF).all()
+    expected = sorted(before + [("USD", "MOS", "NEW-PART", "$1.0000", "Acme", "Arrow", "1/2/2020")])
+    assert _history(spreadsheet, str(tmp_path)) == expected
+
+
+def test_quote_edited_while_archiving_stays_in_the_sheet_only(spreadsheet, tmp_path, monkeypatch):
+    quotes = _sheet_quotes(spreadsheet)
+    edited = quotes[(quotes['Currency'] == "USD") & (quotes['Quote_Date'] < CUTOFF)].iloc[0]
+    worksheet = spreadsheet.worksheet("QuoteUSD")
+    column = worksheet.get_all_values()[0].index(f"DC-{edited['Slot']}") + 1
+    _after_write(monkeypatch, lambda: worksheet.update_cell(int(edited['Source_Row']) + 2, column, "$9.9999"))
+
+    summary = archive.archive_quotes(spreadsheet, archive.QuoteArchive(str(tmp_path)), CUTOFF)
+
+    assert summary["changed"]["USD"] == 1
+    assert (_sheet_quotes(spreadsheet)['Raw_Price'] == "$9.9999").sum() == 1
+    archived = archive.QuoteArchive(str(tmp_path)).read()
+    assert not ((archived['Product_Name'] == edited['Product_Name']) & (archived['Currency'] == "USD")
+                & (archived['Raw_Price'] == edited['Raw_Price']) & (archived['Raw_Date'] == edited['Raw_Date'])
+                & (archived['Customer'] == edited['Customer'])).any()
+
+
+def test_identical_quotes_in_different_rows_are_all_archived(spreadsheet, tmp_path):
+    worksheet = spreadsheet.worksheet("QuoteUSD")
+    header = worksheet.get_all_values()[0]
+    row = [''] * len(header)
+    for column, value in (('Products', "MOS"), ('Product Name', "TWIN"), ('DC-1', "$0.5000"),
+                          ('End Customer 1', "Acme"), ('Quote Date 1', "1/2/2020"), ('Distributor-1', "Arrow")):
+        row[header.index(column)] = value
+    worksheet.append_rows([row, list(row)])
+
+    archive.archive_quotes(spreadsheet, archive.QuoteArchive(str(tmp_path)), CUTOFF)
+
+    assert archive.QuoteArchive(str(tmp_path)).read()['Product_Name'].eq("TWIN").sum() == 2
+    assert not _sheet_quotes(spreadsheet)['Product_Name'].eq("TWIN").any()
+
+
+def test_interrupted_run_is_finished_not_archived_again(spreadsheet, tmp_path, monkeypatch):
+    before = _history(spreadsheet)
+    quote_archive = archive.QuoteArchive(str(tmp_path))
+    worksheet_type = type(spreadsheet.worksheet("QuoteUSD"))
+    batch_update = worksheet_type.batch_update
+
+    def fail(self, *args, **kwargs):
+        raise ConnectionError("Sheets unavailable")
+
+    monkeypatch.setattr(worksheet_type, "batch_update", fail)
+    with pytest.raises(ConnectionError):
+        archive.archive_quotes(spreadsheet, quote_archive, CUTOFF)
+    assert quote_archive.pending_run is not None
+
+    monkeypatch.setattr(worksheet_type, "batch_update", batch_update)
+    archive.archive_quotes(spreadsheet, quote_archive, CUTOFF)
+
+    assert quote_archive.pending_run is None
+    assert _history(spreadsheet, str(tmp_path)) == before
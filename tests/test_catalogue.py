@@ -0,0 +1,62 @@
+import pandas as pd
+
+from qms.catalogue import UnionView
+
+CATEGORIES = ["ESD", "MOS", "TVS"]
+
+
+def _view():
+    view = UnionView(CATEGORIES)
+    view.update("MOS", pd.DataFrame({'Magnias P/N': ["M1", "M2"], 'VDS (V)': [30, 60]}), 1)
+    view.update("ESD", pd.DataFrame({'Magnias P/N': ["E1"], 'Package': ["SOD-523"]}), 1)
+    return view
+
+
+def test_categories_are_stacked_in_order_with_a_shared_schema():
+    frame = _view().frame()
+
+    assert list(frame['Magnias P/N']) == ["E1", "M1", "M2"]
+    assert list(frame['Category']) == ["ESD", "MOS", "MOS"]
+    assert list(frame.columns) == ['Magnias P/N', 'Package', 'VDS (V)', 'Category']
+    assert frame['VDS (V)'].isna().tolist() == [True, False, False]
+
+
+def test_unchanged_source_version_keeps_the_built_frame():
+    view = _view()
+    frame = view.frame()
+
+    assert not view.update("MOS", pd.DataFrame({'Magnias P/N': ["other"]}), 1)
+    assert view.built_frame is frame
+    assert view.frame() is frame
+
+
+def test_one_tab_changing_reconforms_only_that_block():
+    view = _view()
+    view.frame()
+    esd_block = view._conformed["ESD"]
+    version = view.version
+
+    assert view.update("MOS", pd.DataFrame({'Magnias P/N': ["M3"], 'VDS (V)': [100]}), 2)
+
+    assert view.version == version + 1
+    assert view.built_frame is None
+    assert view._conformed["ESD"] is esd_block
+    assert list(view.frame()['Magnias P/N']) == ["E1", "M3"]
+
+
+def test_new_column_and_emptied_tab_change_the_schema():
+    view = _view()
+    view.update("TVS", pd.DataFrame({'Magnias P/N': ["T1"], 'VRWM (V)': [5.0]}), 1)
+    assert 'VRWM (V)' in view.frame().columns
+
+    view.update("MOS", pd.DataFrame(), 2)
+
+    frame = view.frame()
+    assert 'VDS (V)' not in frame.columns
+    assert list(frame['Magnias P/N']) == ["E1", "T1"]
+
+
+def test_empty_view_has_the_category_column():
+    frame = UnionView(CATEGORIES).frame()
+
+    assert frame.empty and list(frame.columns) == ['Category']
@@ -0,0 +1,29 @@
+import pandas as pd
+
+from qms import charts
+
+
+def _quotes(start, end):
+    dates = pd.date_range(start, end, freq="7D")
+    return pd.DataFrame({'Quote_Date': dates, 'Currency': ["USD"] * len(dates)})
+
+
+def test_last_twelve_months_from_mid_month_is_monthly():
+    now = pd.Timestamp("2026-10-19")
+    since = now - pd.DateOffset(months=12)
+
+    counts, label = charts.quote_timeline(_quotes(since, now), since)
+
+    assert label == "Monthly"
+    assert counts['Period'].nunique() == 13
+
+
+def test_longer_ranges_are_bucketed_by_quarter_then_year():
+    assert charts.timeline_frequency("2024-10-19", "2026-10-19") == ("Q", "Quarterly")
+    assert charts.timeline_frequency("2010-01-01", "2026-10-19") == ("Y", "Yearly")
+
+
+def test_no_quotes_in_range_gives_an_empty_timeline():
+    counts, _ = charts.quote_timeline(_quotes("2020-01-01", "2020-06-01"), pd.Timestamp("2025-01-01"))
+
+    assert counts.empty
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+
+from qms.facets import FacetIndex
+
+
+def _catalogue():
+    return pd.DataFrame({
+        'Magnias P/N': ["A1", "A2", "B1", "B2"],
+        'FG Supplier': ["Wayon", "Wayon", "UMW", ""],
+        'Package': ["SOT-23", "SOD-123", "SOT-23", "SOT-23"],
+    })
+
+
+def _quotes():
+    return pd.DataFrame({
+        'Product_Name': ["a1", "A1", "B1", "ZZ9"],
+        'Customer': ["Acme", "Beta", "Acme", "Acme"],
+        'Distributor': ["Arrow", "", "Avnet", "Arrow"],
+    })
+
+
+def test_counts_apply_every_other_facets_selection_but_not_their_own():
+    index = FacetIndex(_catalogue())
+    selections = {'FG Supplier': ["Wayon"], 'Package': []}
+
+    counts = index.counts(selections)
+
+    assert counts['FG Supplier'] == {"UMW": 1, "Wayon": 2}
+    assert counts['Package'] == {"SOD-123": 1, "SOT-23": 1}
+    assert index.total(selections) == 2
+
+
+def test_values_within_a_facet_are_ored_and_facets_anded():
+    index = FacetIndex(_catalogue())
+
+    np.testing.assert_array_equal(index.filter({'FG Supplier': ["Wayon", "UMW"], 'Package': ["SOT-23"]}), [0, 2])
+    np.testing.assert_array_equal(index.filter({}, within=[1, 3]), [1, 3])
+
+
+def test_quote_facets_match_products_case_insensitively():
+    index = FacetIndex(_catalogue(), quotes=_quotes())
+
+    assert index.counts({})['Customer'] == {"Acme": 2, "Beta": 1}
+    np.testing.assert_array_equal(index.filter({'Distributor': ["Avnet"]}), [2])
+
+
+def test_empty_quotes_add_no_quote_facets():
+    index = FacetIndex(_catalogue(), quotes=_quotes().iloc[0:0])
+
+    assert set(index.facets) == {'FG Supplier', 'Package'}
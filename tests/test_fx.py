@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from qms import fx
+
+
+@pytest.fixture
+def rates():
+    return fx.FxRates(pd.DataFrame({
+        'Date': ["2024-01-01", "2025-01-01"],
+        'Currency': ["RMB", " rmb "],
+        'Rate': [7.0, 7.5],
+    }))
+
+
+def test_rates_apply_from_their_date_until_the_next_row(rates):
+    result = rates.rates(["RMB", "RMB", "RMB"], ["2024-06-30", "2025-01-01", "2026-03-01"])
+
+    np.testing.assert_array_equal(result, [7.0, 7.5, 7.5])
+
+
+def test_dates_before_the_first_row_use_the_first_rate_and_missing_dates_the_latest(rates):
+    result = rates.rates(["RMB", "RMB"], [pd.Timestamp("2019-05-01"), pd.NaT])
+
+    np.testing.assert_array_equal(result, [7.0, 7.5])
+
+
+def test_convert_between_currencies_as_of_each_date(rates):
+    result = rates.convert([70.0, 1.0, 1.0], ["RMB", "USD", "EUR"], ["2024-03-01", "2024-03-01", "2024-03-01"], "USD")
+
+    assert result[0] == pytest.approx(10.0)
+    assert result[1] == 1.0
+    assert np.isnan(result[2])
+    assert rates.convert([2.0], ["USD"], ["2025-02-01"], "RMB")[0] == pytest.approx(15.0)
+
+
+def test_a_missing_rate_table_raises_instead_of_converting(tmp_path):
+    with pytest.raises(OSError):
+        fx.get_rates(str(tmp_path / "fx_rates.csv"))
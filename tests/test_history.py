@@ -0,0 +1,64 @@
+import pandas as pd
+
+from qms.history import PriceHistory
+
+
+def _quotes(rows):
+    quotes = pd.DataFrame(rows, columns=['Product_Name', 'Currency', 'Price', 'Customer', 'Distributor', 'Raw_Date'])
+    quotes['Quote_Date'] = pd.to_datetime(quotes['Raw_Date'])
+    quotes['Raw_Price'] = quotes['Price'].astype(str)
+    return quotes
+
+
+ROWS = [
+    ("ABC1", "USD", 0.30, "Acme", "Arrow", "2025-03-01"),
+    ("abc1", "USD", 0.10, "Acme", "", "2025-01-01"),
+    ("ABC1", "RMB", 2.00, "Beta", "", "2025-02-01"),
+    ("XYZ9", "USD", 1.00, "Acme", "", "2025-01-15"),
+    ("XYZ9", "USD", None, "Acme", "", "2025-01-20"),
+]
+
+
+def test_series_is_date_ordered_per_product_and_filterable():
+    history = PriceHistory()
+    history.update(_quotes(ROWS))
+
+    assert len(history) == 2
+    assert list(history.series(" abc1 ")['Price']) == [0.10, 2.00, 0.30]
+    assert list(history.series("ABC1", currency="USD", customer="Acme")['Price']) == [0.10, 0.30]
+    assert history.series("NOPE").empty
+
+
+def test_as_of_returns_the_last_quote_on_or_before_the_date():
+    history = PriceHistory()
+    history.update(_quotes(ROWS))
+
+    assert history.as_of("ABC1", "2025-02-15", currency="USD")['Price'] == 0.10
+    assert history.as_of("ABC1", "2025-03-01")['Price'] == 0.30
+    assert history.as_of("ABC1", "2024-12-31") is None
+
+
+def test_update_rebuilds_only_the_changed_product():
+    history = PriceHistory()
+    history.update(_quotes(ROWS))
+    untouched = history._blocks["xyz9"]
+    version = history.version
+
+    rebuilt = history.update(_quotes(ROWS + [("ABC1", "USD", 0.20, "Gamma", "", "2025-04-01")]))
+
+    assert rebuilt == 1
+    assert history.version == version + 1
+    assert history._blocks["xyz9"] is untouched
+    assert history.update(_quotes(ROWS + [("ABC1", "USD", 0.20, "Gamma", "", "2025-04-01")])) == 0
+    assert history.update(_quotes(ROWS[3:])) == 1
+    assert history.series("ABC1").empty
+
+
+def test_resample_gives_median_min_max_and_count_per_period():
+    history = PriceHistory()
+    history.update(_quotes(ROWS + [("ABC1", "USD", 0.50, "Acme", "", "2025-03-20")]))
+
+    summary = history.resample("ABC1", "M", currency="USD")
+
+    march = summary[summary['Quote_Date'] == pd.Timestamp("2025-03-01")].iloc[0]
+    assert (march['Price'], march['Min'], march['Max'], march['Count']) == (0.40, 0.30, 0.50, 2)
@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+
+from qms.indexes import SortIndex
+
+
+def _frame():
+    return pd.DataFrame({
+        'Product Name': ["beta", "Alpha", "", "alpha", None, "Gamma"],
+        'Parts USD Price': [0.3, np.nan, 0.1, 0.2, 0.3, 0.05],
+    })
+
+
+def test_text_sorts_case_insensitively_with_blanks_last_and_ties_in_order():
+    index = SortIndex(_frame())
+
+    np.testing.assert_array_equal(index.order('Product Name'), [1, 3, 0, 5, 2, 4])
+    np.testing.assert_array_equal(index.order('Product Name', descending=True), [5, 0, 1, 3, 2, 4])
+
+
+def test_numbers_sort_with_missing_last_in_both_directions():
+    index = SortIndex(_frame())
+
+    np.testing.assert_array_equal(index.order('Parts USD Price'), [5, 2, 3, 0, 4, 1])
+    np.testing.assert_array_equal(index.order('Parts USD Price', descending=True), [0, 4, 3, 2, 5, 1])
+
+
+def test_order_within_a_result_set_sorts_only_those_rows():
+    index = SortIndex(_frame())
+
+    np.testing.assert_array_equal(index.order('Parts USD Price', within=[0, 1, 3]), [3, 0, 1])
+    np.testing.assert_array_equal(index.order('Parts USD Price', within=np.array([], dtype=int)), [])
+
+
+def test_full_order_is_computed_once_per_column_and_direction():
+    index = SortIndex(_frame())
+
+    assert index.order('Product Name') is index.order('Product Name')
+    assert index.order('Product Name') is not index.order('Product Name', descending=True)
@@ -0,0 +1,42 @@
+from qms.invalidation import InvalidationBus
+
+
+def test_sessions_see_only_events_after_their_cursor():
+    bus = InvalidationBus()
+    bus.publish("MOS", origin="a")
+    cursor = bus.cursor()
+
+    assert bus.publish("MOS", origin="a") == 2
+    assert bus.publish("QuoteUSD", origin="b") == 1
+    events, cursor = bus.poll(cursor)
+
+    assert [(event["worksheet"], event["version"], event["origin"]) for event in events] == [
+        ("MOS", 2, "a"), ("QuoteUSD", 1, "b")]
+    assert bus.poll(cursor) == ([], cursor)
+
+
+def test_processes_sharing_a_log_see_each_others_writes_with_consecutive_versions(tmp_path):
+    path = str(tmp_path / "changes.jsonl")
+    first, second = InvalidationBus(path), InvalidationBus(path)
+    cursor = second.cursor()
+
+    assert first.publish("MOS") == 1
+    assert second.publish("MOS") == 2
+    events, cursor = second.poll(cursor)
+
+    assert [event["version"] for event in events] == [1, 2]
+    assert second.poll(cursor) == ([], cursor)
+
+
+def test_a_partly_written_line_is_left_for_the_next_poll(tmp_path):
+    path = tmp_path / "changes.jsonl"
+    bus = InvalidationBus(str(path))
+    cursor = bus.cursor()
+    bus.publish("ESD")
+    with open(path, "a") as handle:
+        handle.write('{"worksheet": "TVS", "vers')
+
+    events, next_cursor = bus.poll(cursor)
+
+    assert [event["worksheet"] for event in events] == ["ESD"]
+    assert next_cursor < path.stat().st_size
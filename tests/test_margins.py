@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from qms import fx
+from qms.margins import lowest_margins, margin_table
+
+RATES = fx.FxRates(pd.DataFrame({'Date': ["2020-01-01"], 'Currency': ["RMB"], 'Rate': [8.0]}))
+
+
+def _catalogue():
+    return pd.DataFrame({
+        'Category': ["MOS", "MOS", "ESD", "ESD"],
+        'Magnias P/N': ["A1", "A2", "E1", "E2"],
+        'Parts USD Price': [0.08, 0.0, "", 0.5],
+        'Parts RMB Price': ["", "", "1.6", ""],
+        'Distributor USD Price': [0.09, "", "", ""],
+        'Quote Date': pd.to_datetime(["2025-01-01"] * 4),
+    })
+
+
+def _reporting_quotes():
+    quotes = pd.DataFrame({
+        'Product_Name': ["a1", "A1", "A2", "E1"],
+        'Reporting_Price': [0.05, 0.10, 0.20, 0.40],
+        'Quote_Date': pd.to_datetime(["2025-01-01", "2025-02-01", "2025-02-01", "2025-02-01"]),
+        'Source_Row': [0, 1, 2, 3],
+        'Slot': [1, 1, 1, 1],
+        'Customer': ["Acme", "Beta", "Acme", "Acme"],
+        'Distributor': ["", "Arrow", "", ""],
+    })
+    return quotes
+
+
+def test_margin_and_markup_use_the_latest_quote():
+    table = margin_table(_catalogue(), _reporting_quotes(), RATES, "USD")
+
+    first = table.iloc[0]
+    assert (first['Latest Quote'], first['Customer']) == (0.10, "Beta")
+    assert first['Margin %'] == pytest.approx(20.0)
+    assert first['Markup %'] == pytest.approx(25.0)
+    assert first['Distributor Margin %'] == pytest.approx(10.0)
+
+
+def test_cost_in_the_other_currency_is_converted():
+    table = margin_table(_catalogue(), _reporting_quotes(), RATES, "USD")
+
+    assert table.iloc[2]['Parts Cost'] == pytest.approx(0.2)
+    assert table.iloc[2]['Margin %'] == pytest.approx(50.0)
+
+
+def test_zero_cost_and_unquoted_parts_have_no_margin():
+    table = margin_table(_catalogue(), _reporting_quotes(), RATES, "USD")
+
+    assert np.isnan(table.iloc[1]['Parts Cost']) and np.isnan(table.iloc[1]['Margin %'])
+    assert np.isnan(table.iloc[3]['Latest Quote']) and np.isnan(table.iloc[3]['Margin %'])
+    assert list(lowest_margins(table)['Part']) == ["A1", "E1"]
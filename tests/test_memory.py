@@ -0,0 +1,73 @@
+import numpy as np
+
+from benchmarks import synthetic
+from qms import memory, snapshot
+
+MB = memory.MB
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _snapshot_frames(tmp_path):
+    snapshot.refresh_snapshot(str(tmp_path), synthetic.build_spreadsheet(50, 40))
+    current = snapshot.SnapshotReader(str(tmp_path), check_interval=0).current()
+    return {('snapshot', current.version, name): memory.estimate_bytes(frame)
+            for name, frame in current.tables.items()}
+
+
+def test_sessions_sharing_snapshot_frames_count_them_once(tmp_path):
+    shared = _snapshot_frames(tmp_path)
+    governor = memory.MemoryGovernor()
+
+    governor.set_worksheet_bytes("a", 1000, shared)
+    one_session = governor.total_bytes()
+    governor.set_worksheet_bytes("b", 1000, shared)
+
+    assert one_session == 1000 + sum(shared.values())
+    assert governor.total_bytes() == one_session + 1000
+    assert governor.shared_bytes() == sum(shared.values())
+    governor.forget("a")
+    assert governor.total_bytes() == 1000 + sum(shared.values())
+
+
+def test_shared_frames_do_not_evict_derived_objects_as_sessions_grow(tmp_path):
+    shared = _snapshot_frames(tmp_path)
+    process_budget = sum(shared.values()) + 2 * MB
+    governor = memory.MemoryGovernor(session_budget=1 * MB, process_budget=process_budget)
+
+    for session in range(20):
+        governor.set_worksheet_bytes(session, 0, shared)
+        governor.put(session, "index", np.zeros(1000))
+
+    assert governor.evictions == 0
+    assert all(governor.get(session, "index") is not None for session in range(20))
+
+
+def test_least_recently_used_object_is_evicted_over_the_session_budget():
+    governor = memory.MemoryGovernor(session_budget=MB, process_budget=10 * MB)
+    governor.put("a", "old", np.zeros(MB // 16))
+    governor.put("a", "new", np.zeros(MB // 16))
+    governor.get("a", "old")
+
+    governor.put("a", "newest", np.zeros(MB // 16))
+
+    assert governor.get("a", "new") is None
+    assert governor.get("a", "old") is not None and governor.get("a", "newest") is not None
+
+
+def test_idle_objects_are_dropped_under_budget():
+    clock = FakeClock()
+    governor = memory.MemoryGovernor(idle_seconds=60, clock=clock)
+    governor.put("a", "report", [1, 2, 3])
+
+    clock.now = 61
+    governor.put("b", "index", [4])
+
+    assert governor.get("a", "report") is None
+    assert governor.get("b", "index") == [4]
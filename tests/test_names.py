@@ -0,0 +1,60 @@
+import pandas as pd
+
+from qms.names import AUTO_MERGE_SIMILARITY, NameCanonicalizer, NameIndex, canonicalize_quotes, name_key
+
+
+def _canonicalizer(counts, aliases=None):
+    return NameCanonicalizer("Customer", pd.Series(counts), aliases)
+
+
+def test_name_key_drops_case_punctuation_and_legal_suffixes():
+    assert name_key("MIDEA Co., Ltd.") == "midea"
+    assert name_key(" A&B Group ") == "a and b"
+    assert name_key("Group") == "group"
+
+
+def test_variants_of_one_key_show_the_most_quoted_spelling():
+    canonicalizer = _canonicalizer({"Midea": 5, "MIDEA Co., Ltd.": 2, "Gree": 1})
+
+    assert canonicalizer.mapping["MIDEA Co., Ltd."] == "Midea"
+    assert canonicalizer.canonical(" midea ltd ") == "Midea"
+    assert canonicalizer.canonical("Gree") == "Gree"
+
+
+def test_keys_exactly_at_the_merge_threshold_are_merged_and_just_below_are_only_suggested():
+    at = NameIndex(["shenzhen sunwoda evb", "shenzhen sunwoda evc"]).pairs()
+    below = NameIndex(["shenzhen sunwoda ev", "shenzhen sunwoda eb"]).pairs()
+    assert at[0][2] == AUTO_MERGE_SIMILARITY
+    assert below[0][2] < AUTO_MERGE_SIMILARITY
+
+    merged = _canonicalizer({"Shenzhen Sunwoda EVB": 3, "Shenzhen Sunwoda EVC": 1})
+    separate = _canonicalizer({"Shenzhen Sunwoda EV": 3, "Shenzhen Sunwoda EB": 1})
+
+    assert merged.mapping["Shenzhen Sunwoda EVC"] == "Shenzhen Sunwoda EVB"
+    assert separate.mapping["Shenzhen Sunwoda EB"] == "Shenzhen Sunwoda EB"
+    assert separate.suggestions().iloc[0][['Name', 'Suggested']].tolist() == [
+        "Shenzhen Sunwoda EB", "Shenzhen Sunwoda EV"]
+
+
+def test_aliases_override_and_name_their_group():
+    canonicalizer = _canonicalizer({"Midea": 5, "Midea Grp Intl": 1}, {"Midea Grp Intl": "Midea Group"})
+
+    assert canonicalizer.mapping["Midea Grp Intl"] == "Midea Group"
+    assert canonicalizer.canonical("Midea") == "Midea Group"
+
+
+def test_unseen_names_join_a_close_group_or_stay_as_they_are():
+    canonicalizer = _canonicalizer({"Shenzhen Sunwoda EVB": 3, "Gree": 1})
+
+    assert canonicalizer.canonical("Shenzhen Sunwoda EVC") == "Shenzhen Sunwoda EVB"
+    assert canonicalizer.canonical("Haier") == "Haier"
+
+
+def test_canonicalize_quotes_keeps_blank_cells():
+    quotes = pd.DataFrame({'Customer': ["Midea", "MIDEA Ltd", ""], 'Distributor': ["", "Arrow", "ARROW Inc"]})
+
+    canonical, canonicalizers = canonicalize_quotes(quotes, {"Customer": {}, "Distributor": {}})
+
+    assert canonical['Customer'].tolist() == ["Midea", "Midea", ""]
+    assert canonical['Distributor'].tolist() == ["", "Arrow", "Arrow"]
+    assert set(canonicalizers) == {"Customer", "Distributor"}
@@ -0,0 +1,57 @@
+import io
+import zipfile
+from datetime import date
+
+import pandas as pd
+
+from qms import quotation
+from qms.normalize import QUOTE_COLUMNS
+
+
+def _catalogue():
+    return pd.DataFrame({
+        'Category': ['MOS', 'MOS'],
+        'Magnias P/N': ['ABC1', 'XYZ9'],
+        'Package': ['SOT-23', 'SOP-8'],
+        'Parts USD Price': [0.1, 0.2],
+    })
+
+
+def _quotes():
+    quotes = pd.DataFrame({column: pd.Series(dtype=object) for column in QUOTE_COLUMNS})
+    quotes.loc[0] = {'Product_Category': 'MOS', 'Product_Name': 'abc1', 'Currency': 'USD', 'Price': 0.15,
+                     'Customer': 'Acme', 'Distributor': 'N/A', 'Quote_Date': pd.Timestamp('2025-01-02')}
+    return quotes
+
+
+def test_case_variant_part_numbers_are_one_line():
+    document = quotation.quotation_document(_catalogue(), _quotes(), "Acme", ["ABC1", "abc1", " ABC1 ", "XYZ9"],
+                                            "USD", quote_date=date(2025, 3, 1))
+
+    assert [line['Part Number'] for line in document['lines']] == ['ABC1', 'XYZ9']
+    assert document['lines'][0]['Unit Price'] == 0.15
+    assert document['lines'][0]['Basis'] == "Last quoted to you 2025-01-02"
+
+
+def test_customers_with_the_same_file_name_get_separate_zip_entries():
+    documents = [quotation.quotation_document(_catalogue(), _quotes(), customer, ["ABC1"], "USD",
+                                              quote_date=date(2025, 3, 1))
+                 for customer in ("A&B", "A B")]
+
+    name, data, mime = quotation.bundle(documents, [b"first", b"second"], "HTML")
+
+    assert mime == "application/zip"
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        names = archive.namelist()
+        assert len(set(names)) == 2
+        assert sorted(archive.read(entry) for entry in names) == [b"first", b"second"]
+
+
+def test_without_rates_only_same_currency_list_prices_are_used():
+    lines = quotation.quotation_document(_catalogue(), _quotes().iloc[0:0], "Acme", ["ABC1"], "USD",
+                                         quote_date=date(2025, 3, 1))['lines']
+    rmb_lines = quotation.quotation_document(_catalogue(), _quotes().iloc[0:0], "Acme", ["ABC1"], "RMB",
+                                             quote_date=date(2025, 3, 1))['lines']
+
+    assert (lines[0]['Unit Price'], lines[0]['Basis']) == (0.1, "List price")
+    assert rmb_lines[0]['Basis'] == "Price on request"
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+
+from qms.search import IncrementalSearch, LRUCache, page_bounds
+
+
+def _catalogue():
+    return pd.DataFrame({
+        'Product Name': ["MGMOS000001", "MGMOS000012", "mgesd000001", None],
+        'Magnias P/N': ["A-1", "", "B-12", "C-123"],
+    })
+
+
+def test_empty_query_matches_every_row():
+    search = IncrementalSearch(_catalogue(), ['Product Name', 'Magnias P/N'])
+
+    np.testing.assert_array_equal(search.search("   "), [0, 1, 2, 3])
+    assert search.rows_scanned == 0
+
+
+def test_matches_any_column_case_insensitively_in_row_order():
+    search = IncrementalSearch(_catalogue(), ['Product Name', 'Magnias P/N', 'Not A Column'])
+
+    np.testing.assert_array_equal(search.search("12"), [1, 2, 3])
+    np.testing.assert_array_equal(search.search(" MgEsd "), [2])
+    assert search.columns == ['Product Name', 'Magnias P/N']
+
+
+def test_longer_query_rescans_only_the_earlier_matches():
+    search = IncrementalSearch(_catalogue(), ['Product Name', 'Magnias P/N'])
+    search.search("mos")
+    scanned = search.rows_scanned
+
+    np.testing.assert_array_equal(search.search("mos0000"), [0, 1])
+    assert search.rows_scanned - scanned == 2
+    search.search("mos0000")
+    assert search.rows_scanned - scanned == 2
+
+
+def test_lru_cache_drops_the_least_recently_used_entry():
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+
+    assert cache.keys() == ["a", "c"]
+    assert cache.get("b", "missing") == "missing"
+
+
+def test_page_bounds_clamp_to_the_results():
+    assert page_bounds(120, 2, 50) == (50, 100, 3)
+    assert page_bounds(120, 9, 50) == (100, 120, 3)
+    assert page_bounds(0, 1, 50) == (0, 0, 1)
+    assert page_bounds(10, 0, 50) == (0, 10, 1)
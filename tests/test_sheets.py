@@ -0,0 +1,34 @@
+from benchmarks.fake_sheets import FakeSpreadsheet
+from qms import sheets
+
+
+def _spreadsheet():
+    spreadsheet = FakeSpreadsheet()
+    header = sheets.QUOTE_SHEET_HEADERS
+    rows = [header]
+    for name in ("ABC10", "ABC1"):
+        cells = [''] * len(header)
+        cells[header.index('Products')] = "MOS"
+        cells[header.index('Product Name')] = name
+        rows.append(cells)
+    spreadsheet.add_worksheet_rows("QuoteUSD", rows)
+    return spreadsheet
+
+
+def _slot_1(spreadsheet):
+    values = spreadsheet.worksheet("QuoteUSD").get_all_values()
+    header = values[0]
+    return {row[header.index('Product Name')]: row[header.index('DC-1')] for row in values[1:]}
+
+
+def test_add_quote_matches_the_exact_product_like_add_quotes():
+    single, batch = _spreadsheet(), _spreadsheet()
+
+    success, _ = sheets.add_quote(single, "USD", "mos", "abc1", 0.5, "Acme", "N/A", "1/2/2025")
+    [(batch_success, _)] = sheets.add_quotes(batch, "USD", [{
+        'product_category': "mos", 'product_name': "abc1", 'price': 0.5, 'customer': "Acme",
+        'distributor': "N/A", 'quote_date': "1/2/2025",
+    }])
+
+    assert success and batch_success
+    assert _slot_1(single) == _slot_1(batch) == {"ABC10": "", "ABC1": "$0.5000"}
@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+
+from qms.indexes import BitmapIndex, NumericIndex, bitmap_count, bitmap_positions
+from qms.specs import SpecSearch
+
+
+def _mos():
+    return pd.DataFrame({
+        'VDS (V)': [30, 60, "1,000", "", 20],
+        'ID (A)': [5.0, 2.5, 1.0, None, 8.0],
+        'Type': ["N-Channel", "P-Channel", "N-Channel", "", "N-Channel"],
+    })
+
+
+def test_numeric_index_ranges_are_inclusive_and_skip_blanks():
+    index = NumericIndex(_mos()['VDS (V)'])
+
+    assert index.bounds == (20.0, 1000.0)
+    np.testing.assert_array_equal(bitmap_positions(index.range(30, 60), 5), [0, 1])
+    np.testing.assert_array_equal(bitmap_positions(index.range(low=100), 5), [2])
+    assert bitmap_count(index.range()) == 4
+
+
+def test_column_without_numbers_has_no_bounds():
+    assert NumericIndex(pd.Series(["", "n/a"])).bounds is None
+
+
+def test_bitmap_index_leaves_blank_cells_unindexed():
+    index = BitmapIndex(_mos()['Type'])
+
+    assert index.values == ["N-Channel", "P-Channel"]
+    assert index.counts() == {"N-Channel": 3, "P-Channel": 1}
+    np.testing.assert_array_equal(bitmap_positions(index.match(["P-Channel", "Unknown"]), 5), [1])
+
+
+def test_spec_search_combines_filters_within_earlier_matches():
+    search = SpecSearch(_mos(), {"VDS (V)": "range", "ID (A)": "range", "Type": "equal", "Missing": "range"})
+
+    assert set(search.ranges) == {"VDS (V)", "ID (A)"}
+    np.testing.assert_array_equal(search.filter(), np.arange(5))
+    np.testing.assert_array_equal(search.filter({"VDS (V)": (20, 60)}, {"Type": ["N-Channel"]}), [0, 4])
+    np.testing.assert_array_equal(search.filter({"ID (A)": (2, 10)}, within=np.array([1, 2, 3])), [1])